@@ -1,12 +1,18 @@
 import logging
-from typing import List
+from typing import Any, Dict, List, Tuple
 
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, RemoveMessage, ToolMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 
-from website_builder.config import PROJECT_WORKSPACE
-from website_builder.mcp.file_system import mcp_file_system_tools
+from website_builder.agents.developer_context import estimate_tokens, extend_token_estimate, trim_developer_context
+from website_builder.agents.task_guard import task_step_verdict, repeat_streak, escalation_message, \
+    NO_TOOL_CALL_MESSAGE
+from website_builder.config import PROJECT_WORKSPACE, DEVELOPER_CONTEXT_TOKEN_BUDGET, DEVELOPER_CONTEXT_RECENT_STEPS, \
+    DEVELOPER_TASK_MAX_STEPS, DEVELOPER_TASK_REPEAT_LIMIT, DEVELOPER_TASK_ESCALATIONS
+from website_builder.llm_usage import usage_callback
+from website_builder.metrics import TASK_INTERVENTIONS
 from website_builder.models.state_models import DeveloperState
+from website_builder.tools.file_system_tools import file_system_tools
 from website_builder.tools.validation_tools import validate_task_completion, next_task
 
 _developer_llm = None
@@ -16,8 +22,8 @@ logger = logging.getLogger(__name__)
 async def get_developer_llm():
     global _developer_llm
     if _developer_llm is None:
-        tools = await mcp_file_system_tools() + [validate_task_completion, next_task]
-        _developer_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro").bind_tools(tools)
+        tools = await file_system_tools() + [validate_task_completion, next_task]
+        _developer_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", callbacks=[usage_callback]).bind_tools(tools)
     return _developer_llm
 
 async def execute_current_task(state: DeveloperState) -> DeveloperState:
@@ -29,18 +35,7 @@ async def execute_current_task(state: DeveloperState) -> DeveloperState:
 
         current_task = state["parsed_tasks"][state["current_task_index"]]
 
-        # Check if we need to add initial task message
-        needs_task_message = True
-
-        # Check if we already have a task message for the current task
-        for msg in state["developer_messages"]:
-            if isinstance(msg, HumanMessage) and "Execute this task:" in msg.content:
-                # Extract task ID from existing message to see if it matches current task
-                if current_task.get('id', 'Unknown') in msg.content:
-                    needs_task_message = False
-                    break
-
-        if needs_task_message:
+        if not state.get("task_message_sent", False):
             context_info = ""
             if state.get("project_context"):
                 context_info = f"\n**PROJECT CONTEXT:**\n{state['project_context']['summary']}\n\n"
@@ -56,36 +51,97 @@ async def execute_current_task(state: DeveloperState) -> DeveloperState:
                         + f"Use the appropriate tools to complete this task, then use next_task when done.\n"
                         + f"**CRITICAL: After successfully completing ALL required files for a task, you MUST immediately call next_task.**"
             )
-            messages = [*state["developer_messages"], task_message]
-            response = await developer_llm.ainvoke(messages)
+            response, context = await __invoke_developer_llm(developer_llm, state, [task_message],
+                                                             len(state["developer_messages"]))
             logger.info(f"Developer llm response {response.content}")
-            return {"developer_messages": [task_message, response]}
+            return {
+                "developer_messages": [task_message, response],
+                **context,
+                "task_message_sent": True,
+                "task_steps": 1,
+                "task_message_offset": len(state["developer_messages"]),
+                "task_repeats": 1,
+                "task_escalations": 0,
+                "task_stop": {}
+            }
+
+        verdict, cause, reason = task_step_verdict(state, DEVELOPER_TASK_MAX_STEPS, DEVELOPER_TASK_REPEAT_LIMIT,
+                                                   DEVELOPER_TASK_ESCALATIONS)
+        if verdict == "skip":
+            return {"task_stop": {"status": "skipped", "cause": cause, "reason": reason}}
+
+        task_steps = state.get("task_steps", 0) + 1
+        logger.info(f"Task {current_task.get('id', 'Unknown')} step {task_steps}")
 
         last_message = state["developer_messages"][-1]
-
+        new_messages = []
         if isinstance(last_message, AIMessage) and hasattr(last_message, 'invalid_tool_calls') and last_message.invalid_tool_calls:
-            error_responses = []
             for invalid_call in last_message.invalid_tool_calls:
                 error_msg = f"""Tool call failed due to content size or formatting issues.
                 ERROR: {invalid_call.get('error', 'Invalid tool call')}
                 SOLUTION: Break your content into smaller pieces (under 1500 characters) and retry."""
-                error_responses.append(ToolMessage(
+                new_messages.append(ToolMessage(
                     content=error_msg,
                     tool_call_id=invalid_call['id']
                 ))
-            messages = [*state["developer_messages"], error_responses]
-            response = await developer_llm.ainvoke(messages)
-            return {"developer_messages": error_responses + [response]}
-
-        messages = state["developer_messages"]
-        response = await developer_llm.ainvoke(messages)
-        return {"developer_messages": [response]}
+        elif isinstance(last_message, AIMessage) and not last_message.tool_calls:
+            # Sent as is, the same messages would likely get the same answer again
+            new_messages.append(HumanMessage(content=NO_TOOL_CALL_MESSAGE))
+
+        update = {"task_steps": task_steps}
+        if verdict == "escalate":
+            logger.warning(f"Escalating task {current_task.get('id', 'Unknown')}: {reason}")
+            TASK_INTERVENTIONS.labels("escalated", cause).inc()
+            new_messages.append(escalation_message(state["task_repeats"]))
+            update["task_escalations"] = state.get("task_escalations", 0) + 1
+
+        response, context = await __invoke_developer_llm(developer_llm, state, new_messages,
+                                                         state.get("task_message_offset", 0))
+        update.update(context)
+        # An escalation starts a new streak, the response is only compared with the ones sent after it
+        update["task_repeats"] = 1 if verdict == "escalate" else \
+            repeat_streak(__last_response(state), response, state.get("task_repeats", 0))
+        return {"developer_messages": new_messages + [response], **update}
 
     except Exception as e:
+        # Counted as a step, a call that keeps failing runs into the step budget or the repeat limit
+        response = AIMessage(content=f"Call failed with this exception {e} please try again")
         return {
-            "developer_messages": [AIMessage(content=f"Call failed with this exception {e} please try again")]
+            "developer_messages": [response],
+            "task_steps": state.get("task_steps", 0) + 1,
+            "task_repeats": repeat_streak(__last_response(state), response, state.get("task_repeats", 0))
         }
 
+def __last_response(state: DeveloperState):
+    for msg in reversed(current_task_messages(state)):
+        if isinstance(msg, AIMessage):
+            return msg
+    return None
+
+async def __invoke_developer_llm(developer_llm, state: DeveloperState, new_messages: List,
+                                 task_message_offset: int) -> Tuple[AIMessage, Dict[str, Any]]:
+    """Call the model with the task's context trimmed to the token budget, once it exceeds it.
+
+    The history's token estimate is carried in the state and only extended by
+    the messages added since the last call. Returns the response and the
+    estimate to store.
+    """
+    history = state["developer_messages"]
+    history_tokens = extend_token_estimate(history, state.get("context_messages", 0), state.get("context_tokens", 0))
+    messages = [*history, *new_messages]
+    tokens = history_tokens + estimate_tokens(new_messages)
+    if 0 < DEVELOPER_CONTEXT_TOKEN_BUDGET < tokens:
+        prompt = trim_developer_context(messages, task_message_offset, DEVELOPER_CONTEXT_TOKEN_BUDGET,
+                                        DEVELOPER_CONTEXT_RECENT_STEPS)
+        trimming = f", ~{estimate_tokens(prompt)} after trimming ({len(messages)} -> {len(prompt)} messages)"
+    else:
+        prompt = messages
+        trimming = f" ({len(messages)} messages)"
+    response = await developer_llm.ainvoke(prompt)
+    input_tokens = (response.usage_metadata or {}).get("input_tokens")
+    logger.info(f"Developer prompt ~{tokens} tokens{trimming}, model counted {input_tokens}")
+    return response, {"context_tokens": history_tokens, "context_messages": len(history)}
+
 def check_task_completion(state: DeveloperState) -> str:
     """Check if current task is complete and decide next action"""
     try:
@@ -133,7 +189,13 @@ def advance_to_next_task(state: DeveloperState) -> DeveloperState:
         return {
             "current_task_index": next_index,
             "project_context": {"summary": project_context},
-            "developer_messages": [system_message, context_message]
+            "developer_messages": [system_message, context_message],
+            "task_message_sent": False,
+            "task_steps": 0,
+            "task_message_offset": 0,
+            "task_repeats": 0,
+            "task_escalations": 0,
+            "task_stop": {}
         }
 
     except Exception as e:
@@ -145,9 +207,47 @@ def advance_to_next_task(state: DeveloperState) -> DeveloperState:
             ],
         }
 
+def skip_current_task(state: DeveloperState) -> DeveloperState:
+    """Record why the current task is stopped and move on to the next one"""
+    current_task = state["parsed_tasks"][state["current_task_index"]]
+    stop = state["task_stop"]
+    logger.warning(f"Skipping task {current_task.get('id', 'Unknown')} after {state.get('task_steps', 0)} steps: "
+                   f"{stop['reason']}")
+    TASK_INTERVENTIONS.labels(stop["status"], stop["cause"]).inc()
+    stopped_tasks = [*state.get("stopped_tasks", []), stopped_task_record(current_task, state.get("task_steps", 0),
+                                                                          **stop)]
+
+    next_index = state["current_task_index"] + 1
+    if next_index >= len(state["parsed_tasks"]):
+        return {"project_status": "completed", "current_task_index": next_index, "stopped_tasks": stopped_tasks,
+                "task_stop": {}}
+
+    created_files = extract_created_files_from_messages(current_task_messages(state))
+    context_message = HumanMessage(content=f"Task {current_task.get('id', 'Unknown')} was skipped: {stop['reason']}. "
+                                           f"Files it created: {', '.join(created_files)}")
+    return {
+        "current_task_index": next_index,
+        "developer_messages": [context_message],
+        "stopped_tasks": stopped_tasks,
+        "task_message_sent": False,
+        "task_steps": 0,
+        "task_message_offset": 0,
+        "task_repeats": 0,
+        "task_escalations": 0,
+        "task_stop": {}
+    }
+
+def stopped_task_record(task, steps: int, status: str, cause: str, reason: str) -> dict:
+    return {"id": task.get("id"), "title": task.get("title"), "status": status, "cause": cause, "reason": reason,
+            "steps": steps}
+
+def current_task_messages(state: DeveloperState):
+    """Messages from the current task's task message on"""
+    return state["developer_messages"][state.get("task_message_offset", 0):]
+
 def extract_task_summary(state: DeveloperState) -> str:
     """Extract summary from the last AI message"""
-    for msg in reversed(state["developer_messages"]):
+    for msg in reversed(current_task_messages(state)):
         if isinstance(msg, AIMessage) and msg.content:
             # Look for summary in the message content (before tool call)
             return msg.content
@@ -158,7 +258,7 @@ def build_project_context(state: DeveloperState, task_summary: str) -> str:
     current_task = state["parsed_tasks"][state["current_task_index"]]
 
     # Extract created files from message history
-    created_files = extract_created_files_from_messages(state["developer_messages"])
+    created_files = extract_created_files_from_messages(current_task_messages(state))
 
     context = f"Completed: {current_task['title']}. "
     context += f"Files created: {', '.join(created_files)}. "
@@ -166,6 +266,23 @@ def build_project_context(state: DeveloperState, task_summary: str) -> str:
 
     return context
 
+def completed_task_context(task, messages) -> str:
+    """Context handed to the tasks that depend on a task finished by its own developer loop"""
+    task_summary = "Task completed"
+    for msg in reversed(messages):
+        if isinstance(msg, AIMessage) and msg.content and any(
+                tool_call["name"] == "next_task" for tool_call in msg.tool_calls):
+            task_summary = msg.content
+            break
+    created_files = extract_created_files_from_messages(messages)
+    return f"Completed: {task['title']}. Files created: {', '.join(created_files)}. Summary: {task_summary}"
+
+def stopped_task_context(task, stopped, messages) -> str:
+    """Context handed to the tasks that depend on a task that was skipped or failed"""
+    created_files = extract_created_files_from_messages(messages)
+    return (f"Not completed, {stopped['status']}: {task['title']} ({stopped['reason']}). "
+            f"Files created: {', '.join(created_files)}. Check them before relying on them.")
+
 def extract_created_files_from_messages(messages) -> List[str]:
     """Extract file paths from successful write_file calls"""
     created_files = []
@@ -180,13 +297,17 @@ def project_complete(state: DeveloperState) -> DeveloperState:
     """Handle project completion"""
     try:
         total_tasks = len(state["parsed_tasks"])
+        stopped = state.get("stopped_tasks", [])
+        outcome = f"All {total_tasks} tasks completed successfully!" if not stopped else \
+            f"{total_tasks - len(stopped)} of {total_tasks} tasks completed, skipped: " \
+            + ", ".join(f"{task['id']} ({task['reason']})" for task in stopped) + "."
 
         return {
             "project_status": "completed",
             "developer_messages": [
                 state["developer_messages"][0],
                 AIMessage(
-                    content=f"All {total_tasks} tasks completed successfully! Website development finished. Project files are available in: {PROJECT_WORKSPACE}"
+                    content=f"{outcome} Website development finished. Project files are available in: {PROJECT_WORKSPACE}"
                 ),
             ],
         }
@@ -0,0 +1,164 @@
+import json
+import os
+from typing import Any, Dict, List, Sequence, Set
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+# Gemini averages about four characters of English, HTML or CSS per token
+CHARS_PER_TOKEN = 4
+# Tool call arguments and outputs longer than this are elided from condensed steps
+ELIDE_MIN_CHARS = 200
+
+READ_TOOLS = {"read_file", "read_text_file"}
+# Writes that send the whole file, edit_file only sends the changed lines
+FULL_WRITE_TOOLS = {"write_file"}
+
+
+def estimate_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Estimated prompt tokens of the messages, text and tool call arguments"""
+    chars = 0
+    for msg in messages:
+        chars += len(msg.content) if isinstance(msg.content, str) else len(json.dumps(msg.content, default=str))
+        for tool_call in getattr(msg, "tool_calls", None) or []:
+            chars += len(tool_call["name"]) + len(json.dumps(tool_call["args"], default=str))
+    return chars // CHARS_PER_TOKEN
+
+
+def extend_token_estimate(messages: Sequence[BaseMessage], counted_messages: int, counted_tokens: int) -> int:
+    """Estimated tokens of the messages given the estimate of their first ``counted_messages``.
+
+    Only the messages appended since are estimated, a history that shrank is estimated again.
+    """
+    if counted_messages > len(messages):
+        return estimate_tokens(messages)
+    return counted_tokens + estimate_tokens(messages[counted_messages:])
+
+
+def trim_developer_context(messages: Sequence[BaseMessage], task_message_offset: int, budget: int,
+                           recent_steps: int) -> List[BaseMessage]:
+    """Messages of a developer model call, fitted into the token budget.
+
+    The system prompt, the task message and the last ``recent_steps`` agent
+    steps are always sent verbatim. Before them, a read_file output is elided
+    once a later step read or wrote the whole file again, so only its latest
+    full version is sent. Over budget, the file contents written by older steps and their
+    long tool outputs are elided too, and if that is still not enough the
+    oldest steps are condensed into one note listing what they did.
+    """
+    messages = list(messages)
+    if budget <= 0:
+        return messages
+    pinned = [msg for msg in messages[:task_message_offset] if isinstance(msg, SystemMessage)]
+    task_message = messages[task_message_offset:task_message_offset + 1]
+    steps = __split_steps(
+        [msg for msg in messages[:task_message_offset] if not isinstance(msg, SystemMessage)]
+        + messages[task_message_offset + 1:]
+    )
+    recent = steps[max(0, len(steps) - recent_steps):]
+    older = steps[:len(steps) - len(recent)]
+    if not older:
+        return messages
+
+    older = __elide_stale_reads(older, recent)
+
+    def assemble(summary_lines, kept_steps):
+        summary = [HumanMessage(content="Earlier steps of this task, condensed:\n" + "\n".join(summary_lines))] \
+            if summary_lines else []
+        return pinned + task_message + summary + [msg for step in kept_steps + recent for msg in step]
+
+    fixed_tokens = estimate_tokens(pinned + task_message + [msg for step in recent for msg in step])
+    if fixed_tokens + sum(estimate_tokens(step) for step in older) <= budget:
+        return assemble([], older)
+    older = [__elide_step(step) for step in older]
+    step_tokens = [estimate_tokens(step) for step in older]
+    tokens = fixed_tokens + sum(step_tokens)
+    summary_lines = []
+    while older and tokens > budget:
+        lines = __step_summary(older.pop(0))
+        summary_lines += lines
+        tokens += sum(len(line) + 1 for line in lines) // CHARS_PER_TOKEN - step_tokens.pop(0)
+    return assemble(summary_lines, older)
+
+
+def __split_steps(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Group the messages into agent steps, an AI message with the tool results and notes that follow it"""
+    steps: List[List[BaseMessage]] = []
+    for msg in messages:
+        if isinstance(msg, AIMessage) or not steps:
+            steps.append([msg])
+        else:
+            steps[-1].append(msg)
+    return steps
+
+
+def __tool_calls_by_id(step: List[BaseMessage]) -> Dict[str, Dict[str, Any]]:
+    return {tool_call["id"]: tool_call for msg in step if isinstance(msg, AIMessage) for tool_call in msg.tool_calls}
+
+
+def __touched_path(tool_call: Dict[str, Any]) -> str:
+    path = tool_call["args"].get("path")
+    return os.path.normpath(path) if isinstance(path, str) else ""
+
+
+def __full_content_paths(step: List[BaseMessage]) -> Set[str]:
+    """Files whose whole content the step read or wrote, partial reads and edits do not count"""
+    return {__touched_path(tool_call) for tool_call in __tool_calls_by_id(step).values()
+            if tool_call["name"] in FULL_WRITE_TOOLS
+            or (tool_call["name"] in READ_TOOLS and tool_call["args"].get("head") is None
+                and tool_call["args"].get("tail") is None)}
+
+
+def __elide_stale_reads(older: List[List[BaseMessage]], recent: List[List[BaseMessage]]) -> List[List[BaseMessage]]:
+    # Walk the steps backwards, a read is stale once a later step read or wrote the whole file
+    touched_later = {path for step in recent for path in __full_content_paths(step)}
+    elided_steps = []
+    for step in reversed(older):
+        tool_calls = __tool_calls_by_id(step)
+        elided = []
+        for msg in step:
+            tool_call = tool_calls.get(msg.tool_call_id) if isinstance(msg, ToolMessage) else None
+            if tool_call is not None and tool_call["name"] in READ_TOOLS \
+                    and __touched_path(tool_call) in touched_later:
+                msg = msg.model_copy(update={"content": f"[Older read of {tool_call['args'].get('path')} elided, "
+                                                        f"a later step has its current content]"})
+            elided.append(msg)
+        touched_later |= __full_content_paths(step)
+        elided_steps.append(elided)
+    return list(reversed(elided_steps))
+
+
+def __elide_step(step: List[BaseMessage]) -> List[BaseMessage]:
+    elided = []
+    for msg in step:
+        if isinstance(msg, AIMessage) and msg.tool_calls:
+            msg = msg.model_copy(update={"tool_calls": [
+                {**tool_call, "args": {key: __elide_value(value) for key, value in tool_call["args"].items()}}
+                for tool_call in msg.tool_calls
+            ]})
+        elif isinstance(msg, ToolMessage) and isinstance(msg.content, str) and len(msg.content) > ELIDE_MIN_CHARS:
+            msg = msg.model_copy(update={"content": f"{msg.content[:ELIDE_MIN_CHARS]}\n"
+                                                    f"[{len(msg.content) - ELIDE_MIN_CHARS} more characters elided]"})
+        elided.append(msg)
+    return elided
+
+
+def __elide_value(value: Any) -> Any:
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    if len(text) <= ELIDE_MIN_CHARS:
+        return value
+    return f"[{len(text)} characters elided, read the file for its current content]"
+
+
+def __step_summary(step: List[BaseMessage]) -> List[str]:
+    lines = []
+    for msg in step:
+        if isinstance(msg, AIMessage):
+            if isinstance(msg.content, str) and msg.content.strip():
+                lines.append(f"- Noted: {msg.content.strip()[:ELIDE_MIN_CHARS]}")
+            lines += [f"- Called {tool_call['name']}"
+                      + (f" on {tool_call['args']['path']}" if isinstance(tool_call["args"].get("path"), str) else "")
+                      for tool_call in msg.tool_calls]
+        elif isinstance(msg, HumanMessage) and isinstance(msg.content, str):
+            lines.append(f"- Told: {msg.content.strip()[:ELIDE_MIN_CHARS]}")
+    return lines
+
@@ -5,13 +5,14 @@ from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from website_builder.llm_usage import usage_callback, usage_scope
 from website_builder.models.state_models import JsonDecoderState
 from website_builder.prompts.json_parser_prompt import json_parser_system_prompt
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
-json_decoder_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro")
+json_decoder_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", callbacks=[usage_callback])
 
 
 def user_message(state: JsonDecoderState) -> JsonDecoderState:
@@ -27,7 +28,7 @@ def user_message(state: JsonDecoderState) -> JsonDecoderState:
     }
 
 
-def send_message(state: JsonDecoderState) -> JsonDecoderState:
+async def send_message(state: JsonDecoderState) -> JsonDecoderState:
     last_message = state["parsed_text"][-1]
     user_input = last_message.content
 
@@ -48,7 +49,8 @@ def send_message(state: JsonDecoderState) -> JsonDecoderState:
     prompt = f"{system_prompt}\n\nJSON:\n{json_content}\nDescription:"
 
     try:
-        response = json_decoder_llm.invoke([HumanMessage(content=prompt)])
+        with usage_scope(node="json_parser"):
+            response = await json_decoder_llm.ainvoke([HumanMessage(content=prompt)])
         logger.info(f"JSON Decoder Agent: {response.content}")
     except Exception as e:
         logger.error(f"Error calling LLM: {e}")
@@ -1,20 +1,35 @@
+import asyncio
+import functools
 import logging
 
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-
-from website_builder.db.crud import find_session_by_id, add_task_manager_output, complete_session
+from langchain_core.runnables import RunnableConfig
+
+from website_builder.agents.developer_agent import completed_task_context, current_task_messages, \
+    stopped_task_context, stopped_task_record
+from website_builder.agents.task_guard import TaskWatchdog, TaskWatchdogExpired
+from website_builder.agents.task_scheduler import TaskScheduler
+from website_builder.config import DEVELOPER_TASK_PARALLELISM, DEVELOPER_TASK_MAX_STEPS, DEVELOPER_TASK_TIMEOUT, \
+    DEVELOPER_TASK_STALL_TIMEOUT
+from website_builder.db.async_crud import find_session_by_id, add_task_manager_output, complete_session
+from website_builder.db.checkpointer import task_thread_id
+from website_builder.executor import run_blocking
+from website_builder.llm_usage import usage_scope
+from website_builder.metrics import TASK_INTERVENTIONS
 from website_builder.models.state_models import OrchestratorState, RequirementsState, TaskManagerState, DeveloperState
 from website_builder.prompts.developer_prompts import developer_system_prompt
 from website_builder.prompts.requirements_prompts import requirements_system_prompt
 from website_builder.prompts.task_manager_prompts import task_manager_system_prompt
+from website_builder.tools.file_system_tools import reserve_task_files, task_file_owners
+from website_builder.workspace.archive import get_or_build_archive
 
 logger = logging.getLogger(__name__)
 
 def create_task_manager_node(task_manager_graph):
-    def task_manager_node(state: OrchestratorState) -> OrchestratorState:
+    async def task_manager_node(state: OrchestratorState) -> OrchestratorState:
         logger.info("Starting Task Management Phase...")
 
-        session = find_session_by_id(state["session_id"])
+        session = await find_session_by_id(state["session_id"])
 
         # Handle different types of requirements_output
         if isinstance(state["requirements_output"], str):
@@ -48,10 +63,11 @@ def create_task_manager_node(task_manager_graph):
 
         logger.info(f"Task manager input: {task_manager_input}")
 
-        task_result = task_manager_graph.invoke(task_manager_input)
+        with usage_scope(node="task_manager"):
+            task_result = await task_manager_graph.ainvoke(task_manager_input)
 
         logger.info(f"Task manager output: {task_result}")
-        add_task_manager_output(session.id, task_result["parsed_tasks"])
+        await add_task_manager_output(session.id, task_result["parsed_tasks"])
 
         logger.info(f"Task Management Complete - Generated {len(task_result['parsed_tasks'])} tasks")
 
@@ -64,32 +80,131 @@ def create_task_manager_node(task_manager_graph):
 
 
 def create_developer_node(developer_graph):
-    async def developer_node(state: OrchestratorState) -> OrchestratorState:
+    async def developer_node(state: OrchestratorState, config: RunnableConfig) -> OrchestratorState:
         logger.info(" Starting Development Phase...")
-
-        developer_input: DeveloperState = {
-            "parsed_tasks": state["tasks_output"],
-            "current_task_index": 0,
-            "project_status": "in_progress",
-            "developer_messages": [SystemMessage(content=developer_system_prompt())],
-            "project_context": {}
-        }
-
-        dev_result = await developer_graph.ainvoke(developer_input)
+        session_id = config["configurable"]["session_id"]
+        tracker = config["configurable"].get("progress_tracker")
+        tasks = state["tasks_output"]
+
+        async def run_task(index: int, task: dict, dependency_results: list) -> dict:
+            # A configurable of its own makes the loop a top-level run on the task's thread instead of
+            # a subgraph of this node, and carries the session id the filesystem tools are sandboxed to.
+            # The step budget stops a task long before the recursion limit, an agent step is at most two graph steps
+            task_config = {
+                "recursion_limit": 2 * DEVELOPER_TASK_MAX_STEPS + 10,
+                "configurable": {"session_id": session_id, "thread_id": task_thread_id(session_id, index)}
+            }
+            snapshot = await developer_graph.aget_state(task_config) if developer_graph.checkpointer else None
+            if snapshot is not None and snapshot.values and not snapshot.next:
+                logger.info(f"Task {task.get('id')} already finished before the build was resumed")
+                result = __task_result(task, snapshot.values)
+                if tracker is not None:
+                    tracker.task_finished(index, result.get("stopped"))
+                return result
+            if snapshot is not None and snapshot.next:
+                logger.info(f"Resuming task {task.get('id')} at {snapshot.next}")
+                task_input = None
+            else:
+                contexts = [result["context"] for result in dependency_results]
+                task_input: DeveloperState = {
+                    "parsed_tasks": [task],
+                    "current_task_index": 0,
+                    "project_status": "in_progress",
+                    "developer_messages": [SystemMessage(content=developer_system_prompt())],
+                    "project_context": {"summary": "\n".join(contexts)} if contexts else {},
+                    "context_tokens": 0,
+                    "context_messages": 0,
+                    "task_message_sent": False,
+                    "task_steps": 0,
+                    "task_message_offset": 0,
+                    "task_repeats": 0,
+                    "task_escalations": 0,
+                    "task_stop": {},
+                    "stopped_tasks": []
+                }
+
+            if tracker is not None:
+                tracker.task_started(index)
+            taken = reserve_task_files(task.get("files") or [], task_config)
+            if taken:
+                logger.warning(f"Task {task.get('id')} declares files owned by other running tasks: "
+                               f"{', '.join(str(file_path) for file_path in taken)}")
+            task_result = None
+            try:
+                with usage_scope(node="developer", task_id=task.get("id")):
+                    async with TaskWatchdog(DEVELOPER_TASK_TIMEOUT, DEVELOPER_TASK_STALL_TIMEOUT) as watchdog:
+                        # Waiting for a file another task owns is not a stall
+                        task_file_owners.start(task_config["configurable"]["thread_id"], functools.partial(
+                            asyncio.get_running_loop().call_soon_threadsafe, watchdog.progress))
+                        async for mode, chunk in developer_graph.astream(task_input, task_config,
+                                                                         stream_mode=["updates", "values"]):
+                            watchdog.progress()
+                            if mode == "values":
+                                task_result = chunk
+                            elif tracker is not None:
+                                tracker.task_update(chunk)
+            except TaskWatchdogExpired as e:
+                logger.error(f"Watchdog failed task {task.get('id')}: {e.reason}")
+                task_result = await __fail_task(developer_graph, task_config, task, task_result or task_input or {}, e)
+            finally:
+                task_file_owners.release(task_config["configurable"]["thread_id"])
+            result = __task_result(task, task_result)
+            if tracker is not None:
+                tracker.task_finished(index, result.get("stopped"))
+            logger.info(f"Task {task.get('id')} finished with status {result['status']}")
+            return result
+
+        scheduler = TaskScheduler(DEVELOPER_TASK_PARALLELISM)
+        results = await scheduler.run(tasks, run_task)
+        failed = [result["status"] for result in results if result["status"] != "completed"]
+        project_status = failed[0] if failed else "completed"
+        development_output = project_status
+        stopped = [result["stopped"] for result in results if result.get("stopped")]
+        if stopped:
+            development_output += ", " + "; ".join(
+                f"{record['id']} {record['status']}: {record['reason']}" for record in stopped)
 
         logger.info("Development Phase Complete")
 
         # Transform back to orchestrator state
         return {
             "current_phase": "development_complete",
-            "development_output": dev_result["project_status"],
-            "project_status": dev_result["project_status"]
+            "development_output": development_output,
+            "project_status": project_status
         }
 
     return developer_node
 
 
-def finalize_project_node(state: OrchestratorState) -> OrchestratorState:
+def __task_result(task: dict, task_state: dict) -> dict:
+    messages = current_task_messages(task_state)
+    # The loop runs a single task, it was stopped if the loop recorded it
+    stopped = next(iter(task_state.get("stopped_tasks", [])), None)
+    if stopped is not None:
+        return {"status": stopped["status"], "stopped": stopped, "context": stopped_task_context(task, stopped, messages)}
+    return {
+        "status": task_state["project_status"],
+        "context": completed_task_context(task, messages)
+    }
+
+
+async def __fail_task(developer_graph, task_config: dict, task: dict, task_state: dict,
+                      expired: TaskWatchdogExpired) -> dict:
+    """Record a task cancelled by the watchdog as failed, also in its checkpoint so a resumed build keeps it"""
+    TASK_INTERVENTIONS.labels("failed", expired.cause).inc()
+    update = {
+        "project_status": "failed",
+        "stopped_tasks": [stopped_task_record(task, task_state.get("task_steps", 0), "failed", expired.cause,
+                                              expired.reason)],
+        "task_stop": {}
+    }
+    if developer_graph.checkpointer:
+        # Written as the output of project_complete, so the loop counts as finished and is not resumed
+        await developer_graph.aupdate_state(task_config, update, as_node="project_complete")
+    return {"developer_messages": [], **task_state, **update}
+
+
+async def finalize_project_node(state: OrchestratorState) -> OrchestratorState:
     """Finalize the project and create summary"""
     logger.info("Finalizing Project...")
 
@@ -106,7 +221,14 @@ def finalize_project_node(state: OrchestratorState) -> OrchestratorState:
     Your website has been successfully created!
     """
 
-    complete_session(state["session_id"])
+    await complete_session(state["session_id"])
+
+    # Build the download archive once here instead of on every /zip request
+    try:
+        archive_path, _ = await run_blocking(get_or_build_archive, state["session_id"])
+        logger.info(f"Project archive ready at {archive_path}")
+    except Exception as e:
+        logger.error(f"Could not prebuild project archive: {e}")
 
     return {
         "current_phase": "complete",
@@ -3,10 +3,11 @@ import logging
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from website_builder.llm_usage import usage_callback
 from website_builder.models.state_models import RequirementsState
 from website_builder.tools.validation_tools import exit_tool
 
-requirements_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro").bind_tools([exit_tool])
+requirements_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", callbacks=[usage_callback]).bind_tools([exit_tool])
 logger = logging.getLogger(__name__)
 
 
@@ -27,8 +28,8 @@ def user_message(state: RequirementsState) -> RequirementsState:
     return {"requirements_messages": [message]}
 
 
-def send_message(state: RequirementsState) -> RequirementsState:
-    response = requirements_llm.invoke(state["requirements_messages"])
+async def send_message(state: RequirementsState) -> RequirementsState:
+    response = await requirements_llm.ainvoke(state["requirements_messages"])
     logger.info(f"Requirements Agent: {response.content}")
     return {"requirements_messages": [response]}
 
@@ -40,7 +41,7 @@ def should_continue(state: RequirementsState) -> str:
     return "yes"
 
 
-def process_single_message(state: RequirementsState) -> RequirementsState:
+async def process_single_message(state: RequirementsState) -> RequirementsState:
     """Process a single message in conversational mode for API"""
     # If there's a user_input in state, add it as a HumanMessage
     if "user_input" in state and state["user_input"]:
@@ -52,7 +53,7 @@ def process_single_message(state: RequirementsState) -> RequirementsState:
         messages = state["requirements_messages"]
 
     # Get agent response
-    response = requirements_llm.invoke(messages)
+    response = await requirements_llm.ainvoke(messages)
     logger.info(f"Requirements Agent: {response.content}")
 
     # Add agent response to messages
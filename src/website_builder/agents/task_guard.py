@@ -0,0 +1,98 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+ESCALATION_MESSAGE = ("You have sent the same response {repeats} times in a row and the task is not progressing. "
+                      "Stop repeating it: read the files you need, write the missing ones, or call next_task "
+                      "with a summary if every file of the task is done.")
+NO_TOOL_CALL_MESSAGE = ("Your last response called no tool. Continue the task with the tools, "
+                        "or call next_task with a summary if every file of the task is done.")
+
+
+class TaskWatchdogExpired(Exception):
+    """Raised when the watchdog cancels a developer task loop"""
+
+    def __init__(self, cause: str, reason: str):
+        super().__init__(reason)
+        self.cause = cause
+        self.reason = reason
+
+
+def response_signature(message: AIMessage) -> str:
+    """What a developer response says and does, two responses with the same signature are identical"""
+    return json.dumps([message.content, [[tool_call["name"], tool_call["args"]] for tool_call in message.tool_calls]],
+                      sort_keys=True, default=str)
+
+
+def repeat_streak(previous: Optional[AIMessage], response: AIMessage, streak: int) -> int:
+    """Identical responses in a row once the response is added after the previous one"""
+    if previous is not None and response_signature(previous) == response_signature(response):
+        return streak + 1
+    return 1
+
+
+def task_step_verdict(state: Dict[str, Any], max_steps: int, repeat_limit: int,
+                      max_escalations: int) -> Tuple[str, str, str]:
+    """Whether the current task may take another agent step: continue, escalate or skip, with a cause and reason.
+
+    A task is skipped once it used its step budget. A task whose last
+    ``repeat_limit`` responses were identical is escalated, told that it
+    loops, at most ``max_escalations`` times and skipped after that.
+    """
+    task_steps = state.get("task_steps", 0)
+    if task_steps >= max_steps:
+        return "skip", "step_budget", f"step budget of {max_steps} agent steps exhausted"
+    repeats = state.get("task_repeats", 0)
+    if repeats >= repeat_limit:
+        if state.get("task_escalations", 0) < max_escalations:
+            return "escalate", "repeated_response", f"{repeats} identical responses in a row"
+        return "skip", "repeated_response", f"{repeats} identical responses in a row despite escalation"
+    return "continue", "", ""
+
+
+def escalation_message(repeats: int) -> HumanMessage:
+    return HumanMessage(content=ESCALATION_MESSAGE.format(repeats=repeats))
+
+
+class TaskWatchdog:
+    """Cancels the block it guards once it ran ``timeout`` seconds or made no progress for ``stall_timeout``.
+
+    The guarded code calls progress after every finished step, and the block
+    then raises TaskWatchdogExpired with the cause, ``wall_clock`` or
+    ``stall``. The wall clock starts when the block is entered, so a resumed
+    task gets its budget again.
+    """
+
+    def __init__(self, timeout: float, stall_timeout: float):
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self._started = 0.0
+        self._last_progress = 0.0
+        self._timeout: Optional[asyncio.Timeout] = None
+
+    async def __aenter__(self):
+        self._timeout = asyncio.timeout(None)
+        await self._timeout.__aenter__()
+        self._started = asyncio.get_running_loop().time()
+        self.progress()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            return await self._timeout.__aexit__(exc_type, exc, tb)
+        except TimeoutError:
+            if self.__wall_clock_deadline() <= self.__stall_deadline():
+                raise TaskWatchdogExpired("wall_clock", f"wall-clock budget of {self.timeout:g}s exceeded") from None
+            raise TaskWatchdogExpired("stall", f"no agent step finished for {self.stall_timeout:g}s") from None
+
+    def progress(self):
+        self._last_progress = asyncio.get_running_loop().time()
+        self._timeout.reschedule(min(self.__wall_clock_deadline(), self.__stall_deadline()))
+
+    def __wall_clock_deadline(self) -> float:
+        return self._started + self.timeout
+
+    def __stall_deadline(self) -> float:
+        return self._last_progress + self.stall_timeout
@@ -4,15 +4,16 @@ import logging
 from json_repair import repair_json
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from website_builder.llm_usage import usage_callback
 from website_builder.models.state_models import TaskManagerState
 
 logger = logging.getLogger(__name__)
 
-task_manager_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro")
+task_manager_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", callbacks=[usage_callback])
 
 
-def task_manager_send(state: TaskManagerState) -> TaskManagerState:
-    response = task_manager_llm.invoke(state["tasks_messages"])
+async def task_manager_send(state: TaskManagerState) -> TaskManagerState:
+    response = await task_manager_llm.ainvoke(state["tasks_messages"])
     return {"tasks_messages": [response]}
 
 
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+logger = logging.getLogger(__name__)
+
+TASK_ID_PATTERN = re.compile(r"[A-Za-z0-9_.\-]+")
+
+
+def task_dependencies(tasks: List[Dict[str, Any]]) -> List[Set[int]]:
+    """Indexes of the tasks each task depends on.
+
+    The task manager writes dependencies as free text ("None", "TASK_001",
+    "TASK_001, TASK_003") or as a list, ids that match no task are ignored.
+    """
+    index_by_id = {}
+    for index, task in enumerate(tasks):
+        index_by_id.setdefault(str(task.get("id")), index)
+    dependencies = []
+    for index, task in enumerate(tasks):
+        declared = task.get("dependencies") or []
+        if not isinstance(declared, list):
+            declared = TASK_ID_PATTERN.findall(str(declared))
+        dependencies.append({index_by_id[str(task_id)] for task_id in declared if str(task_id) in index_by_id} - {index})
+    return dependencies
+
+
+def task_files(task: Dict[str, Any]) -> Set[str]:
+    return {os.path.normpath(path) for path in task.get("files") or [] if isinstance(path, str)}
+
+
+class TaskScheduler:
+    """Runs tasks as soon as the tasks they depend on are done, at most ``parallelism`` at a time.
+
+    A task also waits while a running task declares one of its files, so two
+    tasks that declare the same file never run at once, the filesystem tools
+    serialize the writes of files they did not declare. Waiting tasks start in list
+    order, and a dependency cycle is broken by starting the first waiting task
+    once nothing else can run.
+    """
+
+    def __init__(self, parallelism: int):
+        self.parallelism = max(1, parallelism)
+
+    async def run(self, tasks: List[Dict[str, Any]],
+                  run_task: Callable[[int, Dict[str, Any], List[Any]], Awaitable[Any]]) -> List[Any]:
+        """Run every task, ``run_task`` gets the task's index, the task and the results of its dependencies"""
+        dependencies = task_dependencies(tasks)
+        files = [task_files(task) for task in tasks]
+        results: Dict[int, Any] = {}
+        waiting = list(range(len(tasks)))
+        running: Dict[asyncio.Task, int] = {}
+        locked_files: Set[str] = set()
+        try:
+            while waiting or running:
+                for index in self.__startable(waiting, dependencies, files, results, locked_files, len(running)):
+                    waiting.remove(index)
+                    locked_files |= files[index]
+                    dependency_results = [results[dependency] for dependency in sorted(dependencies[index])
+                                          if dependency in results]
+                    running[asyncio.create_task(run_task(index, tasks[index], dependency_results))] = index
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    index = running.pop(finished)
+                    locked_files -= files[index]
+                    results[index] = finished.result()
+        finally:
+            for pending in running:
+                pending.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+        return [results[index] for index in range(len(tasks))]
+
+    def __startable(self, waiting: List[int], dependencies: List[Set[int]], files: List[Set[str]],
+                    results: Dict[int, Any], locked_files: Set[str], running: int) -> List[int]:
+        startable = []
+        claimed = set(locked_files)
+        for index in waiting:
+            if running + len(startable) >= self.parallelism:
+                break
+            if dependencies[index] <= results.keys() and not files[index] & claimed:
+                startable.append(index)
+                claimed |= files[index]
+        if not startable and not running and waiting:
+            logger.warning(f"Dependency cycle between tasks {waiting}, starting task {waiting[0]} anyway")
+            startable.append(waiting[0])
+        return startable
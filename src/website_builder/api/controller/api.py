@@ -1,15 +1,31 @@
 import logging
 import sys
+import time
+from contextlib import asynccontextmanager
 from typing import Dict, Any
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
+from website_builder.api.service.event_service import service_stream_events
 from website_builder.api.service.json_service import service_parse_json
-from website_builder.api.service.message_service import service_send_chat_message, service_start_requirements_chat
-from website_builder.api.service.status_service import service_poll, service_health_check
+from website_builder.api.service.message_service import service_send_chat_message, service_start_requirements_chat, \
+    service_stream_chat_message, service_stream_requirements_chat
+from website_builder.api.service.status_service import service_poll, service_health_check, service_readiness_check, \
+    service_summary_cache_metrics, service_metrics
+from website_builder.api.service.usage_service import service_session_usage
 from website_builder.api.service.zip_service import service_zip_folder
-from website_builder.db.database import init_db
+from website_builder.db.async_crud import migrate_legacy_session_states
+from website_builder.db.database import init_async_db, async_db
+from website_builder.db.session_cache import session_state_cache
+from website_builder.graphs.registry import graph_registry
+from website_builder.jobs.build_runner import build_job_runner
+from website_builder.jobs.output_compactor import output_compactor
+from website_builder.jobs.retention_sweeper import retention_sweeper
+from website_builder.jobs.usage_recorder import usage_recorder
+from website_builder.mcp.file_system import mcp_server_pool
+from website_builder.metrics import HTTP_REQUEST_SECONDS
+from website_builder.tracing import tracer
 
 load_dotenv()
 
@@ -22,23 +38,80 @@ logging.basicConfig(
 logging.getLogger("langchain_google_genai._function_utils").setLevel(logging.ERROR)
 logging.getLogger("grpc._cython.cygrpc").setLevel(logging.INFO)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_async_db()
+    migrated = await migrate_legacy_session_states()
+    if migrated:
+        logger.info(f"Moved the conversations of {migrated} sessions into session_message")
+    graph_registry.start_warm_up()
+    await session_state_cache.start()
+    await usage_recorder.start()
+    await output_compactor.start()
+    await build_job_runner.start()
+    await retention_sweeper.start()
+    yield
+    await retention_sweeper.stop()
+    await build_job_runner.stop()
+    await output_compactor.stop()
+    await session_state_cache.stop()
+    await usage_recorder.stop()
+    await graph_registry.stop_warm_up()
+    await mcp_server_pool.stop()
+    await async_db.dispose()
+
+
 app = FastAPI(
     title="Website Builder API",
     description="This API endpoint receives user inputs and processes them to build websites using AI agents.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 logger = logging.getLogger(__name__)
 
 
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    started = time.perf_counter()
+    with tracer.start_as_current_span(request.method, attributes={"http.method": request.method}) as span:
+        response = await call_next(request)
+        # Label by route template so session ids do not create a series per session
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(request.method, endpoint, response.status_code).observe(
+            time.perf_counter() - started)
+        span.update_name(f"{request.method} {endpoint}")
+        span.set_attributes({"http.route": endpoint, "http.status_code": response.status_code})
+        if "session_id" in request.path_params:
+            span.set_attribute("session.id", request.path_params["session_id"])
+    return response
+
+
 @app.get("/health")
 async def health_check():
     return service_health_check()
 
 
+@app.get("/ready")
+async def readiness_check():
+    return service_readiness_check()
+
+
+@app.get("/metrics")
+async def metrics():
+    return service_metrics()
+
+
+@app.get("/metrics/summary-cache")
+async def summary_cache_metrics():
+    return service_summary_cache_metrics()
+
+
 @app.post("/chat/start")
 async def start_requirements_chat(user_input: Dict[str, Any]):
-    return service_start_requirements_chat(user_input)
+    return await service_start_requirements_chat(user_input)
 
 
 @app.post("/chat/message")
@@ -46,24 +119,43 @@ async def send_chat_message(message_data: Dict[str, Any]):
     return await service_send_chat_message(message_data)
 
 
+@app.post("/chat/start/stream")
+async def stream_requirements_chat(user_input: Dict[str, Any]):
+    return await service_stream_requirements_chat(user_input)
+
+
+@app.post("/chat/message/stream")
+async def stream_chat_message(message_data: Dict[str, Any]):
+    return await service_stream_chat_message(message_data)
+
+
 @app.get("/poll/{session_id}")
-def poll(session_id: str):
-    return service_poll(session_id)
+async def poll(session_id: str):
+    return await service_poll(session_id)
+
+
+@app.get("/events/{session_id}")
+async def stream_events(session_id: str):
+    return await service_stream_events(session_id)
+
+
+@app.get("/usage/{session_id}")
+async def session_usage(session_id: str):
+    return await service_session_usage(session_id)
 
 
 @app.get("/zip/{session_id}")
-def zip_folder(session_id: str):
-    return service_zip_folder(session_id)
+async def zip_folder(session_id: str, request: Request):
+    return await service_zip_folder(session_id, request.headers.get("if-none-match"))
 
 
 @app.post("/parse")
 async def parse_json(json_data: Dict[str, Any]):
-    return service_parse_json(json_data)
+    return await service_parse_json(json_data)
 
 
 def main():
     import uvicorn
-    init_db()
     uvicorn.run("website_builder.api.controller.api:app", host="0.0.0.0", port=8080)
 
 
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import logging
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from website_builder.db.async_crud import find_session_by_id, find_latest_build_job
+from website_builder.jobs.build_events import build_event_broker
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_INTERVAL_SECONDS = 15
+FINISHED_JOB_STATUSES = ("done", "failed")
+
+
+async def service_stream_events(session_id: str):
+    logger.info(f"Opening build event stream for session {session_id}")
+    try:
+        session = await find_session_by_id(session_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    queue = build_event_broker.subscribe(session_id)
+    if queue.empty():
+        # Nothing published by this process yet, start from what the database knows
+        queue.put_nowait(await __snapshot_from_database(session))
+
+    return StreamingResponse(
+        __event_stream(session_id, queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def __event_stream(session_id: str, queue: asyncio.Queue):
+    try:
+        while True:
+            try:
+                snapshot = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+            if snapshot.get("completed"):
+                break
+    finally:
+        build_event_broker.unsubscribe(session_id, queue)
+        logger.info(f"Closed build event stream for session {session_id}")
+
+
+async def __snapshot_from_database(session):
+    job = await find_latest_build_job(session.id)
+    if job is None:
+        return {
+            "session_id": session.id,
+            "phase": "complete" if session.status == "completed" else "requirements",
+            "job_id": None,
+            "job_status": None,
+            "files_written": [],
+            "completed": session.status == "completed"
+        }
+    return {
+        "session_id": session.id,
+        "phase": "complete" if job.status == "done" else job.status,
+        "job_id": job.id,
+        "job_status": job.status,
+        "files_written": [],
+        "completed": job.status in FINISHED_JOB_STATUSES,
+        "error": job.error
+    }
@@ -11,7 +11,7 @@ from website_builder.models.state_models import JsonDecoderState
 logger = logging.getLogger(__name__)
 
 
-def service_parse_json(json_data: Dict[str, Any]):
+async def service_parse_json(json_data: Dict[str, Any]):
     logger.info(f"JSON Data to be parsed: {json_data}")
     try:
         logger.info(f"Received JSON: {json_data}")
@@ -21,7 +21,7 @@ def service_parse_json(json_data: Dict[str, Any]):
             parsed_input_JSON={},
             parsed_text=[HumanMessage(content=json_string)]
         )
-        result_state = send_message(initial_state)
+        result_state = await send_message(initial_state)
 
         if result_state["parsed_text"] and len(result_state["parsed_text"]) > 0:
             last_message = result_state["parsed_text"][-1]
@@ -1,15 +1,17 @@
+import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from fastapi import HTTPException
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-
-from website_builder.db.crud import find_session_by_id, deserialize_state, update_session_state, \
-    add_requirements_gatherer_output, initialize_session, reactivate_session
-from website_builder.db.database_models import Session
-from website_builder.graphs.orchestrator_graph import build_orchestrator_graph
-from website_builder.graphs.requirements_graph import build_single_step_requirements_graph
-from website_builder.models.state_models import OrchestratorState, RequirementsState
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, SystemMessage
+
+from website_builder.db.async_crud import initialize_session, reactivate_session_if_completed
+from website_builder.db.session_cache import session_state_cache, CachedSession
+from website_builder.graphs.registry import graph_registry
+from website_builder.jobs.build_runner import build_job_runner
+from website_builder.llm_usage import usage_scope
+from website_builder.models.state_models import RequirementsState
 from website_builder.prompts.requirements_prompts import requirements_system_prompt
 
 logger = logging.getLogger(__name__)
@@ -18,20 +20,13 @@ logger = logging.getLogger(__name__)
 async def service_send_chat_message(message_data: Dict[str, Any]):
     logger.info(f"Request body: {message_data}")
     try:
-        session_id = message_data.get("session_id", "")
-        user_message = message_data.get("user_input", "")
-        if not session_id or not user_message:
-            raise HTTPException(status_code=400, detail="session_id and user_input are required.")
-        session = find_session_by_id(session_id)
-        if session.status == 'completed':
-            reactivate_session(session_id)
-        result = __send_requirement_gathering_message(session, user_message)
-        is_complete, agent_response = __check_if_completed(result)
-        if is_complete:
-            await __handle_completed_requirements(session)
-        response = {
-            "agent_message": agent_response,
-        }
+        session_id, user_message = __chat_message_input(message_data)
+        async with session_state_cache.session(session_id) as entry:
+            current_state = await __prepare_chat_message(entry, user_message)
+            requirements_graph = graph_registry.get_requirements_graph()
+            with usage_scope(session_id=session_id, node="requirements"):
+                result = await requirements_graph.ainvoke(current_state)
+            response = await __complete_turn(entry, result)
         logger.info(f"Response body: {response}")
         return response
     except Exception as e:
@@ -39,28 +34,19 @@ async def service_send_chat_message(message_data: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
 
-def service_start_requirements_chat(user_input: Dict[str, Any]):
+async def service_start_requirements_chat(user_input: Dict[str, Any]):
     logger.info(f"Request body: {user_input}")
     try:
-        user_prompt = user_input.get("user_input", "")
-        if not user_prompt:
-            raise HTTPException(status_code=400, detail="user_input field is required.")
-        session = initialize_session()
-        requirements_state: RequirementsState = {
-            "requirements_messages": [SystemMessage(content=requirements_system_prompt())],
-            "requirements_data": "",
-            "user_input": user_prompt
-        }
-        requirements_graph = build_single_step_requirements_graph()
-        result = requirements_graph.invoke(requirements_state)
-        logger.info(f"Requirements result: {result}")
-        update_session_state(session.id, result)
-        last_message = result["requirements_messages"][-1]
-        agent_response = last_message.content if hasattr(last_message, 'content') else str(last_message)
-        response = {
-            "session_id": session.id,
-            "agent_message": agent_response,
-        }
+        session_id, requirements_state = await __prepare_requirements_chat(user_input)
+        async with session_state_cache.session(session_id) as entry:
+            requirements_graph = graph_registry.get_requirements_graph()
+            with usage_scope(session_id=session_id, node="requirements"):
+                result = await requirements_graph.ainvoke(requirements_state)
+            logger.info(f"Requirements result: {result}")
+            response = {
+                "session_id": session_id,
+                **await __complete_turn(entry, result),
+            }
         logger.info(f"Response body: {response}")
         return response
     except Exception as e:
@@ -68,14 +54,130 @@ def service_start_requirements_chat(user_input: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=f"Error starting conversation: {str(e)}")
 
 
-def __send_requirement_gathering_message(session: Session, user_message: str):
-    current_state = deserialize_state(session.state)
-    current_state["requirements_messages"].append(HumanMessage(content=user_message))
+async def service_stream_chat_message(message_data: Dict[str, Any]):
+    """Streaming variant of service_send_chat_message, emits the agent reply token by token"""
+    logger.info(f"Request body: {message_data}")
+    try:
+        session_id, user_message = __chat_message_input(message_data)
+        # Fail before the stream starts if the session does not exist
+        await session_state_cache.load(session_id)
+    except Exception as e:
+        logger.error(f"Chat message error: {e}")
+        raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
+    return __streaming_response(session_id, user_message=user_message)
+
+
+async def service_stream_requirements_chat(user_input: Dict[str, Any]):
+    """Streaming variant of service_start_requirements_chat, emits the agent reply token by token"""
+    logger.info(f"Request body: {user_input}")
+    try:
+        session_id, requirements_state = await __prepare_requirements_chat(user_input)
+    except Exception as e:
+        logger.error(f"Chat start error: {e}")
+        raise HTTPException(status_code=500, detail=f"Error starting conversation: {str(e)}")
+    return __streaming_response(session_id, initial_state=requirements_state)
+
+
+async def __prepare_requirements_chat(user_input: Dict[str, Any]):
+    user_prompt = user_input.get("user_input", "")
+    if not user_prompt:
+        raise HTTPException(status_code=400, detail="user_input field is required.")
+    session = await initialize_session()
+    session_state_cache.add(session.id)
+    requirements_state: RequirementsState = {
+        "requirements_messages": [SystemMessage(content=requirements_system_prompt())],
+        "requirements_data": "",
+        "user_input": user_prompt
+    }
+    return session.id, requirements_state
+
+
+def __chat_message_input(message_data: Dict[str, Any]):
+    session_id = message_data.get("session_id", "")
+    user_message = message_data.get("user_input", "")
+    if not session_id or not user_message:
+        raise HTTPException(status_code=400, detail="session_id and user_input are required.")
+    return session_id, user_message
+
+
+async def __prepare_chat_message(entry: CachedSession, user_message: str) -> RequirementsState:
+    # The build marks sessions completed outside the cache, so the status is only changed in the database
+    await reactivate_session_if_completed(entry.session_id)
+    # Copy the cached state, it is only replaced once the turn succeeds
+    current_state = dict(entry.state)
+    current_state["requirements_messages"] = list(entry.state["requirements_messages"]) + [
+        HumanMessage(content=user_message)]
     current_state["user_input"] = user_message
-    requirements_graph = build_single_step_requirements_graph()
-    result = requirements_graph.invoke(current_state)
-    update_session_state(session.id, result)
-    return result
+    return current_state
+
+
+async def __complete_turn(entry: CachedSession, result: RequirementsState):
+    """Persist the turn and queue the website build once the requirements are complete"""
+    await session_state_cache.save_turn(entry, result)
+    is_complete, agent_response = __check_if_completed(result)
+    response = {
+        "agent_message": agent_response,
+    }
+    if is_complete:
+        logger.info(f"Requirements complete for session {entry.session_id}, queueing website build...")
+        job = await build_job_runner.enqueue(entry.session_id)
+        response["build_job_id"] = job.id
+        response["build_status"] = job.status
+    return response
+
+
+def __streaming_response(session_id: str, user_message: Optional[str] = None,
+                         initial_state: Optional[RequirementsState] = None):
+    return StreamingResponse(
+        __stream_turn(session_id, user_message, initial_state),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def __stream_turn(session_id: str, user_message: Optional[str], initial_state: Optional[RequirementsState]):
+    # A new conversation starts from initial_state and tells the client its session id first
+    include_session_id = initial_state is not None
+    if include_session_id:
+        yield __sse_event("session", {"session_id": session_id})
+    try:
+        async with session_state_cache.session(session_id) as entry:
+            state = initial_state if include_session_id else await __prepare_chat_message(entry, user_message)
+            requirements_graph = graph_registry.get_requirements_graph()
+            result = None
+            with usage_scope(session_id=session_id, node="requirements"):
+                async for mode, chunk in requirements_graph.astream(state, stream_mode=["messages", "values"]):
+                    if mode == "values":
+                        result = chunk
+                        continue
+                    message_chunk, _ = chunk
+                    if not isinstance(message_chunk, AIMessageChunk):
+                        continue
+                    token = __chunk_text(message_chunk.content)
+                    if token:
+                        yield __sse_event("token", {"content": token})
+
+            response = await __complete_turn(entry, result)
+        if include_session_id:
+            response = {"session_id": session_id, **response}
+        logger.info(f"Response body: {response}")
+        yield __sse_event("done", response)
+    except Exception as e:
+        logger.error(f"Chat stream error: {e}")
+        yield __sse_event("error", {"detail": f"Error processing message: {str(e)}"})
+
+
+def __chunk_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content
+    )
+
+
+def __sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 def __check_if_completed(result: RequirementsState):
@@ -84,44 +186,3 @@ def __check_if_completed(result: RequirementsState):
     return (isinstance(last_message, AIMessage) and
             hasattr(last_message, 'tool_calls') and
             last_message.tool_calls), agent_response
-
-
-async def __handle_completed_requirements(session: Session):
-    logger.info(f"Requirements complete for session {session.id}, proceeding to website building...")
-    requirements_result = deserialize_state(session.state)
-    orchestrator = await build_orchestrator_graph()
-    initial_state: OrchestratorState = {
-        "user_input": "",
-        "current_phase": "requirements_complete",
-        "requirements_output": requirements_result["requirements_messages"],
-        "tasks_output": [],
-        "development_output": "",
-        "project_status": "starting",
-        "final_result": "",
-        "session_id": session.id
-    }
-    add_requirements_gatherer_output(session.id, requirements_result["requirements_messages"])
-    logger.info("Starting orchestrator execution with completed requirements...")
-    final_state = None
-    async for step in orchestrator.astream(initial_state, config={"recursion_limit": 100000, "debug": True}):
-        for node_name, state_update in step.items():
-            logger.info(f"Phase: {node_name}")
-            if "current_phase" in state_update:
-                logger.info(f"Current Phase: {state_update['current_phase']}")
-            if "final_result" in state_update and state_update["final_result"]:
-                logger.info(f"Result: {state_update['final_result']}")
-            final_state = state_update
-
-    logger.info("Orchestrator execution completed")
-
-    if not final_state:
-        raise HTTPException(status_code=500, detail="No final state received from orchestrator")
-
-    return {
-        "status": "success",
-        "message": "Requirements complete - proceeding to website creation",
-        "final_result": final_state.get("final_result", ""),
-        "project_status": final_state.get("project_status", "unknown"),
-        "current_phase": final_state.get("current_phase", "unknown"),
-        "auto_completed": True
-    }
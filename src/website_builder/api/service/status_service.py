@@ -1,6 +1,11 @@
 import logging
 
-from website_builder.db.crud import find_session_by_id
+from fastapi.responses import JSONResponse, Response
+
+from website_builder.db.async_crud import find_session_by_id, find_latest_build_job
+from website_builder.db.crud import summary_cache_stats
+from website_builder.graphs.registry import graph_registry
+from website_builder.metrics import metrics_response
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +24,39 @@ def service_health_check():
             "version": "1.0.0"
         }
 
-def service_poll(session_id: str):
+def service_readiness_check():
+    response = {
+        "status": "ready" if graph_registry.ready else "warming_up",
+        "graph_compile_ms": graph_registry.compile_timings_ms,
+        "error": graph_registry.warm_up_error
+    }
+    return JSONResponse(response, status_code=200 if graph_registry.ready else 503)
+
+def service_metrics():
+    body, content_type = metrics_response()
+    return Response(content=body, media_type=content_type)
+
+def service_summary_cache_metrics():
+    return summary_cache_stats.as_dict()
+
+async def service_poll(session_id: str):
     logger.info(f"Polling session status for {session_id}")
-    session = find_session_by_id(session_id)
+    session = await find_session_by_id(session_id)
+    job = await find_latest_build_job(session_id)
     response = {
-        "status": session.status
+        "status": session.status,
+        "build": __serialize_build_job(job) if job else None
     }
     logger.info(f"Polling response: {response}")
     return response
+
+
+def __serialize_build_job(job):
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "error": job.error
+    }
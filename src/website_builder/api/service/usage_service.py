@@ -0,0 +1,41 @@
+import logging
+from typing import Any, Dict, List
+
+from website_builder.db.async_crud import find_session_by_id, find_session_usage
+from website_builder.jobs.usage_recorder import usage_recorder
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = ("calls", "input_tokens", "output_tokens", "latency_ms", "cost_usd")
+
+
+async def service_session_usage(session_id: str):
+    logger.info(f"Reporting LLM usage of session {session_id}")
+    session = await find_session_by_id(session_id)
+    try:
+        # Include the calls made since the last periodic flush
+        await usage_recorder.flush()
+    except Exception as e:
+        logger.error(f"Flushing LLM usage failed: {e}")
+    rows = await find_session_usage(session.id)
+    return {
+        "session_id": session.id,
+        "total": __sum_usage(rows),
+        "by_node": __group_usage(rows, lambda row: row.node),
+        "by_task": __group_usage([row for row in rows if row.task_id], lambda row: row.task_id),
+        "by_model": __group_usage(rows, lambda row: row.model)
+    }
+
+
+def __group_usage(rows: List[Any], key) -> Dict[str, Dict[str, Any]]:
+    groups: Dict[str, List[Any]] = {}
+    for row in rows:
+        groups.setdefault(key(row), []).append(row)
+    return {name: __sum_usage(group) for name, group in groups.items()}
+
+
+def __sum_usage(rows: List[Any]) -> Dict[str, Any]:
+    usage = {field: sum(getattr(row, field) or 0 for row in rows) for field in USAGE_FIELDS}
+    usage["latency_ms"] = round(usage["latency_ms"], 1)
+    usage["cost_usd"] = round(usage["cost_usd"], 6)
+    return usage
@@ -1,43 +1,45 @@
-import io
 import logging
-import os
-import zipfile
+from typing import Optional
 
 from fastapi import HTTPException, Response
+from fastapi.responses import FileResponse
 
-from website_builder.db.crud import find_session_by_id
+from website_builder.db.async_crud import find_session_by_id
+from website_builder.executor import run_blocking
+from website_builder.workspace.archive import get_or_build_archive, find_archive
 
 logger = logging.getLogger(__name__)
 
-def service_zip_folder(session_id: str):
+async def service_zip_folder(session_id: str, if_none_match: Optional[str] = None):
     logger.info(f"Zipping generated files for session {session_id}")
-    session = find_session_by_id(session_id)
-    if session.status != "completed":
+    session = await find_session_by_id(session_id)
+    if session.status not in ("completed", "expired"):
         raise HTTPException(detail="Session is not completed", status_code=400)
-    
-    project_path = f"./website_project/{session_id}"
-    
-    # Check if the project directory exists
-    if not os.path.exists(project_path):
-        raise HTTPException(detail="Project directory not found", status_code=404)
-    
-    zip_buffer = io.BytesIO()
+
     try:
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(project_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    archive_name = os.path.relpath(file_path, project_path)
-                    zf.write(file_path, archive_name)
-        
-        zip_buffer.seek(0)
-        response = Response(zip_buffer.getvalue(),
-                        headers={"Content-Disposition": f"attachment; filename={session_id}.zip"},
-                        media_type="application/zip")
-        logger.info(f"Website zipped successfully for session {session_id}")
-        return response
+        if session.status == "expired":
+            # Only the archive kept by the retention sweeper is left of an expired session
+            archive = await run_blocking(find_archive, session_id)
+            if archive is None:
+                raise FileNotFoundError(f"No archive kept for expired session {session_id}")
+            archive_path, digest = archive
+        else:
+            archive_path, digest = await run_blocking(get_or_build_archive, session_id)
+    except FileNotFoundError:
+        raise HTTPException(detail="Project directory not found", status_code=404)
     except Exception as e:
         logger.error(f"Error zipping generated files for session {session_id}")
         raise HTTPException(detail=f"Error in processing data: {str(e)}", status_code=500)
-    finally:
-        zip_buffer.close()
+
+    etag = f'"{digest}"'
+    if if_none_match is not None and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    logger.info(f"Serving archive {archive_path} for session {session_id}")
+    # FileResponse streams from disk and answers Range/If-Range requests itself
+    return FileResponse(
+        archive_path,
+        media_type="application/zip",
+        filename=f"{session_id}.zip",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
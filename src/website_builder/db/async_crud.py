@@ -0,0 +1,457 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from langchain_core.messages import HumanMessage
+from sqlalchemy import select, func, update, delete, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from website_builder.db.crud import serialize_list, summarization_prompt, split_state, \
+    build_state, session_message_row, deserialize_state, append_output_values, output_tail, render_output, \
+    next_output_chunk, summarization_llm, summary_cache_key, summary_cache_entry, summary_cache_eviction, \
+    summary_cache_stats, SUMMARY_FANOUT
+from website_builder.config import SUMMARY_CACHE_MAX_ENTRIES
+from website_builder.db.database import AsyncDb_session
+from website_builder.db.database_models import Session, BuildJob, SessionMessage, OutputSummary, SummaryCacheEntry, \
+    LlmUsage, STATE_VERSION
+from website_builder.executor import run_blocking
+from website_builder.llm_usage import usage_scope
+
+
+async def summarize_content_with_llm(content: str, content_type: str) -> str:
+    """Summarize content using LLM, reusing cached summaries of identical content.
+
+    Errors are raised rather than replaced by truncated content, a stored
+    summary is never recomputed so it must not hold a failure.
+    """
+    key = summary_cache_key(content, content_type)
+    cached = await find_cached_summary(key)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    with usage_scope(node="summarization"):
+        response = await summarization_llm().ainvoke([HumanMessage(content=summarization_prompt(content, content_type))])
+    latency_ms = (time.perf_counter() - started) * 1000
+    summary_cache_stats.record_miss(latency_ms)
+    await store_cached_summary(key, content_type, response.content, latency_ms)
+    return response.content
+
+
+async def find_cached_summary(key: str) -> Optional[str]:
+    async with AsyncDb_session() as db:
+        entry = await db.get(SummaryCacheEntry, key)
+        if entry is None:
+            return None
+        entry.hits += 1
+        entry.last_used_at = datetime.now(timezone.utc)
+        await db.commit()
+        summary_cache_stats.record_hit(entry.latency_ms)
+        return entry.summary
+
+
+async def store_cached_summary(key: str, content_type: str, summary: str, latency_ms: float):
+    async with AsyncDb_session() as db:
+        try:
+            await db.merge(summary_cache_entry(key, content_type, summary, latency_ms))
+            excess = await db.scalar(select(func.count()).select_from(SummaryCacheEntry)) - SUMMARY_CACHE_MAX_ENTRIES
+            if excess > 0:
+                await db.execute(summary_cache_eviction(excess))
+            await db.commit()
+        except IntegrityError:
+            # Another writer cached the same content first
+            await db.rollback()
+
+
+async def __get_session(db: AsyncSession, session_id: str) -> Session:
+    session = await db.scalar(select(Session).where(Session.id == session_id))
+    if not session:
+        raise ValueError("session not found")
+    return session
+
+
+async def __get_build_job(db: AsyncSession, job_id: str) -> BuildJob:
+    job = await db.scalar(select(BuildJob).where(BuildJob.id == job_id))
+    if not job:
+        raise ValueError("build job not found")
+    return job
+
+
+async def initialize_session() -> Session:
+    async with AsyncDb_session() as db:
+        session = Session()
+        db.add(session)
+        await db.commit()
+        return session
+
+
+async def find_session_by_id(session_id: str) -> Session:
+    async with AsyncDb_session() as db:
+        return await __get_session(db, session_id)
+
+
+async def add_requirements_gatherer_output(session_id: str, requirements_gatherer_output: Any) -> Session:
+    return await __append_output(session_id, Session.requirement_gatherer_output,
+                                 serialize_list(requirements_gatherer_output))
+
+
+async def add_task_manager_output(session_id: str, task_manager_output: Any) -> Session:
+    return await __append_output(session_id, Session.task_manager_output, serialize_list(task_manager_output))
+
+
+async def __append_output(session_id: str, column, new_content: str) -> Session:
+    async with AsyncDb_session() as db:
+        result = await db.execute(
+            update(Session)
+            .where(Session.id == session_id)
+            .values(append_output_values(column, new_content))
+        )
+        if result.rowcount == 0:
+            raise ValueError("session not found")
+        await db.commit()
+        return await __get_session(db, session_id)
+
+
+async def find_sessions_to_compact(max_length: int) -> List[str]:
+    """Sessions with an output over max_length, unless compacting found nothing left since their last append"""
+    async with AsyncDb_session() as db:
+        result = await db.scalars(
+            select(Session.id).where(
+                or_(
+                    func.length(Session.requirement_gatherer_output) > max_length,
+                    func.length(Session.task_manager_output) > max_length
+                ),
+                or_(Session.compacted_version.is_(None), Session.compacted_version != Session.outputs_version)
+            )
+        )
+        return list(result)
+
+
+async def compact_session_outputs(session_id: str, max_length: int) -> Optional[bool]:
+    """Run one compaction step with a single, bounded LLM call.
+
+    A step either merges SUMMARY_FANOUT same-level summaries into one of the
+    next level, or summarizes the oldest max_length characters of an output's
+    unsummarized tail. Summaries are stored and never recomputed. The LLM call
+    runs outside any transaction and the result is only written if no output
+    was appended meanwhile. Returns None when there is nothing to compact,
+    which is recorded until the next append, and False when the row changed
+    under the compactor.
+    """
+    async with AsyncDb_session() as db:
+        session = await __get_session(db, session_id)
+        roots = list(await db.scalars(
+            select(OutputSummary)
+            .where(OutputSummary.session_id == session_id, OutputSummary.parent_id.is_(None))
+            .order_by(OutputSummary.level.desc(), OutputSummary.id)
+        ))
+
+    for column, content_type in ((Session.requirement_gatherer_output, "requirements gatherer"),
+                                 (Session.task_manager_output, "task manager")):
+        value = getattr(session, column.key)
+        if value is None:
+            continue
+        column_roots = [root for root in roots if root.output == column.key]
+        tail = output_tail(value, bool(column_roots))
+
+        group = __mergeable_group(column_roots)
+        if group:
+            merged = OutputSummary(
+                session_id=session_id,
+                output=column.key,
+                level=group[0].level + 1,
+                source_chars=sum(summary.source_chars for summary in group),
+                summary=await summarize_content_with_llm("\n\n".join(summary.summary for summary in group),
+                                          f"{content_type} summaries")
+            )
+            remaining = [root for root in column_roots if root not in group]
+            # Merged groups are the oldest content still at their level, so they go in front of it
+            position = next((index for index, root in enumerate(remaining) if root.level <= group[0].level),
+                            len(remaining))
+            rendered = render_output(
+                [root.summary for root in remaining[:position]] + [merged.summary] +
+                [root.summary for root in remaining[position:]],
+                tail
+            )
+            return await __apply_compaction(session, column, rendered, merged, [summary.id for summary in group])
+
+        chunk = next_output_chunk(tail, max_length)
+        if chunk:
+            chunk_text, rest = chunk
+            summary = OutputSummary(
+                session_id=session_id,
+                output=column.key,
+                level=0,
+                source_chars=len(chunk_text),
+                summary=await summarize_content_with_llm(chunk_text, content_type)
+            )
+            rendered = render_output([root.summary for root in column_roots] + [summary.summary], rest)
+            return await __apply_compaction(session, column, rendered, summary, [])
+    await __mark_compacted(session)
+    return None
+
+
+async def __mark_compacted(session: Session):
+    async with AsyncDb_session() as db:
+        await db.execute(
+            update(Session)
+            .where(Session.id == session.id, Session.outputs_version == session.outputs_version)
+            # Recording the marker is not activity, it must not keep the session from expiring
+            .values(compacted_version=session.outputs_version, updated_at=Session.updated_at)
+        )
+        await db.commit()
+
+
+def __mergeable_group(roots: List[OutputSummary]) -> List[OutputSummary]:
+    """Oldest SUMMARY_FANOUT summaries of the lowest level that has that many"""
+    for level in sorted({root.level for root in roots}):
+        same_level = [root for root in roots if root.level == level]
+        if len(same_level) >= SUMMARY_FANOUT:
+            return same_level[:SUMMARY_FANOUT]
+    return []
+
+
+async def __apply_compaction(session: Session, column, rendered: str, summary: OutputSummary,
+                             merged_ids: List[int]) -> bool:
+    async with AsyncDb_session() as db:
+        result = await db.execute(
+            update(Session)
+            .where(Session.id == session.id, Session.outputs_version == session.outputs_version)
+            .values({column: rendered, Session.outputs_version: session.outputs_version + 1})
+        )
+        if result.rowcount != 1:
+            await db.rollback()
+            return False
+        db.add(summary)
+        await db.flush()
+        if merged_ids:
+            await db.execute(
+                update(OutputSummary)
+                .where(OutputSummary.id.in_(merged_ids))
+                .values(parent_id=summary.id)
+            )
+        await db.commit()
+        return True
+
+
+async def update_session_state(session_id: str, state: Dict[str, Any]) -> Session:
+    """Append the turn's new messages and store the remaining state fields"""
+    messages, fields_json = split_state(state)
+    async with AsyncDb_session() as db:
+        session = await __get_session(db, session_id)
+
+        # Every turn extends the stored conversation, only the messages past it are new
+        next_seq = await db.scalar(
+            select(func.coalesce(func.max(SessionMessage.seq) + 1, 0))
+            .where(SessionMessage.session_id == session_id)
+        )
+        db.add_all(session_message_row(session_id, seq, message)
+                   for seq, message in enumerate(messages[next_seq:], start=next_seq))
+        session.state = fields_json
+        await db.commit()
+        return session
+
+
+async def append_session_messages(session_id: str, start_seq: int, messages: List[Any]):
+    """Append messages whose position in the conversation is already known, without reading the session"""
+    if not messages:
+        return
+    async with AsyncDb_session() as db:
+        db.add_all(session_message_row(session_id, seq, message)
+                   for seq, message in enumerate(messages, start=start_seq))
+        await db.commit()
+
+
+async def update_session_fields(session_id: str, fields_json: str):
+    """Store the state fields other than the conversation"""
+    async with AsyncDb_session() as db:
+        await db.execute(update(Session).where(Session.id == session_id).values(state=fields_json))
+        await db.commit()
+
+
+async def load_session_state(session_id: str) -> Dict[str, Any]:
+    """Load the requirements state with one ordered range query over the conversation"""
+    async with AsyncDb_session() as db:
+        session = await __get_session(db, session_id)
+        if session.status == "expired":
+            raise ValueError("session expired")
+        # Plain column rows, building ORM objects for a long conversation costs more than the query
+        rows = await db.execute(
+            select(SessionMessage.role, SessionMessage.content)
+            .where(SessionMessage.session_id == session_id)
+            .order_by(SessionMessage.seq)
+        )
+        return build_state(session.state, rows.all())
+
+
+async def migrate_legacy_session_states(batch_size: int = 100) -> int:
+    """Move conversations still embedded in Session.state into session_message rows.
+
+    Every batch raises its sessions to STATE_VERSION, so each session is
+    looked at once. Returns the number of sessions whose conversation moved.
+    """
+    migrated = 0
+    while True:
+        async with AsyncDb_session() as db:
+            sessions = list(await db.scalars(
+                select(Session).where(Session.state_version < STATE_VERSION).limit(batch_size)
+            ))
+            if not sessions:
+                return migrated
+            for session in sessions:
+                state = await run_blocking(deserialize_state, session.state) if session.state else {}
+                if "requirements_messages" in state:
+                    messages, fields_json = split_state(state)
+                    db.add_all(session_message_row(session.id, seq, message)
+                               for seq, message in enumerate(messages))
+                    session.state = fields_json
+                    migrated += 1
+            await db.flush()
+            await db.execute(
+                update(Session)
+                .where(Session.id.in_([session.id for session in sessions]))
+                # Raising the version is not activity, it must not keep the session from expiring
+                .values(state_version=STATE_VERSION, updated_at=Session.updated_at)
+            )
+            await db.commit()
+
+
+async def complete_session(session_id: str) -> Session:
+    async with AsyncDb_session() as db:
+        session = await __get_session(db, session_id)
+        session.status = "completed"
+        session.completed_at = datetime.now(timezone.utc)
+        await db.commit()
+        return session
+
+
+async def reactivate_session(session_id: str) -> Session:
+    async with AsyncDb_session() as db:
+        session = await __get_session(db, session_id)
+        session.status = "reactivated"
+        await db.commit()
+        return session
+
+
+async def reactivate_session_if_completed(session_id: str) -> bool:
+    """Reactivate a completed session with a single conditional update"""
+    async with AsyncDb_session() as db:
+        result = await db.execute(
+            update(Session)
+            .where(Session.id == session_id, Session.status == "completed")
+            .values(status="reactivated")
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+
+async def find_expired_sessions(idle_before: datetime, busy_job_statuses: List[str], limit: int) -> List[str]:
+    """Ids of sessions idle since before idle_before that have no build job in progress"""
+    async with AsyncDb_session() as db:
+        # Sessions from before the timestamp columns existed start their retention period now
+        now = datetime.now(timezone.utc)
+        await db.execute(
+            update(Session)
+            .where(Session.updated_at.is_(None))
+            .values(created_at=func.coalesce(Session.created_at, now), updated_at=now)
+        )
+        await db.commit()
+        busy = select(BuildJob.id).where(BuildJob.session_id == Session.id, BuildJob.status.in_(busy_job_statuses))
+        result = await db.scalars(
+            select(Session.id)
+            .where(Session.status != "expired", Session.updated_at < idle_before, ~busy.exists())
+            .order_by(Session.updated_at)
+            .limit(limit)
+        )
+        return list(result)
+
+
+async def expire_sessions(session_ids: List[str]):
+    """Drop the conversation, outputs and summaries of the sessions, keeping their rows as expired"""
+    async with AsyncDb_session() as db:
+        await db.execute(delete(SessionMessage).where(SessionMessage.session_id.in_(session_ids)))
+        await db.execute(delete(OutputSummary).where(OutputSummary.session_id.in_(session_ids)))
+        await db.execute(
+            update(Session)
+            .where(Session.id.in_(session_ids))
+            .values(status="expired", state=None, requirement_gatherer_output=None, task_manager_output=None,
+                    outputs_version=Session.outputs_version + 1)
+        )
+        await db.commit()
+
+
+async def add_llm_usage(calls: List[Dict[str, Any]]):
+    async with AsyncDb_session() as db:
+        db.add_all(LlmUsage(**call) for call in calls)
+        await db.commit()
+
+
+async def find_session_usage(session_id: str) -> List[Any]:
+    """LLM usage of the session summed per node, task and model"""
+    async with AsyncDb_session() as db:
+        result = await db.execute(
+            select(LlmUsage.node, LlmUsage.task_id, LlmUsage.model,
+                   func.count().label("calls"),
+                   func.sum(LlmUsage.input_tokens).label("input_tokens"),
+                   func.sum(LlmUsage.output_tokens).label("output_tokens"),
+                   func.sum(LlmUsage.latency_ms).label("latency_ms"),
+                   func.sum(LlmUsage.cost_usd).label("cost_usd"))
+            .where(LlmUsage.session_id == session_id)
+            .group_by(LlmUsage.node, LlmUsage.task_id, LlmUsage.model)
+        )
+        return list(result.all())
+
+
+async def create_build_job(session_id: str) -> BuildJob:
+    """Queue a new build job for the session"""
+    async with AsyncDb_session() as db:
+        job = BuildJob(session_id=session_id)
+        db.add(job)
+        await db.commit()
+        return job
+
+
+async def find_build_job_by_id(job_id: str) -> BuildJob:
+    async with AsyncDb_session() as db:
+        return await __get_build_job(db, job_id)
+
+
+async def find_latest_build_job(session_id: str) -> Optional[BuildJob]:
+    async with AsyncDb_session() as db:
+        return await db.scalar(
+            select(BuildJob)
+            .where(BuildJob.session_id == session_id)
+            .order_by(BuildJob.created_at.desc())
+            .limit(1)
+        )
+
+
+async def find_build_jobs_by_status(statuses: List[str]) -> List[BuildJob]:
+    async with AsyncDb_session() as db:
+        result = await db.scalars(
+            select(BuildJob)
+            .where(BuildJob.status.in_(statuses))
+            .order_by(BuildJob.created_at)
+        )
+        return list(result)
+
+
+async def start_build_job(job_id: str) -> BuildJob:
+    async with AsyncDb_session() as db:
+        job = await __get_build_job(db, job_id)
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        await db.commit()
+        return job
+
+
+async def finish_build_job(job_id: str, status: str, error: Optional[str] = None) -> BuildJob:
+    """Mark a build job as done or failed and record its end time"""
+    async with AsyncDb_session() as db:
+        job = await __get_build_job(db, job_id)
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.now(timezone.utc)
+        await db.commit()
+        return job
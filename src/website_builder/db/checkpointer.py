@@ -0,0 +1,155 @@
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, \
+    CheckpointTuple, WRITES_IDX_MAP, get_checkpoint_id, get_checkpoint_metadata
+from sqlalchemy import select, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from website_builder.db.database import AsyncDb_session
+from website_builder.db.database_models import GraphCheckpoint, GraphCheckpointWrite
+
+
+def task_thread_id(session_id: str, task_index: int) -> str:
+    """Thread of one developer task loop of the session's build"""
+    return f"{session_id}/task-{task_index}"
+
+
+class DatabaseCheckpointSaver(BaseCheckpointSaver[int]):
+    """Async LangGraph checkpointer on the project database.
+
+    Builds only ever resume from their newest checkpoint, so each put keeps
+    just the newest checkpoint of its thread and namespace and the writes
+    made against it. The orchestrator runs on the session's thread, with its
+    task manager subgraph in its own namespace, and every developer task
+    loop runs on its own task thread, so a resumed build continues each
+    unfinished task at its last step. The graphs are run with astream, so
+    only the async interface is implemented.
+    """
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, checkpoint_ns = self.__thread(config)
+        async with AsyncDb_session() as db:
+            query = select(GraphCheckpoint).where(GraphCheckpoint.thread_id == thread_id,
+                                                  GraphCheckpoint.checkpoint_ns == checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query = query.where(GraphCheckpoint.checkpoint_id == checkpoint_id)
+            row = await db.scalar(query.order_by(GraphCheckpoint.checkpoint_id.desc()).limit(1))
+            if row is None:
+                return None
+            return await self.__checkpoint_tuple(db, row)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        async with AsyncDb_session() as db:
+            query = select(GraphCheckpoint)
+            if config is not None:
+                query = query.where(GraphCheckpoint.thread_id == config["configurable"]["thread_id"])
+                if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                    query = query.where(GraphCheckpoint.checkpoint_ns == checkpoint_ns)
+                if checkpoint_id := get_checkpoint_id(config):
+                    query = query.where(GraphCheckpoint.checkpoint_id == checkpoint_id)
+            if before is not None and (before_id := get_checkpoint_id(before)):
+                query = query.where(GraphCheckpoint.checkpoint_id < before_id)
+            rows = await db.scalars(query.order_by(GraphCheckpoint.checkpoint_id.desc()))
+            for row in rows.all():
+                if limit is not None and limit <= 0:
+                    return
+                checkpoint_tuple = await self.__checkpoint_tuple(db, row)
+                if filter and any(checkpoint_tuple.metadata.get(key) != value for key, value in filter.items()):
+                    continue
+                if limit is not None:
+                    limit -= 1
+                yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id, checkpoint_ns = self.__thread(config)
+        checkpoint_type, checkpoint_data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        async with AsyncDb_session() as db:
+            await db.merge(GraphCheckpoint(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=checkpoint["id"],
+                parent_checkpoint_id=config["configurable"].get("checkpoint_id"),
+                checkpoint_type=checkpoint_type,
+                checkpoint=checkpoint_data,
+                metadata_type=metadata_type,
+                checkpoint_metadata=metadata_data
+            ))
+            for model in (GraphCheckpointWrite, GraphCheckpoint):
+                await db.execute(delete(model).where(
+                    model.thread_id == thread_id,
+                    model.checkpoint_ns == checkpoint_ns,
+                    model.checkpoint_id != checkpoint["id"]
+                ))
+            await db.commit()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        thread_id, checkpoint_ns = self.__thread(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        async with AsyncDb_session() as db:
+            for index, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, index)
+                key = (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                # Regular writes are stored once, special writes (errors, interrupts) replace the previous one
+                if idx >= 0 and await db.get(GraphCheckpointWrite, key) is not None:
+                    continue
+                value_type, value_data = self.serde.dumps_typed(value)
+                await db.merge(GraphCheckpointWrite(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint_id,
+                    task_id=task_id,
+                    idx=idx,
+                    task_path=task_path,
+                    channel=channel,
+                    value_type=value_type,
+                    value=value_data
+                ))
+            await db.commit()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Delete the thread together with the task threads derived from it"""
+        async with AsyncDb_session() as db:
+            for model in (GraphCheckpointWrite, GraphCheckpoint):
+                await db.execute(delete(model).where(
+                    or_(model.thread_id == thread_id, model.thread_id.startswith(f"{thread_id}/", autoescape=True))
+                ))
+            await db.commit()
+
+    @staticmethod
+    def __thread(config: RunnableConfig):
+        return config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", "")
+
+    async def __checkpoint_tuple(self, db: AsyncSession, row: GraphCheckpoint) -> CheckpointTuple:
+        writes = await db.execute(
+            select(GraphCheckpointWrite.task_id, GraphCheckpointWrite.channel, GraphCheckpointWrite.value_type,
+                   GraphCheckpointWrite.value)
+            .where(GraphCheckpointWrite.thread_id == row.thread_id,
+                   GraphCheckpointWrite.checkpoint_ns == row.checkpoint_ns,
+                   GraphCheckpointWrite.checkpoint_id == row.checkpoint_id)
+            .order_by(GraphCheckpointWrite.task_path, GraphCheckpointWrite.task_id, GraphCheckpointWrite.idx)
+        )
+        thread = {"thread_id": row.thread_id, "checkpoint_ns": row.checkpoint_ns}
+        return CheckpointTuple(
+            config={"configurable": {**thread, "checkpoint_id": row.checkpoint_id}},
+            checkpoint=self.serde.loads_typed((row.checkpoint_type, row.checkpoint)),
+            metadata=self.serde.loads_typed((row.metadata_type, row.checkpoint_metadata)),
+            parent_config=(
+                {"configurable": {**thread, "checkpoint_id": row.parent_checkpoint_id}}
+                if row.parent_checkpoint_id else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes.all()
+            ]
+        )
+
+
+build_checkpointer = DatabaseCheckpointSaver()
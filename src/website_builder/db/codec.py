@@ -0,0 +1,110 @@
+import logging
+import zlib
+
+import sqlalchemy as sa
+
+from website_builder.config import STORAGE_CODEC, STORAGE_COMPRESSION_LEVEL, STORAGE_COMPRESSION_MIN_BYTES
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 0xFF never starts UTF-8 text, so values stored before the codec existed are read as plain text
+CODEC_MARKER = 0xFF
+
+# Format ids stored after the marker, never renumber them
+RAW = 0
+ZLIB = 1
+ZSTD = 2
+
+CODEC_FORMATS = {"none": RAW, "zlib": ZLIB, "zstd": ZSTD}
+
+
+def __configured_format() -> int:
+    if STORAGE_CODEC not in CODEC_FORMATS:
+        raise ValueError(f"Unknown STORAGE_CODEC {STORAGE_CODEC!r}, expected one of {list(CODEC_FORMATS)}")
+    if CODEC_FORMATS[STORAGE_CODEC] == ZSTD and zstandard is None:
+        logger.warning("zstandard is not installed, compressing stored text with zlib instead")
+        return ZLIB
+    return CODEC_FORMATS[STORAGE_CODEC]
+
+
+WRITE_FORMAT = __configured_format()
+
+
+def compress(data: bytes, data_format: int, level: int = STORAGE_COMPRESSION_LEVEL) -> bytes:
+    if data_format == ZSTD:
+        # Compressor objects are not thread safe and cheap to create
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if data_format == ZLIB:
+        return zlib.compress(data, level)
+    return data
+
+
+def decompress(data: bytes, data_format: int) -> bytes:
+    if data_format == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Stored value is zstd compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if data_format == ZLIB:
+        return zlib.decompress(data)
+    if data_format == RAW:
+        return data
+    raise ValueError(f"Unknown stored value format {data_format}")
+
+
+def encode_bytes(data: bytes, data_format: int = WRITE_FORMAT) -> bytes:
+    """Marker, format id and the data, compressed unless it is short or does not shrink"""
+    if data_format != RAW and len(data) >= STORAGE_COMPRESSION_MIN_BYTES:
+        compressed = compress(data, data_format)
+        if len(compressed) < len(data):
+            return bytes((CODEC_MARKER, data_format)) + compressed
+    return bytes((CODEC_MARKER, RAW)) + data
+
+
+def decode_bytes(value: bytes) -> bytes:
+    value = bytes(value)
+    if not value or value[0] != CODEC_MARKER:
+        raise ValueError("Stored value has no codec marker")
+    return decompress(value[2:], value[1])
+
+
+def encode_text(text: str, data_format: int = WRITE_FORMAT) -> bytes:
+    return encode_bytes(text.encode("utf-8"), data_format)
+
+
+def decode_text(value) -> str:
+    # SQLite hands back text written before the codec as str, other backends as bytes
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value or value[0] != CODEC_MARKER:
+        return value.decode("utf-8")
+    return decode_bytes(value).decode("utf-8")
+
+
+class CompressedText(sa.TypeDecorator):
+    """Text column stored as versioned, compressed binary"""
+    impl = sa.LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_text(value) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return decode_text(value) if value is not None else None
+
+
+class CompressedBinary(sa.TypeDecorator):
+    """Binary column stored with the same versioned compression as CompressedText"""
+    impl = sa.LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_bytes(value) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return decode_bytes(value) if value is not None else None
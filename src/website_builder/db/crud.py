@@ -1,12 +1,35 @@
+import functools
+import hashlib
 import json
-from typing import Dict, Any
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
+import sqlalchemy as sa
 from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
 load_dotenv()
 
+from website_builder.config import SUMMARY_CACHE_MAX_ENTRIES
 from website_builder.db.database import Db_session
-from website_builder.db.database_models import Session
+from website_builder.db.database_models import Session, BuildJob, SessionMessage, SummaryCacheEntry
+from website_builder.llm_usage import usage_callback, usage_scope
+
+MESSAGE_TYPES = {"system": SystemMessage, "human": HumanMessage, "ai": AIMessage}
+OUTPUT_SEPARATOR = "\n\n\n\n\n\n"
+SUMMARY_MARKER = "[SUMMARIZED PREVIOUS CONTENT]"
+NEW_CONTENT_MARKER = "[NEW CONTENT]"
+# Number of same-level summaries merged into one summary of the next level
+SUMMARY_FANOUT = 4
+SUMMARIZATION_MODEL = "gemini-2.5-pro"
+# Part of the summary cache key, bump it whenever summarization_prompt changes
+SUMMARY_PROMPT_VERSION = 1
+
+
+def compact_json(value) -> str:
+    """JSON without whitespace or escaped non-ASCII characters, for storage"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
 
 
 def serialize_message(msg):
@@ -48,32 +71,124 @@ def serialize_state(state: Dict[str, Any]) -> str:
         else:
             serialized[key] = value
 
-    return json.dumps(serialized)
+    return compact_json(serialized)
 
 def serialize_list(list_messages: list[BaseMessage]) -> str:
-    return json.dumps([serialize_message(message) for message in list_messages])
+    return compact_json([serialize_message(message) for message in list_messages])
 
 
-def summarize_content_with_llm(content: str, content_type: str) -> str:
-    """Summarize content using LLM when it becomes too long"""
-    # Initialize LLM for summarization
-    summarization_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro")
-    
-    # Create summarization prompt
-    prompt = f"""
+def summarization_prompt(content: str, content_type: str) -> str:
+    return f"""
 Please provide a concise summary of the following {content_type} content. The content correspond to an AI website creator, was used to generate the website and may include technical details, user requirements, and task management information. Focus on preserving the key information and important details:
 
 {content}
 
 Summary:
 """
-    
+
+
+class SummaryCacheStats:
+    """Process-wide summary cache counters"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.computed_ms = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def record_hit(self, latency_ms: float):
+        self.hits += 1
+        self.saved_ms += latency_ms
+
+    def record_miss(self, latency_ms: float):
+        self.misses += 1
+        self.computed_ms += latency_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "saved_ms": round(self.saved_ms, 1),
+            "computed_ms": round(self.computed_ms, 1)
+        }
+
+
+summary_cache_stats = SummaryCacheStats()
+
+
+@functools.cache
+def summarization_llm() -> ChatGoogleGenerativeAI:
+    """Summarization client shared by every call, created on first use"""
+    return ChatGoogleGenerativeAI(model=SUMMARIZATION_MODEL, callbacks=[usage_callback])
+
+
+def summary_cache_key(content: str, content_type: str) -> str:
+    payload = json.dumps([SUMMARY_PROMPT_VERSION, SUMMARIZATION_MODEL, content_type, content])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def summary_cache_entry(key: str, content_type: str, summary: str, latency_ms: float) -> SummaryCacheEntry:
+    return SummaryCacheEntry(key=key, content_type=content_type, model=SUMMARIZATION_MODEL,
+                             summary=summary, latency_ms=latency_ms)
+
+
+def summary_cache_eviction(excess: int):
+    """Delete statement for the least recently used cache entries"""
+    least_recently_used = (sa.select(SummaryCacheEntry.key)
+                           .order_by(SummaryCacheEntry.last_used_at)
+                           .limit(excess))
+    return sa.delete(SummaryCacheEntry).where(SummaryCacheEntry.key.in_(least_recently_used))
+
+
+def find_cached_summary(key: str) -> Optional[str]:
+    with Db_session() as db:
+        entry = db.query(SummaryCacheEntry).filter(SummaryCacheEntry.key == key).first()
+        if entry is None:
+            return None
+        entry.hits += 1
+        entry.last_used_at = datetime.now(timezone.utc)
+        db.commit()
+        summary_cache_stats.record_hit(entry.latency_ms)
+        return entry.summary
+
+
+def store_cached_summary(key: str, content_type: str, summary: str, latency_ms: float):
+    with Db_session() as db:
+        try:
+            db.merge(summary_cache_entry(key, content_type, summary, latency_ms))
+            excess = db.query(SummaryCacheEntry).count() - SUMMARY_CACHE_MAX_ENTRIES
+            if excess > 0:
+                db.execute(summary_cache_eviction(excess))
+            db.commit()
+        except IntegrityError:
+            # Another writer cached the same content first
+            db.rollback()
+
+
+def summarize_content_with_llm(content: str, content_type: str) -> str:
+    """Summarize content using LLM when it becomes too long, reusing cached summaries of identical content"""
+    key = summary_cache_key(content, content_type)
+    cached = find_cached_summary(key)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
     try:
-        response = summarization_llm.invoke([HumanMessage(content=prompt)])
-        return response.content
+        with usage_scope(node="summarization"):
+            response = summarization_llm().invoke([HumanMessage(content=summarization_prompt(content, content_type))])
     except Exception as e:
         # If summarization fails, truncate the content as fallback
         return f"[SUMMARIZATION_ERROR: {str(e)}]\n\n{content[-1000:]}"
+    latency_ms = (time.perf_counter() - started) * 1000
+    summary_cache_stats.record_miss(latency_ms)
+    store_cached_summary(key, content_type, response.content, latency_ms)
+    return response.content
 
 
 def should_summarize_content(content: str, max_length: int = 5000) -> bool:
@@ -81,6 +196,38 @@ def should_summarize_content(content: str, max_length: int = 5000) -> bool:
     return len(content) > max_length
 
 
+def output_tail(value: str, has_summaries: bool) -> str:
+    """The raw appended content of an output, after its rendered summaries"""
+    if not has_summaries:
+        return value
+    _, marker, tail = value.rpartition(f"\n\n{NEW_CONTENT_MARKER}\n")
+    return tail if marker else value
+
+
+def render_output(summaries: List[str], tail: str) -> str:
+    if not summaries:
+        return tail
+    return f"{SUMMARY_MARKER}\n" + "\n\n".join(summaries) + f"\n\n{NEW_CONTENT_MARKER}\n{tail}"
+
+
+def next_output_chunk(tail: str, max_length: int) -> Optional[Tuple[str, str]]:
+    """Split the oldest appends of at most max_length characters off a tail that grew too long"""
+    if not should_summarize_content(tail, max_length):
+        return None
+    pieces = [piece for piece in tail.split(OUTPUT_SEPARATOR) if piece]
+    chunk = []
+    chunk_length = 0
+    for piece in pieces:
+        if chunk and chunk_length + len(piece) > max_length:
+            break
+        chunk.append(piece)
+        chunk_length += len(piece)
+    if chunk_length > max_length:
+        # A single append longer than a chunk is cut so the LLM input stays bounded
+        return chunk[0][:max_length], chunk[0][max_length:] + "".join(OUTPUT_SEPARATOR + piece for piece in pieces[1:])
+    return OUTPUT_SEPARATOR.join(chunk), OUTPUT_SEPARATOR.join(pieces[len(chunk):])
+
+
 def deserialize_state(state_json: str) -> Dict[str, Any]:
     """Deserialize JSON back to state with LangChain messages"""
     state = json.loads(state_json)
@@ -96,6 +243,49 @@ def deserialize_state(state_json: str) -> Dict[str, Any]:
     return deserialized
 
 
+def message_text(content) -> str:
+    """Plain text of a message content, which may be a list of content parts"""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content
+    )
+
+
+def session_message_row(session_id: str, seq: int, message: BaseMessage) -> SessionMessage:
+    tool_calls = getattr(message, "tool_calls", None)
+    return SessionMessage(
+        session_id=session_id,
+        seq=seq,
+        role=message.type,
+        content=message_text(message.content),
+        tool_calls=compact_json(tool_calls) if tool_calls else None
+    )
+
+
+def deserialize_session_message(row) -> BaseMessage:
+    # Tool calls are kept for the record but not replayed: the exit tool call is never
+    # answered by a ToolMessage and Gemini rejects a function call turn without its response
+    return MESSAGE_TYPES[row.role](content=row.content)
+
+
+def split_state(state: Dict[str, Any]) -> Tuple[List[BaseMessage], str]:
+    """Separate the conversation, stored in session_message, from the remaining state fields"""
+    messages = list(state.get("requirements_messages", []))
+    fields = {key: value for key, value in state.items() if key != "requirements_messages"}
+    return messages, serialize_state(fields)
+
+
+def build_state(state_json: Optional[str], rows: list) -> Dict[str, Any]:
+    """Rebuild the requirements state from the stored fields and the conversation rows"""
+    state = deserialize_state(state_json) if state_json else {}
+    # Sessions written before session_message existed still carry the messages in the blob
+    if rows or "requirements_messages" not in state:
+        state["requirements_messages"] = [deserialize_session_message(row) for row in rows]
+    return state
+
+
 def initialize_session() -> Session:
     with Db_session() as db:
         session = Session()
@@ -114,69 +304,70 @@ def find_session_by_id(session_id: str) -> Session:
 
 
 def add_requirements_gatherer_output(session_id: str, requirements_gatherer_output: Any) -> Session:
+    return __append_output(session_id, Session.requirement_gatherer_output, serialize_list(requirements_gatherer_output))
+
+
+def add_task_manager_output(session_id: str, task_manager_output: Any) -> Session:
+    return __append_output(session_id, Session.task_manager_output, serialize_list(task_manager_output))
+
+
+def append_output_values(column, new_content: str) -> Dict[Any, Any]:
+    """Values of a single-statement append, so the row is never read and rewritten by the caller.
+
+    Summarizing outputs that grew too long is left to the background compactor.
+    """
+    return {
+        column: sa.func.coalesce(column + OUTPUT_SEPARATOR + new_content, new_content),
+        Session.outputs_version: Session.outputs_version + 1
+    }
+
+
+def __append_output(session_id: str, column, new_content: str) -> Session:
     with Db_session() as db:
-        session = db.query(Session).filter(Session.id == session_id).first()
-        if not session:
+        result = db.execute(
+            sa.update(Session)
+            .where(Session.id == session_id)
+            .values(append_output_values(column, new_content))
+        )
+        if result.rowcount == 0:
             raise ValueError("session not found")
-        
-        new_content = serialize_list(requirements_gatherer_output)
-        
-        if session.requirement_gatherer_output is not None:
-            # Check if existing content needs summarization
-            if should_summarize_content(session.requirement_gatherer_output):
-                summarized_existing = summarize_content_with_llm(
-                    session.requirement_gatherer_output, 
-                    "requirements gatherer"
-                )
-                session.requirement_gatherer_output = f"[SUMMARIZED PREVIOUS CONTENT]\n{summarized_existing}\n\n[NEW CONTENT]\n{new_content}"
-            else:
-                session.requirement_gatherer_output = session.requirement_gatherer_output + "\n\n\n\n\n\n" + new_content
-        else:
-            session.requirement_gatherer_output = new_content
-            
         db.commit()
-        db.refresh(session)
-        return session
+        return db.query(Session).filter(Session.id == session_id).first()
 
 
-def add_task_manager_output(session_id: str, task_manager_output: Any) -> Session:
+def update_session_state(session_id: str, state: Dict[str, Any]) -> Session:
+    """Append the turn's new messages and store the remaining state fields"""
+    messages, fields_json = split_state(state)
     with Db_session() as db:
         session = db.query(Session).filter(Session.id == session_id).first()
         if not session:
             raise ValueError("session not found")
-        
-        new_content = serialize_list(task_manager_output)
-        
-        if session.task_manager_output is not None:
-            # Check if existing content needs summarization
-            if should_summarize_content(session.task_manager_output):
-                summarized_existing = summarize_content_with_llm(
-                    session.task_manager_output, 
-                    "task manager"
-                )
-                session.task_manager_output = f"[SUMMARIZED PREVIOUS CONTENT]\n{summarized_existing}\n\n[NEW CONTENT]\n{new_content}"
-            else:
-                session.task_manager_output = session.task_manager_output + "\n\n\n\n\n\n" + new_content
-        else:
-            session.task_manager_output = new_content
-            
+
+        # Every turn extends the stored conversation, only the messages past it are new
+        next_seq = (db.query(sa.func.coalesce(sa.func.max(SessionMessage.seq) + 1, 0))
+                    .filter(SessionMessage.session_id == session_id)
+                    .scalar())
+        db.add_all(session_message_row(session_id, seq, message)
+                   for seq, message in enumerate(messages[next_seq:], start=next_seq))
+        session.state = fields_json
         db.commit()
         db.refresh(session)
         return session
 
 
-def update_session_state(session_id: str, state: Dict[str, Any]) -> Session:
-    """Update session state by session ID"""
+def load_session_state(session_id: str) -> Dict[str, Any]:
+    """Load the requirements state with one ordered range query over the conversation"""
     with Db_session() as db:
         session = db.query(Session).filter(Session.id == session_id).first()
         if not session:
             raise ValueError("session not found")
 
-        # Serialize state with message conversion
-        session.state = serialize_state(state)
-        db.commit()
-        db.refresh(session)
-        return session
+        # Plain column rows, building ORM objects for a long conversation costs more than the query
+        rows = (db.query(SessionMessage.role, SessionMessage.content)
+                .filter(SessionMessage.session_id == session_id)
+                .order_by(SessionMessage.seq)
+                .all())
+        return build_state(session.state, rows)
 
 def complete_session(session_id: str) -> Session:
     with Db_session() as db:
@@ -185,6 +376,7 @@ def complete_session(session_id: str) -> Session:
             raise ValueError("session not found")
 
         session.status = "completed"
+        session.completed_at = datetime.now(timezone.utc)
         db.commit()
         db.refresh(session)
         return session
@@ -220,7 +412,70 @@ def summarize_session_outputs(session_id: str) -> Session:
                 session.task_manager_output, 
                 "task manager"
             )
-        
+
+        session.outputs_version += 1
         db.commit()
         db.refresh(session)
-        return session
\ No newline at end of file
+        return session
+
+
+def create_build_job(session_id: str) -> BuildJob:
+    """Queue a new build job for the session"""
+    with Db_session() as db:
+        job = BuildJob(session_id=session_id)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+
+def find_build_job_by_id(job_id: str) -> BuildJob:
+    with Db_session() as db:
+        job = db.query(BuildJob).filter(BuildJob.id == job_id).first()
+        if not job:
+            raise ValueError("build job not found")
+        return job
+
+
+def find_latest_build_job(session_id: str) -> Optional[BuildJob]:
+    with Db_session() as db:
+        return (db.query(BuildJob)
+                .filter(BuildJob.session_id == session_id)
+                .order_by(BuildJob.created_at.desc())
+                .first())
+
+
+def find_build_jobs_by_status(statuses: List[str]) -> List[BuildJob]:
+    with Db_session() as db:
+        return (db.query(BuildJob)
+                .filter(BuildJob.status.in_(statuses))
+                .order_by(BuildJob.created_at)
+                .all())
+
+
+def start_build_job(job_id: str) -> BuildJob:
+    with Db_session() as db:
+        job = db.query(BuildJob).filter(BuildJob.id == job_id).first()
+        if not job:
+            raise ValueError("build job not found")
+
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        db.commit()
+        db.refresh(job)
+        return job
+
+
+def finish_build_job(job_id: str, status: str, error: Optional[str] = None) -> BuildJob:
+    """Mark a build job as done or failed and record its end time"""
+    with Db_session() as db:
+        job = db.query(BuildJob).filter(BuildJob.id == job_id).first()
+        if not job:
+            raise ValueError("build job not found")
+
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+        db.refresh(job)
+        return job
@@ -1,9 +1,147 @@
 import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-db = sa.create_engine("sqlite:///test.db")
+from website_builder.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, \
+    DB_ECHO, SQLITE_JOURNAL_MODE, SQLITE_BUSY_TIMEOUT_MS
+from website_builder.db.codec import CompressedText
+from website_builder.metrics import instrument_engine
+from website_builder.tracing import trace_engine
+
+# asyncio drivers used for the same database by the async engine
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "psycopg"}
+ASYNC_CAPABLE_DRIVERS = {"aiosqlite", "psycopg", "asyncpg"}
+
+
+def is_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def engine_options(url: URL) -> dict:
+    """Connection pool settings for the configured backend"""
+    options = {"echo": DB_ECHO}
+    if is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if url.database in (None, "", ":memory:"):
+            # In-memory databases live in a single connection
+            return options
+    else:
+        options["pool_pre_ping"] = True
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """WAL lets readers proceed while a build writes, busy_timeout queues writers instead of failing"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def async_database_url(url: URL) -> URL:
+    """The configured database URL with the asyncio driver of its backend"""
+    backend = url.get_backend_name()
+    if url.get_driver_name() in ASYNC_CAPABLE_DRIVERS or backend not in ASYNC_DRIVERS:
+        return url
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+database_url = make_url(DATABASE_URL)
+db = sa.create_engine(database_url, **engine_options(database_url))
+if is_sqlite(database_url):
+    event.listen(db, "connect", configure_sqlite_connection)
+instrument_engine(db, "sync")
+trace_engine(db, "sync")
 Db_session = sessionmaker(bind=db)
+
+# Used by the API and the graph nodes so database I/O never blocks the event loop.
+# The synchronous engine above stays for scripts and benchmarks.
+async_db = create_async_engine(async_database_url(database_url), **engine_options(database_url))
+if is_sqlite(database_url):
+    event.listen(async_db.sync_engine, "connect", configure_sqlite_connection)
+instrument_engine(async_db.sync_engine, "async")
+trace_engine(async_db.sync_engine, "async")
+AsyncDb_session = async_sessionmaker(bind=async_db, expire_on_commit=False)
+
 Base = declarative_base()
 
+def upgrade_existing_tables(connection):
+    """create_all only creates missing tables, bring existing ones up to date.
+
+    Columns and indexes introduced since a table was created are added, text
+    columns that became compressed binary are converted and string columns
+    that were made longer are widened.
+    """
+    inspector = sa.inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        existing_columns = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                __convert_text_to_binary(connection, table, column, existing_columns[column.name])
+                __widen_string(connection, table, column, existing_columns[column.name])
+                continue
+            ddl = (f"ALTER TABLE {preparer.quote(table.name)} ADD COLUMN {preparer.quote(column.name)} "
+                   f"{column.type.compile(dialect=connection.dialect)}")
+            if column.server_default is not None:
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+                ddl += "" if column.nullable else " NOT NULL"
+            connection.execute(sa.text(ddl))
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+
+
+def __convert_text_to_binary(connection, table, column, existing_type):
+    """Text columns that became compressed binary keep their rows as UTF-8 bytes.
+
+    SQLite stores any value in any column, so only PostgreSQL needs the column type changed.
+    """
+    if (connection.dialect.name != "postgresql" or not isinstance(column.type, CompressedText)
+            or not isinstance(existing_type, sa.String)):
+        return
+    preparer = connection.dialect.identifier_preparer
+    connection.execute(sa.text(
+        f"ALTER TABLE {preparer.quote(table.name)} ALTER COLUMN {preparer.quote(column.name)} "
+        f"TYPE BYTEA USING convert_to({preparer.quote(column.name)}, 'UTF8')"
+    ))
+
+
+def __widen_string(connection, table, column, existing_type):
+    """String columns whose length was raised, e.g. thread ids once task threads were added.
+
+    SQLite does not enforce lengths, so only PostgreSQL needs the column type changed.
+    """
+    if (connection.dialect.name != "postgresql" or type(column.type) is not sa.String
+            or not isinstance(existing_type, sa.String) or column.type.length is None
+            or existing_type.length is None or existing_type.length >= column.type.length):
+        return
+    preparer = connection.dialect.identifier_preparer
+    connection.execute(sa.text(
+        f"ALTER TABLE {preparer.quote(table.name)} ALTER COLUMN {preparer.quote(column.name)} "
+        f"TYPE {column.type.compile(dialect=connection.dialect)}"
+    ))
+
+
 def init_db():
-    Base.metadata.create_all(db)
\ No newline at end of file
+    Base.metadata.create_all(db)
+    with db.begin() as connection:
+        upgrade_existing_tables(connection)
+
+
+async def init_async_db():
+    async with async_db.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.run_sync(upgrade_existing_tables)
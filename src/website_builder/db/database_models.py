@@ -1,12 +1,17 @@
 import uuid
+from datetime import datetime, timezone
 from typing import Optional
 
 import sqlalchemy as sa
 from sqlalchemy import Text
 from sqlalchemy.orm import Mapped, mapped_column
 
+from website_builder.db.codec import CompressedText, CompressedBinary
 from website_builder.db.database import Base
 
+# Layout of Session.state, version 0 states may still embed the requirements conversation
+STATE_VERSION = 1
+
 
 class Session(Base):
     __tablename__ = "session"
@@ -16,7 +21,139 @@ class Session(Base):
         primary_key=True,
         default=lambda: str(uuid.uuid4())
     )
-    status: Mapped[str] = mapped_column(default="pending")
+    status: Mapped[str] = mapped_column(default="pending", index=True)
     requirement_gatherer_output: Mapped[Optional[str]] = mapped_column(nullable=True, type_=Text)
     task_manager_output: Mapped[Optional[str]] = mapped_column(nullable=True, type_=Text)
-    state: Mapped[Optional[str]] = mapped_column(nullable=True, type_=Text)
+    state: Mapped[Optional[str]] = mapped_column(nullable=True, type_=CompressedText)
+    # STATE_VERSION for rows written since the conversation moved to session_message, rows from before it are 0
+    state_version: Mapped[int] = mapped_column(default=lambda: STATE_VERSION, server_default="0")
+    # Bumped by every output append, the compactor only writes its summary if it is unchanged
+    outputs_version: Mapped[int] = mapped_column(default=0, server_default="0")
+    # outputs_version at which the compactor found nothing left to compact, the sweep skips the session until it changes
+    compacted_version: Mapped[Optional[int]] = mapped_column(nullable=True)
+    # Empty for sessions created before the columns existed until the retention sweeper backfills them
+    created_at: Mapped[Optional[datetime]] = mapped_column(default=lambda: datetime.now(timezone.utc))
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        index=True
+    )
+    completed_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+
+
+class BuildJob(Base):
+    __tablename__ = "build_job"
+
+    id: Mapped[str] = mapped_column(
+        sa.String(36),
+        primary_key=True,
+        default=lambda: str(uuid.uuid4())
+    )
+    session_id: Mapped[str] = mapped_column(sa.ForeignKey("session.id"), index=True)
+    status: Mapped[str] = mapped_column(default="queued")
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+    started_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(nullable=True, type_=Text)
+
+
+class SessionMessage(Base):
+    """One requirements conversation message, appended once and never rewritten"""
+    __tablename__ = "session_message"
+    # The unique index also serves the ordered range load of a session's conversation
+    __table_args__ = (sa.UniqueConstraint("session_id", "seq"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    session_id: Mapped[str] = mapped_column(sa.ForeignKey("session.id"))
+    seq: Mapped[int] = mapped_column()
+    role: Mapped[str] = mapped_column(sa.String(16))
+    content: Mapped[str] = mapped_column(type_=CompressedText)
+    tool_calls: Mapped[Optional[str]] = mapped_column(nullable=True, type_=CompressedText)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+
+
+class OutputSummary(Base):
+    """Stored summary of a chunk of a session output, or of a group of lower level summaries.
+
+    Level 0 rows summarize raw output, a level n + 1 row replaces a group of
+    level n rows, which then point to it through parent_id. Rows without a
+    parent are the ones rendered in front of the output's unsummarized tail.
+    """
+    __tablename__ = "output_summary"
+    __table_args__ = (sa.Index("ix_output_summary_session_output", "session_id", "output"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    session_id: Mapped[str] = mapped_column(sa.ForeignKey("session.id"))
+    output: Mapped[str] = mapped_column(sa.String(64))
+    level: Mapped[int] = mapped_column()
+    parent_id: Mapped[Optional[int]] = mapped_column(sa.ForeignKey("output_summary.id"), nullable=True)
+    source_chars: Mapped[int] = mapped_column()
+    summary: Mapped[str] = mapped_column(type_=CompressedText)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+
+
+class SummaryCacheEntry(Base):
+    """LLM summary keyed by a hash of the content, its type, the model and the prompt version"""
+    __tablename__ = "summary_cache"
+
+    key: Mapped[str] = mapped_column(sa.String(64), primary_key=True)
+    content_type: Mapped[str] = mapped_column(sa.String(64))
+    model: Mapped[str] = mapped_column(sa.String(64))
+    summary: Mapped[str] = mapped_column(type_=CompressedText)
+    # How long the LLM took to produce the summary, i.e. what every hit saves
+    latency_ms: Mapped[float] = mapped_column()
+    hits: Mapped[int] = mapped_column(default=0)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+    last_used_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc), index=True)
+
+
+class LlmUsage(Base):
+    """Tokens, latency and estimated cost of one LLM call, attributed to the session, node and task that made it"""
+    __tablename__ = "llm_usage"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # Empty for calls made outside a session, e.g. by the JSON parser
+    session_id: Mapped[Optional[str]] = mapped_column(sa.ForeignKey("session.id"), nullable=True, index=True)
+    node: Mapped[str] = mapped_column(sa.String(64))
+    task_id: Mapped[Optional[str]] = mapped_column(sa.String(64), nullable=True)
+    model: Mapped[str] = mapped_column(sa.String(64))
+    input_tokens: Mapped[int] = mapped_column()
+    output_tokens: Mapped[int] = mapped_column()
+    latency_ms: Mapped[float] = mapped_column()
+    # Priced when the call is recorded, so later price changes do not rewrite past spend
+    cost_usd: Mapped[float] = mapped_column()
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+
+class GraphCheckpoint(Base):
+    """Latest LangGraph checkpoint of a build thread, per graph namespace.
+
+    The orchestrator checkpoints under the session id as thread id and every
+    developer task loop under ``{session_id}/task-N`` (task_thread_id), so
+    deleting a session's thread also deletes the threads with its prefix.
+    """
+    __tablename__ = "graph_checkpoint"
+
+    thread_id: Mapped[str] = mapped_column(sa.String(64), primary_key=True)
+    checkpoint_ns: Mapped[str] = mapped_column(sa.String(255), primary_key=True)
+    checkpoint_id: Mapped[str] = mapped_column(sa.String(64), primary_key=True)
+    parent_checkpoint_id: Mapped[Optional[str]] = mapped_column(sa.String(64), nullable=True)
+    checkpoint_type: Mapped[str] = mapped_column(sa.String(32))
+    checkpoint: Mapped[bytes] = mapped_column(CompressedBinary)
+    metadata_type: Mapped[str] = mapped_column(sa.String(32))
+    checkpoint_metadata: Mapped[bytes] = mapped_column(CompressedBinary)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+
+
+class GraphCheckpointWrite(Base):
+    """Pending write of a node that finished after the checkpoint it belongs to"""
+    __tablename__ = "graph_checkpoint_write"
+
+    thread_id: Mapped[str] = mapped_column(sa.String(64), primary_key=True)
+    checkpoint_ns: Mapped[str] = mapped_column(sa.String(255), primary_key=True)
+    checkpoint_id: Mapped[str] = mapped_column(sa.String(64), primary_key=True)
+    task_id: Mapped[str] = mapped_column(sa.String(64), primary_key=True)
+    idx: Mapped[int] = mapped_column(primary_key=True)
+    task_path: Mapped[str] = mapped_column(sa.String(255), default="")
+    channel: Mapped[str] = mapped_column(sa.String(255))
+    value_type: Mapped[str] = mapped_column(sa.String(32))
+    value: Mapped[bytes] = mapped_column(CompressedBinary)
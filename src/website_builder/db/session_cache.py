@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from website_builder.config import SESSION_CACHE_MAX_SESSIONS, SESSION_CACHE_FLUSH_INTERVAL
+from website_builder.db.async_crud import load_session_state, append_session_messages, update_session_fields
+from website_builder.db.crud import split_state
+
+logger = logging.getLogger(__name__)
+
+
+class CachedSession:
+    def __init__(self, session_id: str, state: Dict[str, Any]):
+        self.session_id = session_id
+        self.state = state
+        self.persisted_messages = len(state.get("requirements_messages", []))
+        self.dirty = False
+        self.users = 0
+        self.lock = asyncio.Lock()
+
+
+class SessionStateCache:
+    """LRU cache of deserialized requirements state for sessions that are chatting.
+
+    A turn holds the session's lock, so concurrent turns of one session run one
+    after the other. The messages of a turn are appended to session_message
+    before the turn is acknowledged, so a restart never loses them. Only the
+    small remaining state fields are written behind, on a periodic flush, on
+    eviction and on shutdown.
+    """
+
+    def __init__(self, max_sessions: int, flush_interval: float):
+        self.max_sessions = max_sessions
+        self.flush_interval = flush_interval
+        self._entries: "OrderedDict[str, CachedSession]" = OrderedDict()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Session state cache started, holding up to {self.max_sessions} sessions")
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush_all()
+        self._entries.clear()
+        logger.info("Session state cache stopped")
+
+    def add(self, session_id: str, state: Optional[Dict[str, Any]] = None):
+        """Cache a session created by this process, nothing is stored for it yet"""
+        self._entries[session_id] = CachedSession(session_id, state or {"requirements_messages": []})
+
+    def invalidate(self, session_id: str):
+        self._entries.pop(session_id, None)
+
+    async def load(self, session_id: str) -> CachedSession:
+        """Cached entry of the session, loaded from the database on a miss"""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            entry = CachedSession(session_id, await load_session_state(session_id))
+            # Another turn may have loaded the session while this one waited on the database
+            entry = self._entries.setdefault(session_id, entry)
+        self._entries.move_to_end(session_id)
+        return entry
+
+    @asynccontextmanager
+    async def session(self, session_id: str):
+        """Hold the session's turn lock and yield its cached entry"""
+        entry = await self.load(session_id)
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield entry
+        finally:
+            entry.users -= 1
+            await self._evict()
+
+    async def save_turn(self, entry: CachedSession, state: Dict[str, Any]):
+        """Persist the turn's new messages now and the remaining state fields later"""
+        messages = list(state.get("requirements_messages", []))
+        try:
+            await append_session_messages(entry.session_id, entry.persisted_messages,
+                                          messages[entry.persisted_messages:])
+        except IntegrityError:
+            # Another process wrote to this session, the cached conversation is stale
+            self.invalidate(entry.session_id)
+            raise
+        entry.persisted_messages = len(messages)
+        entry.state = state
+        entry.dirty = True
+
+    async def flush(self, entry: CachedSession):
+        if not entry.dirty:
+            return
+        entry.dirty = False
+        try:
+            _, fields_json = split_state(entry.state)
+            await update_session_fields(entry.session_id, fields_json)
+        except Exception:
+            entry.dirty = True
+            raise
+
+    async def flush_all(self):
+        for entry in list(self._entries.values()):
+            try:
+                await self.flush(entry)
+            except Exception as e:
+                logger.error(f"Flushing cached state of session {entry.session_id} failed: {e}")
+
+    async def _evict(self):
+        while len(self._entries) > self.max_sessions:
+            victim = next((entry for entry in self._entries.values() if entry.users == 0), None)
+            if victim is None:
+                return
+            del self._entries[victim.session_id]
+            try:
+                await self.flush(victim)
+            except Exception as e:
+                logger.error(f"Flushing evicted session {victim.session_id} failed: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush_all()
+
+
+session_state_cache = SessionStateCache(SESSION_CACHE_MAX_SESSIONS, SESSION_CACHE_FLUSH_INTERVAL)
@@ -0,0 +1,17 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from website_builder.config import BLOCKING_EXECUTOR_WORKERS
+
+_blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_EXECUTOR_WORKERS, thread_name_prefix="blocking")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run synchronous work (database access, large JSON handling) off the event loop.
+
+    The executor is bounded so a burst of requests queues up instead of
+    spawning an unbounded number of threads.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(func, *args, **kwargs))
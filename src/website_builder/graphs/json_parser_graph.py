@@ -18,4 +18,4 @@ def build_json_parser_graph():
     graph.add_edge("user_message", "send_message")
     graph.add_edge("user_message", END)
 
-    return graph.compile()
+    return graph.compile(name="json_parser")
@@ -6,12 +6,18 @@ from website_builder.agents.orchestrator_agent import create_task_manager_node,
 from website_builder.models.state_models import OrchestratorState
 
 
-async def build_orchestrator_graph():
+async def build_orchestrator_graph(task_manager_graph=None, developer_graph=None, checkpointer=None):
+    """Build the orchestrator graph, compiling any subgraph that is not passed in.
+
+    The subgraphs are compiled without a checkpointer and inherit this one.
+    """
     from website_builder.graphs.task_manager_graph import build_task_manager_graph
     from website_builder.graphs.developer_graph import build_developer_graph
 
-    task_manager_graph = build_task_manager_graph()
-    developer_graph = await build_developer_graph()
+    if task_manager_graph is None:
+        task_manager_graph = build_task_manager_graph()
+    if developer_graph is None:
+        developer_graph = await build_developer_graph()
 
     graph = StateGraph(OrchestratorState)
 
@@ -24,4 +30,4 @@ async def build_orchestrator_graph():
     graph.add_edge("development_phase", "finalize_project")
     graph.add_edge("finalize_project", END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer, name="orchestrator")
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from langgraph.graph.state import CompiledStateGraph
+
+from website_builder.db.checkpointer import build_checkpointer
+from website_builder.graphs.developer_graph import build_developer_graph
+from website_builder.graphs.orchestrator_graph import build_orchestrator_graph
+from website_builder.graphs.requirements_graph import build_single_step_requirements_graph
+from website_builder.graphs.task_manager_graph import build_task_manager_graph
+
+logger = logging.getLogger(__name__)
+
+
+class GraphRegistry:
+    """Process-wide holder of compiled graphs.
+
+    Compiled LangGraph runnables are stateless between invocations, so each
+    graph is compiled once (normally from the FastAPI lifespan hook) and the
+    same runnable is handed to every request and build.
+    """
+
+    def __init__(self):
+        self._graphs: Dict[str, CompiledStateGraph] = {}
+        self._lock = asyncio.Lock()
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self.compile_timings_ms: Dict[str, float] = {}
+        self.warm_up_error: Optional[str] = None
+        self.ready = False
+
+    def start_warm_up(self) -> asyncio.Task:
+        """Warm up in the background so the server can answer /health meanwhile"""
+        if self._warm_up_task is None or self._warm_up_task.done():
+            self._warm_up_task = asyncio.create_task(self.__warm_up_logged())
+        return self._warm_up_task
+
+    async def stop_warm_up(self):
+        if self._warm_up_task is not None and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+            await asyncio.gather(self._warm_up_task, return_exceptions=True)
+
+    async def warm_up(self):
+        """Compile every graph used by the API"""
+        async with self._lock:
+            if self.ready:
+                return
+            started = time.perf_counter()
+            self.__compile("requirements", build_single_step_requirements_graph)
+            self.__compile("task_manager", build_task_manager_graph)
+            # Every developer task loop is its own checkpointed run, see create_developer_node
+            await self.__compile_async("developer", lambda: build_developer_graph(checkpointer=build_checkpointer))
+            await self.__compile_async("orchestrator", lambda: build_orchestrator_graph(
+                task_manager_graph=self._graphs["task_manager"],
+                developer_graph=self._graphs["developer"],
+                checkpointer=build_checkpointer
+            ))
+            self.ready = True
+            self.warm_up_error = None
+            logger.info(f"Graph registry warmed up in {(time.perf_counter() - started) * 1000:.1f} ms: "
+                        f"{self.compile_timings_ms}")
+
+    async def __warm_up_logged(self):
+        try:
+            await self.warm_up()
+        except Exception as e:
+            self.warm_up_error = str(e)
+            logger.error(f"Graph registry warm-up failed: {e}")
+
+    def get_requirements_graph(self) -> CompiledStateGraph:
+        if "requirements" not in self._graphs:
+            self.__compile("requirements", build_single_step_requirements_graph)
+        return self._graphs["requirements"]
+
+    async def get_orchestrator_graph(self) -> CompiledStateGraph:
+        if not self.ready:
+            await self.warm_up()
+        return self._graphs["orchestrator"]
+
+    def __compile(self, name: str, builder):
+        started = time.perf_counter()
+        self._graphs[name] = builder()
+        self.compile_timings_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    async def __compile_async(self, name: str, builder):
+        started = time.perf_counter()
+        self._graphs[name] = await builder()
+        self.compile_timings_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+graph_registry = GraphRegistry()
@@ -16,4 +16,4 @@ def build_single_step_requirements_graph():
     graph.add_edge(START, "process_message")
     graph.add_edge("process_message", END)
 
-    return graph.compile()
+    return graph.compile(name="requirements")
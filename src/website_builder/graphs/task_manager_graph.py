@@ -18,4 +18,4 @@ def build_task_manager_graph():
     graph.add_edge("generate_tasks", "parse_tasks")
     graph.add_edge("parse_tasks", END)
 
-    return graph.compile()
+    return graph.compile(name="task_manager")
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+logger = logging.getLogger(__name__)
+
+FILE_WRITING_TOOLS = {"write_file", "edit_file", "move_file"}
+
+
+class BuildEventBroker:
+    """In-memory fan-out of build progress snapshots per session.
+
+    Every publish merges into the session's latest snapshot, so a subscriber
+    that connects late still starts from the current state. Subscriber queues
+    hold a single snapshot and slow consumers simply skip intermediate ones.
+    """
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self._snapshots: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def snapshot(self, session_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshots.get(session_id)
+        return dict(snapshot) if snapshot is not None else None
+
+    def publish(self, session_id: str, **changes):
+        snapshot = self._snapshots.pop(session_id, None) or {"session_id": session_id, "files_written": []}
+        snapshot.update(changes)
+        snapshot["updated_at"] = datetime.now(timezone.utc).isoformat()
+        self._snapshots[session_id] = snapshot
+        while len(self._snapshots) > self.max_sessions:
+            self._snapshots.popitem(last=False)
+
+        for queue in self._subscribers.get(session_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(dict(snapshot))
+
+    def subscribe(self, session_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers.setdefault(session_id, set()).add(queue)
+        snapshot = self.snapshot(session_id)
+        if snapshot is not None:
+            queue.put_nowait(snapshot)
+        return queue
+
+    def unsubscribe(self, session_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(session_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[session_id]
+
+
+class BuildProgressTracker:
+    """Turns orchestrator ``astream`` chunks and developer task loop updates into progress events.
+
+    The developer node runs several task loops at once and reports them
+    through task_started, task_update and task_finished. A resumed build
+    starts from zero finished tasks and reports the tasks finished before it
+    was interrupted as the developer node reaches them.
+    """
+
+    def __init__(self, broker: BuildEventBroker, session_id: str):
+        self.broker = broker
+        self.session_id = session_id
+        self.tasks: List[Dict[str, Any]] = []
+        self.files_written: List[str] = []
+        self.running_tasks: List[int] = []
+        self.tasks_done = 0
+        self.stopped_tasks: List[Dict[str, Any]] = []
+        self._pending_file_calls: Dict[str, str] = {}
+
+    def phase(self, phase: str):
+        self.broker.publish(self.session_id, phase=phase)
+
+    def resume(self, state: Dict[str, Any]):
+        """Pick up the progress of a build resumed from its checkpointed orchestrator state"""
+        self.tasks = state.get("tasks_output", [])
+        if self.tasks:
+            self.broker.publish(self.session_id, phase="development", task_total=len(self.tasks),
+                                running_tasks=[], tasks_done=0, stopped_tasks=[])
+        else:
+            self.phase("task_management")
+
+    def update(self, namespace: Tuple[str, ...], chunk: Dict[str, Any]):
+        # Nested chunks come from the task manager subgraph, which has nothing to report
+        if namespace:
+            return
+        for node_name, state_update in chunk.items():
+            if isinstance(state_update, dict):
+                self.__orchestrator_update(node_name, state_update)
+
+    def task_started(self, task_index: int):
+        self.running_tasks.append(task_index)
+        self.__publish_task(task_index)
+
+    def task_update(self, chunk: Dict[str, Any]):
+        """Record the files written by one ``stream_mode="updates"`` chunk of a developer task loop"""
+        for state_update in chunk.values():
+            if isinstance(state_update, dict):
+                self.__developer_update(state_update)
+
+    def task_finished(self, task_index: int, stopped: Optional[Dict[str, Any]] = None):
+        """Report a finished task, ``stopped`` is the record of a task skipped or failed before completion.
+
+        A task that finished before the build was resumed is reported without having been started.
+        """
+        if task_index in self.running_tasks:
+            self.running_tasks.remove(task_index)
+        self.tasks_done += 1
+        changes = {"running_tasks": self.__running_task_ids(), "tasks_done": self.tasks_done}
+        if stopped is not None:
+            self.stopped_tasks.append(stopped)
+            changes["stopped_tasks"] = list(self.stopped_tasks)
+        self.broker.publish(self.session_id, **changes)
+
+    def __orchestrator_update(self, node_name: str, state_update: Dict[str, Any]):
+        if node_name == "task_management_phase":
+            self.tasks = state_update.get("tasks_output", [])
+            self.broker.publish(self.session_id, phase="development", task_total=len(self.tasks),
+                                running_tasks=[], tasks_done=0, stopped_tasks=[])
+        elif node_name == "development_phase":
+            self.broker.publish(self.session_id, phase="finalizing",
+                                project_status=state_update.get("project_status"))
+        elif node_name == "finalize_project":
+            self.broker.publish(self.session_id, phase="complete")
+
+    def __developer_update(self, state_update: Dict[str, Any]):
+        new_files = []
+        for message in state_update.get("developer_messages", []) or []:
+            if isinstance(message, AIMessage):
+                for tool_call in message.tool_calls:
+                    path = tool_call["args"].get("path") or tool_call["args"].get("destination")
+                    if tool_call["name"] in FILE_WRITING_TOOLS and path:
+                        self._pending_file_calls[tool_call["id"]] = path
+            elif isinstance(message, ToolMessage):
+                path = self._pending_file_calls.pop(message.tool_call_id, None)
+                if path and getattr(message, "status", "success") != "error" and path not in self.files_written:
+                    self.files_written.append(path)
+                    new_files.append(path)
+        if new_files:
+            self.broker.publish(self.session_id, files_written=list(self.files_written))
+
+    def __running_task_ids(self) -> List[Any]:
+        return [self.tasks[index].get("id") for index in self.running_tasks if index < len(self.tasks)]
+
+    def __publish_task(self, task_index: int):
+        """Report the most recently started task and every task that is running"""
+        task = self.tasks[task_index] if task_index < len(self.tasks) else {}
+        self.broker.publish(
+            self.session_id,
+            task_index=task_index,
+            task_id=task.get("id"),
+            task_title=task.get("title"),
+            running_tasks=self.__running_task_ids()
+        )
+
+
+build_event_broker = BuildEventBroker()
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Set
+
+from website_builder.config import BUILD_WORKERS
+from website_builder.db.async_crud import load_session_state, add_requirements_gatherer_output, create_build_job, \
+    start_build_job, finish_build_job, find_build_jobs_by_status, find_latest_build_job
+from website_builder.db.checkpointer import build_checkpointer
+from website_builder.db.database_models import BuildJob
+from website_builder.jobs.build_events import build_event_broker, BuildProgressTracker
+from website_builder.jobs.output_compactor import output_compactor
+from website_builder.graphs.registry import graph_registry
+from website_builder.llm_usage import usage_scope
+from website_builder.metrics import BUILDS_ACTIVE, BUILDS_QUEUED
+from website_builder.models.state_models import OrchestratorState
+from website_builder.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED_JOB_STATUSES = ["queued", "running"]
+
+
+async def run_orchestrator_build(session_id: str, resume: bool = False) -> Dict[str, Any]:
+    """Run the orchestrator graph for a session whose requirements are complete.
+
+    The graph is checkpointed under the session id. With resume, an
+    interrupted build continues from its last checkpoint, otherwise any
+    checkpoint left by an earlier build is dropped and the build starts over.
+    """
+    orchestrator = await graph_registry.get_orchestrator_graph()
+    tracker = BuildProgressTracker(build_event_broker, session_id)
+    # The session id is the checkpoint thread and what the filesystem tools are sandboxed to
+    config = {"recursion_limit": 100000, "debug": True,
+              "configurable": {"session_id": session_id, "thread_id": session_id, "progress_tracker": tracker}}
+    snapshot = await orchestrator.aget_state(config) if resume else None
+    if snapshot is not None and snapshot.next:
+        logger.info(f"Resuming build of session {session_id} at {snapshot.next}")
+        graph_input = None
+        tracker.resume(snapshot.values)
+    else:
+        logger.info(f"Requirements complete for session {session_id}, proceeding to website building...")
+        await build_checkpointer.adelete_thread(session_id)
+        requirements_result = await load_session_state(session_id)
+        graph_input: OrchestratorState = {
+            "user_input": "",
+            "current_phase": "requirements_complete",
+            "requirements_output": requirements_result["requirements_messages"],
+            "tasks_output": [],
+            "development_output": "",
+            "project_status": "starting",
+            "final_result": "",
+            "session_id": session_id
+        }
+        await add_requirements_gatherer_output(session_id, requirements_result["requirements_messages"])
+        logger.info("Starting orchestrator execution with completed requirements...")
+        tracker.phase("task_management")
+    final_state = None
+    with usage_scope(session_id=session_id):
+        async for namespace, step in orchestrator.astream(graph_input, config=config, subgraphs=True):
+            tracker.update(namespace, step)
+            if namespace:
+                continue
+            for node_name, state_update in step.items():
+                logger.info(f"Phase: {node_name}")
+                if "current_phase" in state_update:
+                    logger.info(f"Current Phase: {state_update['current_phase']}")
+                if "final_result" in state_update and state_update["final_result"]:
+                    logger.info(f"Result: {state_update['final_result']}")
+                final_state = state_update
+
+    logger.info("Orchestrator execution completed")
+
+    if not final_state:
+        raise RuntimeError("No final state received from orchestrator")
+
+    # A finished build is never resumed
+    await build_checkpointer.adelete_thread(session_id)
+    return final_state
+
+
+class BuildJobRunner:
+    """Runs orchestrator builds on a fixed-size pool of asyncio workers.
+
+    Jobs are persisted in the ``build_job`` table so their state survives the
+    request that queued them and can be reported by ``/poll/{session_id}``.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._interrupted: Set[str] = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        BUILDS_QUEUED.set_function(self._queue.qsize)
+        for job in await find_build_jobs_by_status(UNFINISHED_JOB_STATUSES):
+            if job.status == "running":
+                # The process that owned this job went away mid-build, continue from its last checkpoint
+                logger.info(f"Resuming interrupted build job {job.id} for session {job.session_id}")
+                self._interrupted.add(job.id)
+            self._queue.put_nowait(job.id)
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        logger.info(f"Build job runner started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Build job runner stopped")
+
+    async def enqueue(self, session_id: str) -> BuildJob:
+        """Queue a build for the session, reusing an unfinished job if one exists"""
+        if self._queue is None:
+            raise RuntimeError("Build job runner is not started")
+        latest_job = await find_latest_build_job(session_id)
+        if latest_job is not None and latest_job.status in UNFINISHED_JOB_STATUSES:
+            logger.info(f"Build job {latest_job.id} already {latest_job.status} for session {session_id}")
+            return latest_job
+        job = await create_build_job(session_id)
+        build_event_broker.publish(session_id, job_id=job.id, job_status=job.status, phase="queued",
+                                   task_index=None, task_id=None, task_title=None, task_total=None,
+                                   running_tasks=[], tasks_done=0,
+                                   files_written=[], completed=False, error=None)
+        self._queue.put_nowait(job.id)
+        logger.info(f"Queued build job {job.id} for session {session_id}")
+        return job
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            BUILDS_ACTIVE.inc()
+            try:
+                await self._run_job(job_id)
+            finally:
+                BUILDS_ACTIVE.dec()
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str):
+        job = await start_build_job(job_id)
+        build_event_broker.publish(job.session_id, job_id=job.id, job_status=job.status)
+        logger.info(f"Running build job {job.id} for session {job.session_id}")
+        try:
+            # Workers are detached from the request that queued the job, the build is a trace of its own
+            with usage_scope(session_id=job.session_id), \
+                    tracer.start_as_current_span("build", attributes={"session.id": job.session_id, "build.job_id": job.id,
+                                                                      "build.resume": job_id in self._interrupted}):
+                await run_orchestrator_build(job.session_id, resume=job_id in self._interrupted)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Build job {job.id} failed: {e}")
+            await finish_build_job(job.id, "failed", str(e))
+            build_event_broker.publish(job.session_id, job_status="failed", completed=True, error=str(e))
+            return
+        finally:
+            self._interrupted.discard(job_id)
+            # The build appended requirements and task outputs, summarize them if they grew too long
+            output_compactor.request(job.session_id)
+        await finish_build_job(job.id, "done")
+        build_event_broker.publish(job.session_id, job_status="done", completed=True)
+        logger.info(f"Build job {job.id} done")
+
+
+build_job_runner = BuildJobRunner(BUILD_WORKERS)
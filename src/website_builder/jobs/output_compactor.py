@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from website_builder.config import OUTPUT_COMPACTION_INTERVAL
+from website_builder.db.async_crud import find_sessions_to_compact, compact_session_outputs
+from website_builder.llm_usage import usage_scope
+
+logger = logging.getLogger(__name__)
+
+# A session whose compaction keeps failing is swept again after at most this many intervals
+MAX_BACKOFF_INTERVALS = 64
+
+
+class OutputCompactor:
+    """Summarizes session outputs that grew too long, off the write path.
+
+    Appending an output never waits for the LLM. Sessions are compacted one
+    step, one bounded LLM call, at a time when a writer asks for it and on a
+    periodic sweep, which also picks up work left over by a restart or a lost
+    race with a concurrent append. A session is queued again until it has
+    nothing left to compact, which is recorded so the sweep skips it until its
+    outputs change. A session whose compaction failed is skipped by the sweep
+    for a backoff that doubles with every failure in a row.
+    """
+
+    def __init__(self, interval: float, max_length: int = 5000):
+        self.interval = interval
+        self.max_length = max_length
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        # Failures in a row and the monotonic time before which the sweep skips the session
+        self._failures: Dict[str, Tuple[int, float]] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Output compactor started, sweeping every {self.interval}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._pending.clear()
+        self._failures.clear()
+        logger.info("Output compactor stopped")
+
+    def request(self, session_id: str):
+        """Ask for the session's outputs to be checked, without waiting for it"""
+        if self._queue is None or session_id in self._pending:
+            return
+        self._pending.add(session_id)
+        self._queue.put_nowait(session_id)
+
+    async def sweep(self):
+        now = time.monotonic()
+        session_ids = set(await find_sessions_to_compact(self.max_length))
+        # Sessions that no longer need compacting were compacted meanwhile or expired
+        self._failures = {session_id: failure for session_id, failure in self._failures.items()
+                          if session_id in session_ids}
+        for session_id in session_ids:
+            if session_id in self._failures and self._failures[session_id][1] > now:
+                continue
+            self.request(session_id)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Output compaction sweep failed: {e}")
+            try:
+                while True:
+                    session_id = await asyncio.wait_for(self._queue.get(), timeout=self.interval)
+                    self._pending.discard(session_id)
+                    await self._compact(session_id)
+            except asyncio.TimeoutError:
+                continue
+
+    async def _compact(self, session_id: str):
+        try:
+            with usage_scope(session_id=session_id):
+                compacted = await compact_session_outputs(session_id, self.max_length)
+        except Exception as e:
+            failures = self._failures.get(session_id, (0, 0.0))[0] + 1
+            backoff = self.interval * min(2 ** (failures - 1), MAX_BACKOFF_INTERVALS)
+            self._failures[session_id] = (failures, time.monotonic() + backoff)
+            logger.error(f"Compacting outputs of session {session_id} failed, "
+                         f"{failures} in a row, retrying in {backoff:g}s: {e}")
+            return
+        self._failures.pop(session_id, None)
+        if compacted is None:
+            return
+        if compacted:
+            logger.info(f"Compacted outputs of session {session_id}")
+        else:
+            logger.info(f"Outputs of session {session_id} changed while compacting, retrying")
+        self.request(session_id)
+
+
+output_compactor = OutputCompactor(OUTPUT_COMPACTION_INTERVAL)
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from website_builder.config import SESSION_RETENTION_DAYS, SESSION_RETENTION_ACTION, SESSION_RETENTION_INTERVAL, \
+    SESSION_RETENTION_BATCH_SIZE
+from website_builder.db.async_crud import find_expired_sessions, expire_sessions
+from website_builder.db.checkpointer import build_checkpointer
+from website_builder.db.session_cache import session_state_cache
+from website_builder.executor import run_blocking
+from website_builder.jobs.build_runner import UNFINISHED_JOB_STATUSES
+from website_builder.workspace.archive import archive_workspace, delete_workspace
+
+logger = logging.getLogger(__name__)
+
+RETENTION_ACTIONS = {"archive": archive_workspace, "delete": delete_workspace}
+
+
+class RetentionSweeper:
+    """Expires sessions that have been idle for longer than the retention period.
+
+    Each sweep works through the expired sessions in batches: the workspace of
+    every session is archived or deleted first, then the batch's conversation,
+    outputs and summaries are dropped in one transaction and the rows are kept
+    with status "expired". Sessions with a queued or running build are skipped.
+    """
+
+    def __init__(self, retention_days: float, action: str, interval: float, batch_size: int):
+        if action not in RETENTION_ACTIONS:
+            raise ValueError(f"Unknown session retention action {action!r}, expected one of {list(RETENTION_ACTIONS)}")
+        self.retention_days = retention_days
+        self.action = action
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    async def start(self):
+        if not self.enabled:
+            logger.info("Session retention disabled")
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Retention sweeper started, expiring sessions idle for {self.retention_days} days "
+                    f"({self.action}) every {self.interval}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Retention sweeper stopped")
+
+    async def sweep(self) -> Dict[str, int]:
+        """Expire every session past the retention period, returns the sessions expired and bytes reclaimed"""
+        idle_before = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        report = {"sessions": 0, "reclaimed_bytes": 0}
+        while session_ids := await find_expired_sessions(idle_before, UNFINISHED_JOB_STATUSES, self.batch_size):
+            for session_id in session_ids:
+                session_state_cache.invalidate(session_id)
+                await build_checkpointer.adelete_thread(session_id)
+                report["reclaimed_bytes"] += await run_blocking(RETENTION_ACTIONS[self.action], session_id)
+            await expire_sessions(session_ids)
+            report["sessions"] += len(session_ids)
+            logger.info(f"Expired {len(session_ids)} sessions, {report['reclaimed_bytes']} bytes reclaimed so far")
+        return report
+
+    async def _run(self):
+        while True:
+            try:
+                report = await self.sweep()
+                if report["sessions"]:
+                    logger.info(f"Retention sweep expired {report['sessions']} sessions "
+                                f"and reclaimed {report['reclaimed_bytes']} bytes")
+            except Exception as e:
+                logger.error(f"Retention sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+retention_sweeper = RetentionSweeper(SESSION_RETENTION_DAYS, SESSION_RETENTION_ACTION, SESSION_RETENTION_INTERVAL,
+                                     SESSION_RETENTION_BATCH_SIZE)
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+from typing import Optional
+
+from website_builder.config import USAGE_FLUSH_INTERVAL
+from website_builder.db.async_crud import add_llm_usage
+from website_builder.llm_usage import usage_callback
+
+logger = logging.getLogger(__name__)
+
+
+class UsageRecorder:
+    """Writes the LLM calls buffered by the usage callback to llm_usage in batches.
+
+    LLM calls never wait for the database, the buffer is flushed every
+    flush interval, before usage is reported and on shutdown.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Usage recorder started, flushing every {self.flush_interval}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        logger.info("Usage recorder stopped")
+
+    async def flush(self) -> int:
+        """Store every buffered call, returns how many were stored"""
+        async with self._lock:
+            calls = usage_callback.drain()
+            if not calls:
+                return 0
+            try:
+                await add_llm_usage(calls)
+            except Exception:
+                usage_callback.restore(calls)
+                raise
+            return len(calls)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Flushing LLM usage failed: {e}")
+
+
+usage_recorder = UsageRecorder(USAGE_FLUSH_INTERVAL)
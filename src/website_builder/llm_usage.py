@@ -0,0 +1,107 @@
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+logger = logging.getLogger(__name__)
+
+# USD per million input and output tokens, at the standard context prices
+MODEL_PRICES = {
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.0-flash": (0.10, 0.40),
+}
+# Calls kept while nothing drains the buffer, e.g. in scripts, the oldest are dropped beyond it
+MAX_BUFFERED_CALLS = 10000
+
+_usage_scope: ContextVar[Dict[str, str]] = ContextVar("llm_usage_scope", default={})
+
+
+@contextmanager
+def usage_scope(**attributes: Optional[str]):
+    """Attribute the LLM calls made inside the block to a session, node and task.
+
+    Scopes nest, an inner scope only overrides the attributes it sets. The
+    scope is a context variable, so it follows the asyncio tasks started
+    inside the block.
+    """
+    token = _usage_scope.set({**_usage_scope.get(),
+                              **{key: value for key, value in attributes.items() if value is not None}})
+    try:
+        yield
+    finally:
+        _usage_scope.reset(token)
+
+
+def current_usage_scope() -> Dict[str, str]:
+    return _usage_scope.get()
+
+
+def call_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model.removeprefix("models/"), (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Records the tokens, latency and model of every LLM call of the clients it is attached to.
+
+    It runs inline, so it sees the usage scope of the caller. Calls are only
+    buffered here, the usage recorder drains the buffer into the database.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._started: Dict[UUID, tuple] = {}
+        self._calls: deque = deque(maxlen=MAX_BUFFERED_CALLS)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        model = (metadata or {}).get("ls_model_name") or (serialized.get("kwargs") or {}).get("model", "unknown")
+        self._started[run_id] = (time.perf_counter(), model, dict(_usage_scope.get()))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        started_at, model, scope = started
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        self._calls.append({
+            "session_id": scope.get("session_id"),
+            "node": scope.get("node", "unknown"),
+            "task_id": scope.get("task_id"),
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "latency_ms": (time.perf_counter() - started_at) * 1000,
+            "cost_usd": call_cost(model, input_tokens, output_tokens)
+        })
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Take the calls recorded since the last drain"""
+        calls = []
+        while self._calls:
+            calls.append(self._calls.popleft())
+        return calls
+
+    def restore(self, calls: List[Dict[str, Any]]):
+        """Put back calls that could not be stored, ahead of the newer ones"""
+        self._calls.extendleft(reversed(calls))
+
+
+usage_callback = UsageCallbackHandler()
@@ -1,17 +1,63 @@
-from langchain_mcp_adapters.client import MultiServerMCPClient
+import asyncio
+import shutil
+from typing import Any
 
-from website_builder.config import PROJECT_WORKSPACE
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool
+from mcp import StdioServerParameters
+
+from website_builder.config import PROJECT_WORKSPACE, MCP_POOL_SIZE, MCP_HEALTH_CHECK_INTERVAL, \
+    MCP_FILESYSTEM_COMMAND
+from website_builder.mcp.pool import McpServerPool
+from website_builder.tools.file_system_tools import WRITE_TOOL_PATH_ARGS, claim_files, resolve_path
+
+_file_system_tools = None
+
+
+def file_system_server_params() -> StdioServerParameters:
+    """Prefer a locally installed filesystem server so startup never hits the npm registry"""
+    if MCP_FILESYSTEM_COMMAND:
+        command, *args = MCP_FILESYSTEM_COMMAND.split()
+        return StdioServerParameters(command=command, args=[*args, PROJECT_WORKSPACE])
+    if shutil.which("mcp-server-filesystem"):
+        return StdioServerParameters(command="mcp-server-filesystem", args=[PROJECT_WORKSPACE])
+    return StdioServerParameters(
+        command="npx",
+        args=["-y", "@modelcontextprotocol/server-filesystem", PROJECT_WORKSPACE]
+    )
+
+
+mcp_server_pool = McpServerPool(
+    file_system_server_params(),
+    size=MCP_POOL_SIZE,
+    health_check_interval=MCP_HEALTH_CHECK_INTERVAL
+)
 
 
 async def mcp_file_system_tools():
-    client = MultiServerMCPClient({
-        "filesystem": {
-            "command": "npx",
-            "args": [
-                "-y", "@modelcontextprotocol/server-filesystem",
-                PROJECT_WORKSPACE
-            ],
-            "transport": "stdio"
-        }
-    })
-    return await client.get_tools()
+    global _file_system_tools
+    if _file_system_tools is None:
+        await mcp_server_pool.start()
+        _file_system_tools = [__owned_write_tool(mcp_tool) if mcp_tool.name in WRITE_TOOL_PATH_ARGS else mcp_tool
+                              for mcp_tool in await mcp_server_pool.get_tools()]
+    return list(_file_system_tools)
+
+
+def __owned_write_tool(mcp_tool: StructuredTool) -> StructuredTool:
+    """The server's write tool, claiming the written files for the calling task first like the native tools"""
+    path_args = WRITE_TOOL_PATH_ARGS[mcp_tool.name]
+
+    async def call_owned_tool(config: RunnableConfig, **arguments: Any) -> str:
+        if not arguments.get("dryRun"):
+            # Claiming may wait for another task to release the file, which must not block the event loop
+            await asyncio.to_thread(claim_files, [resolve_path(arguments[arg], config) for arg in path_args
+                                                  if isinstance(arguments.get(arg), str)], config)
+        return await mcp_tool.coroutine(**arguments)
+
+    return StructuredTool(
+        name=mcp_tool.name,
+        description=mcp_tool.description,
+        args_schema=mcp_tool.args_schema,
+        coroutine=call_owned_tool,
+        handle_tool_error=True,
+    )
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from langchain_core.tools import StructuredTool, ToolException
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+
+logger = logging.getLogger(__name__)
+
+
+class McpServerSlot:
+    """One persistent MCP server process and the client session talking to it.
+
+    The stdio transport must be entered and exited from the same task, so each
+    slot owns a background task that keeps the process open until it is closed.
+    """
+
+    def __init__(self, index: int, server_params: StdioServerParameters):
+        self.index = index
+        self.server_params = server_params
+        self.session: Optional[ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._restart_lock = asyncio.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done() and self.session is not None
+
+    async def start(self, timeout: float):
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task = asyncio.create_task(self._serve())
+        ready_waiter = asyncio.create_task(self._ready.wait())
+        done, _ = await asyncio.wait({ready_waiter, self._task}, timeout=timeout,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        if ready_waiter not in done:
+            ready_waiter.cancel()
+            await self.close()
+            raise RuntimeError(f"MCP server slot {self.index} failed to start")
+        logger.info(f"MCP server slot {self.index} started")
+
+    async def close(self):
+        if self._closing is not None:
+            self._closing.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout=5)
+            except (asyncio.TimeoutError, Exception):
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+        self.session = None
+
+    async def restart(self, timeout: float):
+        async with self._restart_lock:
+            logger.warning(f"Restarting MCP server slot {self.index}")
+            await self.close()
+            await self.start(timeout)
+
+    async def ping(self, timeout: float) -> bool:
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP server slot {self.index} failed health check: {e}")
+            return False
+
+    async def _serve(self):
+        try:
+            async with stdio_client(self.server_params) as (read_stream, write_stream):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            logger.error(f"MCP server slot {self.index} exited: {e}")
+        finally:
+            self.session = None
+
+
+class McpServerPool:
+    """Fixed-size pool of long-lived MCP server processes.
+
+    Tool calls check a slot out of the pool, run on its session and return it,
+    so concurrent builds share the same processes instead of each starting Node.
+    A background health check pings the idle slots and restarts the ones that
+    died, a checked out slot is left to the error handling of checkout.
+    """
+
+    def __init__(self, server_params: StdioServerParameters, size: int,
+                 health_check_interval: float = 30, start_timeout: float = 60):
+        self.server_params = server_params
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.start_timeout = start_timeout
+        self._slots: List[McpServerSlot] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._slots)
+
+    async def start(self):
+        async with self._lock:
+            if self.started:
+                return
+            slots = [McpServerSlot(index, self.server_params) for index in range(self.size)]
+            try:
+                await asyncio.gather(*(slot.start(self.start_timeout) for slot in slots))
+            except Exception:
+                await asyncio.gather(*(slot.close() for slot in slots), return_exceptions=True)
+                raise
+            self._idle = asyncio.Queue()
+            for slot in slots:
+                self._idle.put_nowait(slot)
+            self._slots = slots
+            self._health_task = asyncio.create_task(self._health_check_loop())
+            logger.info(f"MCP server pool started with {self.size} processes")
+
+    async def stop(self):
+        async with self._lock:
+            if self._health_task is not None:
+                self._health_task.cancel()
+                await asyncio.gather(self._health_task, return_exceptions=True)
+                self._health_task = None
+            await asyncio.gather(*(slot.close() for slot in self._slots), return_exceptions=True)
+            self._slots = []
+            self._idle = None
+            logger.info("MCP server pool stopped")
+
+    @asynccontextmanager
+    async def checkout(self):
+        """Borrow a healthy session for the duration of the block"""
+        if not self.started:
+            await self.start()
+        slot = await self._idle.get()
+        try:
+            if not slot.alive:
+                await slot.restart(self.start_timeout)
+            yield slot.session
+        except (ToolException, McpError, asyncio.CancelledError):
+            raise
+        except Exception:
+            # Transport failures leave the session unusable, replace the process
+            await slot.restart(self.start_timeout)
+            raise
+        finally:
+            self._idle.put_nowait(slot)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> str:
+        try:
+            async with self.checkout() as session:
+                result = await session.call_tool(name, arguments)
+        except McpError as e:
+            raise ToolException(str(e))
+        text = "\n".join(content.text for content in result.content if getattr(content, "text", None) is not None)
+        if result.isError:
+            raise ToolException(text)
+        return text
+
+    async def get_tools(self) -> List[StructuredTool]:
+        """Describe the server's tools as LangChain tools that run on the pool"""
+        async with self.checkout() as session:
+            result = await session.list_tools()
+        return [self.__to_langchain_tool(mcp_tool) for mcp_tool in result.tools]
+
+    def __to_langchain_tool(self, mcp_tool) -> StructuredTool:
+        async def call_pooled_tool(**arguments: Any) -> str:
+            return await self.call_tool(mcp_tool.name, arguments)
+
+        return StructuredTool(
+            name=mcp_tool.name,
+            description=mcp_tool.description or "",
+            args_schema=mcp_tool.inputSchema,
+            coroutine=call_pooled_tool,
+            handle_tool_error=True,
+        )
+
+    async def _health_check_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await self.check_idle_slots()
+
+    async def check_idle_slots(self):
+        """Ping the slots that are idle right now, each is taken out of the pool while it is checked"""
+        for _ in range(self._idle.qsize()):
+            try:
+                slot = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            try:
+                if not await slot.ping(timeout=10):
+                    await slot.restart(self.start_timeout)
+            except Exception as e:
+                logger.error(f"Could not restart MCP server slot {slot.index}: {e}")
+            finally:
+                self._idle.put_nowait(slot)
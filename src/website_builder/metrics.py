@@ -0,0 +1,153 @@
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import CounterMetricFamily, REGISTRY
+from sqlalchemy import event
+
+from website_builder.config import FILE_SYSTEM_BACKEND
+from website_builder.llm_usage import current_usage_scope
+
+# Graphs are compiled with these names, node runs are attributed to the graph run they belong to
+GRAPH_NAMES = {"orchestrator", "requirements", "task_manager", "developer", "json_parser"}
+# LLM calls and agent steps take seconds to minutes, the default buckets stop at 10s
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+HTTP_REQUEST_SECONDS = Histogram("website_builder_http_request_seconds",
+                                 "Time to the response start of API requests", ["method", "endpoint", "status"])
+BUILDS_ACTIVE = Gauge("website_builder_builds_active", "Builds being run by the job runner")
+BUILDS_QUEUED = Gauge("website_builder_builds_queued", "Builds waiting for a job runner worker")
+GRAPH_NODE_SECONDS = Histogram("website_builder_graph_node_seconds", "Duration of LangGraph node runs",
+                               ["graph", "node", "status"], buckets=SLOW_BUCKETS)
+LLM_CALL_SECONDS = Histogram("website_builder_llm_call_seconds", "Duration of LLM calls", ["model", "node"],
+                             buckets=SLOW_BUCKETS)
+LLM_CALL_ERRORS = Counter("website_builder_llm_call_errors_total", "LLM calls that raised", ["model", "node"])
+TOOL_CALLS = Counter("website_builder_tool_calls_total", "Agent tool calls", ["backend", "tool", "status"])
+TOOL_CALL_SECONDS = Histogram("website_builder_tool_call_seconds", "Duration of agent tool calls",
+                              ["backend", "tool"])
+TASK_INTERVENTIONS = Counter("website_builder_developer_task_interventions_total",
+                             "Developer tasks escalated, skipped or failed by the step guard and the watchdog",
+                             ["action", "cause"])
+DB_STATEMENT_SECONDS = Histogram("website_builder_db_statement_seconds", "Duration of database statements",
+                                 ["engine", "operation"],
+                                 buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+
+
+def metrics_response():
+    """Body and content type of the /metrics endpoint"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times graph nodes, LLM calls and tool calls of every LangChain run in the process.
+
+    It is registered as a configure hook, so it is added to every run without
+    passing callbacks around. A node run is the chain run named after its
+    ``langgraph_node`` whose parent is the run of a named graph.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._graph_runs: Dict[UUID, str] = {}
+        self._started: Dict[UUID, tuple] = {}
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                       name: Optional[str] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None and name == node and parent_run_id in self._graph_runs:
+            # Checked first, the orchestrator's task_manager and developer nodes share their names with graphs
+            self._started[run_id] = (time.perf_counter(), self._graph_runs[parent_run_id], node)
+        elif name in GRAPH_NAMES:
+            self._graph_runs[run_id] = name
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.__finish_chain(run_id, "ok")
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # LangGraph interrupts and cancellations end the run with an error as well
+        self.__finish_chain(run_id, "error")
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        model = (metadata or {}).get("ls_model_name") or "unknown"
+        self._started[run_id] = (time.perf_counter(), model, current_usage_scope().get("node", "unknown"))
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        if (started := self._started.pop(run_id, None)) is not None:
+            started_at, model, node = started
+            LLM_CALL_SECONDS.labels(model, node).observe(time.perf_counter() - started_at)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        if (started := self._started.pop(run_id, None)) is not None:
+            _, model, node = started
+            LLM_CALL_ERRORS.labels(model, node).inc()
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                      name: Optional[str] = None, **kwargs: Any) -> None:
+        self._started[run_id] = (time.perf_counter(), name or (serialized or {}).get("name", "unknown"))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.__finish_tool(run_id, "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.__finish_tool(run_id, "error")
+
+    def __finish_chain(self, run_id: UUID, status: str):
+        self._graph_runs.pop(run_id, None)
+        if (started := self._started.pop(run_id, None)) is not None:
+            started_at, graph, node = started
+            GRAPH_NODE_SECONDS.labels(graph, node, status).observe(time.perf_counter() - started_at)
+
+    def __finish_tool(self, run_id: UUID, status: str):
+        if (started := self._started.pop(run_id, None)) is not None:
+            started_at, tool = started
+            TOOL_CALLS.labels(FILE_SYSTEM_BACKEND, tool, status).inc()
+            TOOL_CALL_SECONDS.labels(FILE_SYSTEM_BACKEND, tool).observe(time.perf_counter() - started_at)
+
+
+class SummaryCacheCollector:
+    """Exposes the summary cache counters kept by summary_cache_stats"""
+
+    COUNTERS = (("hits", "Summaries served from the summary cache"), ("misses", "Summaries computed by the LLM"))
+
+    def describe(self):
+        # Lets the registry check names without importing the database modules, which import this one
+        return [CounterMetricFamily(f"website_builder_summary_cache_{name}", documentation)
+                for name, documentation in self.COUNTERS]
+
+    def collect(self):
+        from website_builder.db.crud import summary_cache_stats
+
+        stats = summary_cache_stats.as_dict()
+        for name, documentation in self.COUNTERS:
+            yield CounterMetricFamily(f"website_builder_summary_cache_{name}", documentation, value=stats[name])
+
+
+def instrument_engine(engine, name: str):
+    """Time every statement run on the engine, by its SQL verb"""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            DB_STATEMENT_SECONDS.labels(name, operation).observe(time.perf_counter() - started)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+metrics_callback = MetricsCallbackHandler()
+# The handler is the default value, so runs in every context and thread pick it up
+_metrics_callback_var: ContextVar[Optional[BaseCallbackHandler]] = ContextVar("metrics_callback",
+                                                                             default=metrics_callback)
+register_configure_hook(_metrics_callback_var, inheritable=True)
+REGISTRY.register(SummaryCacheCollector())
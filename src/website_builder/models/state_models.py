@@ -25,6 +25,19 @@ class DeveloperState(TypedDict):
     project_status: str
     developer_messages: Annotated[Sequence[BaseMessage], add_messages]
     project_context: Dict[str, Any]
+    # Estimated tokens of the first context_messages developer messages, extended by every agent step
+    context_tokens: int
+    context_messages: int
+    # Bookkeeping of the current task, reset when the developer advances to the next one
+    task_message_sent: bool
+    task_steps: int
+    task_message_offset: int
+    task_repeats: int
+    task_escalations: int
+    # Cause and reason the current task is stopped for, empty while it runs
+    task_stop: Dict[str, str]
+    # Tasks skipped or failed before completion, with their cause and reason
+    stopped_tasks: List[Dict[str, Any]]
 
 
 class OrchestratorState(TypedDict):
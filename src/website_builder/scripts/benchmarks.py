@@ -0,0 +1,439 @@
+import asyncio
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+
+def print_section_header(title):
+    """Print a clear section header"""
+    print("\n" + "=" * 60)
+    print(f" {title}")
+    print("=" * 60)
+
+
+def print_timings(label, samples_ms):
+    """Print mean/median/p95 of a list of millisecond samples"""
+    ordered = sorted(samples_ms)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(f"  {label:<40} mean {statistics.mean(ordered):9.3f} ms | "
+          f"median {statistics.median(ordered):9.3f} ms | p95 {p95:9.3f} ms")
+
+
+def time_call(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def time_async_call(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def benchmark_graph_registry(iterations: int = 20):
+    """Compare per-request graph compilation against compiled-once registry lookups"""
+    load_dotenv()
+    print_section_header("GRAPH REGISTRY BENCHMARK")
+
+    from website_builder.graphs.registry import GraphRegistry
+    from website_builder.graphs.requirements_graph import build_single_step_requirements_graph
+    from website_builder.graphs.task_manager_graph import build_task_manager_graph
+
+    registry = GraphRegistry()
+
+    print(f"Per-request compilation vs registry lookup ({iterations} iterations):")
+    print_timings("compile requirements graph", time_call(build_single_step_requirements_graph, iterations))
+    print_timings("registry requirements graph", time_call(registry.get_requirements_graph, iterations))
+    print_timings("compile task manager graph", time_call(build_task_manager_graph, iterations))
+
+    async def orchestrator_timings():
+        from website_builder.graphs.orchestrator_graph import build_orchestrator_graph
+
+        # Building the orchestrator starts the filesystem MCP server, so keep the sample small
+        print_timings("compile orchestrator graph", await time_async_call(build_orchestrator_graph, 3))
+        await registry.warm_up()
+        print_timings("registry orchestrator graph",
+                      await time_async_call(registry.get_orchestrator_graph, iterations))
+        print(f"  One-time warm-up cost: {registry.compile_timings_ms}")
+
+    try:
+        asyncio.run(orchestrator_timings())
+    except Exception as e:
+        print(f"Skipping orchestrator timings: {e}")
+
+
+def benchmark_file_system_tools(iterations: int = 50):
+    """Compare per-call latency of the native filesystem tools against the MCP server tools"""
+    load_dotenv()
+    print_section_header("FILESYSTEM TOOL BENCHMARK")
+
+    import shutil
+    import uuid
+    from pathlib import Path
+
+    from website_builder.config import PROJECT_WORKSPACE
+    from website_builder.tools.file_system_tools import native_file_system_tools
+
+    session_id = f"benchmark-{uuid.uuid4()}"
+    base_path = f"{PROJECT_WORKSPACE}/{session_id}"
+    config = {"configurable": {"session_id": session_id}}
+    content = "<section class=\"hero\"><h1>Benchmark</h1></section>\n" * 25
+
+    def tool_calls(index):
+        file_path = f"{base_path}/page_{index}.html"
+        return [
+            ("write_file", {"path": file_path, "content": content}),
+            ("read_file", {"path": file_path}),
+            ("edit_file", {"path": file_path, "edits": [{"oldText": "Benchmark", "newText": f"Page {index}"}]}),
+            ("list_directory", {"path": base_path}),
+        ]
+
+    async def run_backend(label, tools):
+        tools_by_name = {tool.name: tool for tool in tools}
+        samples = {}
+        for index in range(iterations):
+            for name, args in tool_calls(index):
+                started = time.perf_counter()
+                await tools_by_name[name].ainvoke(args, config=config)
+                samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        for name, timings in samples.items():
+            print_timings(f"{label} {name}", timings)
+
+    async def run_all():
+        Path(base_path).mkdir(parents=True, exist_ok=True)
+        await run_backend("native", native_file_system_tools)
+        try:
+            from website_builder.mcp.file_system import mcp_file_system_tools, mcp_server_pool
+
+            await run_backend("mcp", await mcp_file_system_tools())
+            await mcp_server_pool.stop()
+        except Exception as e:
+            print(f"Skipping MCP timings: {e}")
+
+    try:
+        asyncio.run(run_all())
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+def benchmark_db_writes(sessions: int = 16, writes_per_session: int = 25, concurrency: int = 16):
+    """Measure concurrent session write throughput against the configured DATABASE_URL"""
+    load_dotenv()
+    print_section_header("DATABASE WRITE BENCHMARK")
+
+    from concurrent.futures import ThreadPoolExecutor
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from website_builder.db.crud import initialize_session, update_session_state, add_task_manager_output
+    from website_builder.db.database import init_db, db
+
+    init_db()
+    session_ids = [initialize_session().id for _ in range(sessions)]
+    conversation = [HumanMessage(content="I need a bakery website"), AIMessage(content="Which pages do you need?")]
+    task_output = [AIMessage(content="{\"tasks\": []}")]
+
+    def timed(func, *args):
+        started = time.perf_counter()
+        try:
+            func(*args)
+            return (time.perf_counter() - started) * 1000, None
+        except Exception as e:
+            return (time.perf_counter() - started) * 1000, e
+
+    def state_writes(session_id):
+        state = {"requirements_messages": list(conversation), "requirements_data": "", "user_input": ""}
+        return [timed(update_session_state, session_id, state) for _ in range(writes_per_session)]
+
+    def output_writes(session_id):
+        return [timed(add_task_manager_output, session_id, task_output) for _ in range(writes_per_session)]
+
+    print(f"Database: {db.url.render_as_string(hide_password=True)}")
+    print(f"{sessions} sessions, {concurrency} concurrent writers:")
+    for label, writer in (("update_session_state", state_writes), ("add_task_manager_output", output_writes)):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = [result for batch in pool.map(writer, session_ids) for result in batch]
+        elapsed = time.perf_counter() - started
+        errors = [error for _, error in results if error is not None]
+        print_timings(label, [sample for sample, _ in results])
+        print(f"  {'':<40} {len(results) / elapsed:9.1f} writes/s | {len(errors)} failed")
+        if errors:
+            print(f"  first failure: {str(errors[0]).splitlines()[0]}")
+
+
+def benchmark_session_state(turns: int = 400, report_every: int = 100):
+    """Compare per-turn save and load cost of the whole-state blob and the session_message rows"""
+    load_dotenv()
+    print_section_header("SESSION STATE BENCHMARK")
+
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+    from website_builder.db.crud import initialize_session, update_session_state, load_session_state, \
+        serialize_state, deserialize_state
+    from website_builder.db.database import init_db, Db_session
+    from website_builder.db.database_models import Session
+
+    init_db()
+    blob_session_id = initialize_session().id
+    table_session_id = initialize_session().id
+    reply = "Great, a bakery website. " * 20
+
+    def blob_save(state):
+        with Db_session() as db:
+            db.query(Session).filter(Session.id == blob_session_id).update({"state": serialize_state(state)})
+            db.commit()
+
+    def blob_load():
+        with Db_session() as db:
+            return deserialize_state(db.query(Session).filter(Session.id == blob_session_id).first().state)
+
+    backends = (
+        ("state blob", blob_save, blob_load),
+        ("session_message", lambda state: update_session_state(table_session_id, state),
+         lambda: load_session_state(table_session_id)),
+    )
+    for label, save, load in backends:
+        state = {"requirements_messages": [SystemMessage(content="You gather website requirements")],
+                 "requirements_data": "", "user_input": ""}
+        save_samples, load_samples = [], []
+        print(f"{label}:")
+        for index in range(1, turns + 1):
+            state["requirements_messages"] = list(state["requirements_messages"]) + [
+                HumanMessage(content=f"Turn {index}: add another section"), AIMessage(content=reply)]
+            started = time.perf_counter()
+            save(state)
+            save_samples.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            state = load()
+            load_samples.append((time.perf_counter() - started) * 1000)
+            if index % report_every == 0:
+                print_timings(f"save turns {index - report_every + 1}-{index}", save_samples[-report_every:])
+                print_timings(f"load turns {index - report_every + 1}-{index}", load_samples[-report_every:])
+        print(f"  {'total save / load':<40} {sum(save_samples):9.1f} ms / {sum(load_samples):9.1f} ms")
+
+
+def benchmark_storage_codec(turn_counts=(10, 50, 200), iterations: int = 20):
+    """Compare encode/decode time and stored size of conversation state across storage formats"""
+    load_dotenv()
+    print_section_header("STORAGE CODEC BENCHMARK")
+
+    import json
+    import random
+
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+    from website_builder.db.codec import encode_text, decode_text, RAW, ZLIB, ZSTD, zstandard
+    from website_builder.db.crud import serialize_state, serialize_message
+
+    words = ("bakery menu contact page hero section gallery pricing testimonials responsive layout colour "
+             "palette warm brown cream font serif navigation footer opening hours map booking form order "
+             "online delivery croissant sourdough cake wedding custom seasonal").split()
+    generator = random.Random(42)
+
+    def sentence(length):
+        return " ".join(generator.choice(words) for _ in range(length)).capitalize() + "."
+
+    def conversation(turns):
+        messages = [SystemMessage(content=sentence(200))]
+        for _ in range(turns):
+            messages.append(HumanMessage(content=" ".join(sentence(15) for _ in range(2))))
+            messages.append(AIMessage(content=" ".join(sentence(20) for _ in range(6))))
+        return {"requirements_messages": messages, "requirements_data": "", "user_input": ""}
+
+    formats = [("compact json", RAW), ("compact json + zlib", ZLIB)]
+    if zstandard is not None:
+        formats.append(("compact json + zstd", ZSTD))
+
+    for turns in turn_counts:
+        state = conversation(turns)
+        legacy = json.dumps({key: [serialize_message(item) for item in value] if isinstance(value, list) else value
+                             for key, value in state.items()})
+        text = serialize_state(state)
+        print(f"{turns} turns, {len(state['requirements_messages'])} messages:")
+        print(f"  {'legacy json text':<40} {len(legacy.encode()):>9} bytes")
+        for label, data_format in formats:
+            encoded = encode_text(text, data_format)
+            print(f"  {label:<40} {len(encoded):>9} bytes ({len(encoded) / len(legacy.encode()):.0%} of legacy)")
+            print_timings(f"{label} encode", time_call(lambda: encode_text(text, data_format), iterations))
+            print_timings(f"{label} decode", time_call(lambda: decode_text(encoded), iterations))
+        # session_message stores every message in its own row, so each value is compressed on its own
+        for label, data_format in formats:
+            row_bytes = sum(len(encode_text(message.content, data_format)) for message in state["requirements_messages"])
+            print(f"  {'per-message rows, ' + label:<40} {row_bytes:>9} bytes")
+
+
+def benchmark_task_scheduler(parallelism_levels=(1, 2, 3, 4), file_ms: float = 50):
+    """Wall-clock speedup of dependency-aware parallel task execution on showcase-sized projects.
+
+    Agent loops are simulated with a sleep of file_ms per file the task works on,
+    the task graphs follow the shape the task manager produces for the showcase sites.
+    """
+    load_dotenv()
+    print_section_header("TASK SCHEDULER BENCHMARK")
+
+    from pathlib import Path
+
+    from website_builder.agents.task_scheduler import TaskScheduler
+
+    def showcase_tasks(project: Path):
+        files = sorted(str(path.relative_to(project)) for path in project.rglob("*") if path.is_file())
+        pages = [path for path in files if path.endswith(".html")]
+        styles = [path for path in files if path.endswith(".css")]
+        scripts = [path for path in files if path.endswith(".js")]
+        tasks = [
+            {"id": "TASK_001", "title": "Project setup", "files": files, "dependencies": "None"},
+            {"id": "TASK_002", "title": "Global styles", "files": styles, "dependencies": "TASK_001"},
+            {"id": "TASK_003", "title": "Shared header and footer", "files": pages, "dependencies": "TASK_002"},
+        ]
+        tasks += [{"id": f"TASK_{len(tasks) + index + 1:03}", "title": f"Content of {page}", "files": [page],
+                   "dependencies": "TASK_003"} for index, page in enumerate(pages)]
+        page_tasks = ", ".join(task["id"] for task in tasks[3:])
+        tasks.append({"id": f"TASK_{len(tasks) + 1:03}", "title": "Interactivity", "files": scripts,
+                      "dependencies": "TASK_003"})
+        tasks.append({"id": f"TASK_{len(tasks) + 1:03}", "title": "Responsive polish", "files": styles,
+                      "dependencies": page_tasks})
+        return tasks
+
+    async def simulated_loop(index, task, dependency_results):
+        await asyncio.sleep(file_ms * max(1, len(task["files"])) / 1000)
+
+    async def timed_run(tasks, parallelism):
+        started = time.perf_counter()
+        await TaskScheduler(parallelism).run(tasks, simulated_loop)
+        return time.perf_counter() - started
+
+    showcase = Path(__file__).resolve().parents[3] / "showcase"
+    for project in sorted(path for path in showcase.iterdir() if path.is_dir()):
+        tasks = showcase_tasks(project)
+        print(f"{project.name}: {len(tasks)} tasks")
+        sequential = asyncio.run(timed_run(tasks, 1))
+        for parallelism in parallelism_levels:
+            elapsed = sequential if parallelism == 1 else asyncio.run(timed_run(tasks, parallelism))
+            print(f"  {'parallelism ' + str(parallelism):<40} {elapsed * 1000:9.1f} ms | "
+                  f"speedup {sequential / elapsed:5.2f}x")
+
+
+def benchmark_task_dispatch(history_sizes=(200, 2000, 10000), steps: int = 200):
+    """Per-step dispatch cost of execute_current_task on a synthetic long-running task.
+
+    The model is replaced by one that answers instantly, so the timings are the
+    node's own bookkeeping. The task runs after earlier tasks whose messages are
+    still in the conversation. The old dispatch scanned the messages for the
+    task message on every step, it is timed next to the node for comparison.
+    """
+    load_dotenv()
+    print_section_header("TASK DISPATCH BENCHMARK")
+
+    import logging
+
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+    from website_builder.agents import developer_agent
+
+    class InstantModel:
+        calls = 0
+
+        async def ainvoke(self, messages):
+            # Every step writes another file, identical steps would be escalated and skipped as a loop
+            InstantModel.calls += 1
+            return AIMessage(content="", tool_calls=[{"name": "write_file", "id": "call",
+                                                      "args": {"path": f"page-{InstantModel.calls}.html",
+                                                               "content": "<html>"}}])
+
+    def legacy_needs_task_message(messages, task):
+        for msg in messages:
+            if isinstance(msg, HumanMessage) and "Execute this task:" in msg.content:
+                if task.get('id', 'Unknown') in msg.content:
+                    return False
+        return True
+
+    developer_agent._developer_llm = InstantModel()
+    developer_agent.DEVELOPER_TASK_MAX_STEPS = steps + 1
+    logging.getLogger(developer_agent.__name__).setLevel(logging.WARNING)
+    task = {"id": "TASK_002", "title": "Long task", "files": ["index.html"]}
+
+    async def run(history):
+        state = {"parsed_tasks": [task], "current_task_index": 0, "project_status": "in_progress",
+                 "developer_messages": list(history), "project_context": {},
+                 "context_tokens": 0, "context_messages": 0,
+                 "task_message_sent": False, "task_steps": 0, "task_message_offset": 0,
+                 "task_repeats": 0, "task_escalations": 0, "task_stop": {}, "stopped_tasks": []}
+        legacy_samples, node_samples = [], []
+        for _ in range(steps):
+            started = time.perf_counter()
+            legacy_needs_task_message(state["developer_messages"], task)
+            legacy_samples.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            update = await developer_agent.execute_current_task(state)
+            node_samples.append((time.perf_counter() - started) * 1000)
+            new_messages = update.pop("developer_messages")
+            state.update(update)
+            state["developer_messages"] += new_messages + [ToolMessage(content="ok", tool_call_id="call")]
+        return legacy_samples, node_samples, state
+
+    for size in history_sizes:
+        history = [SystemMessage(content="You build websites"),
+                   HumanMessage(content="Execute this task:\n\n**Task ID:** TASK_001")]
+        history += [AIMessage(content="Writing the page") if index % 2 else ToolMessage(content="ok", tool_call_id="c")
+                    for index in range(size)]
+        legacy_samples, node_samples, state = asyncio.run(run(history))
+        print(f"{steps} steps after {size} earlier messages:")
+        print_timings("old dispatch scan per step", legacy_samples)
+        print_timings("execute_current_task per step", node_samples)
+        print(f"  {'total old scan / node':<40} {sum(legacy_samples):9.1f} ms / {sum(node_samples):9.1f} ms | "
+              f"steps counted {state['task_steps']}")
+
+    # Task ids that are prefixes of each other made the old scan skip the task message of TASK_001
+    collision = [HumanMessage(content="Execute this task:\n\n**Task ID:** TASK_0010")]
+    print(f"Old scan treats TASK_001 as started after TASK_0010: {not legacy_needs_task_message(collision, {'id': 'TASK_001'})}")
+
+
+def benchmark_developer_context(rounds: int = 60, report_every: int = 10, file_chars: int = 6000):
+    """Prompt tokens per developer model call before and after context trimming on a synthetic big task.
+
+    Each round is two agent steps, reading one of the task's pages and writing
+    it back in full, like the developer agent does when it reworks a site.
+    """
+    load_dotenv()
+    print_section_header("DEVELOPER CONTEXT BENCHMARK")
+
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+    from website_builder.agents.developer_context import estimate_tokens, trim_developer_context
+    from website_builder.config import DEVELOPER_CONTEXT_TOKEN_BUDGET, DEVELOPER_CONTEXT_RECENT_STEPS
+    from website_builder.prompts.developer_prompts import developer_system_prompt
+
+    pages = ["index.html", "about.html", "menu.html", "contact.html", "css/styles.css"]
+    messages = [SystemMessage(content=developer_system_prompt()),
+                HumanMessage(content="Execute this task:\n\n**Task ID:** TASK_001\n**Title:** Build every page")]
+    before, after, trim_ms = [], [], []
+    print(f"budget {DEVELOPER_CONTEXT_TOKEN_BUDGET} tokens, {DEVELOPER_CONTEXT_RECENT_STEPS} recent steps verbatim")
+    for step in range(1, rounds + 1):
+        page = pages[step % len(pages)]
+        body = f"<!-- {page} revision {step} -->\n" + "<section>Fresh bread daily</section>\n" * (file_chars // 40)
+        messages += [
+            AIMessage(content=f"Reading {page} before updating it", tool_calls=[
+                {"name": "read_file", "id": f"read-{step}", "args": {"path": page}}]),
+            ToolMessage(content=body, tool_call_id=f"read-{step}", name="read_file"),
+            AIMessage(content="", tool_calls=[
+                {"name": "write_file", "id": f"write-{step}", "args": {"path": page, "content": body}}]),
+            ToolMessage(content=f"Successfully wrote to {page}", tool_call_id=f"write-{step}", name="write_file"),
+        ]
+        started = time.perf_counter()
+        prompt = trim_developer_context(messages, 1, DEVELOPER_CONTEXT_TOKEN_BUDGET, DEVELOPER_CONTEXT_RECENT_STEPS)
+        trim_ms.append((time.perf_counter() - started) * 1000)
+        before.append(estimate_tokens(messages))
+        after.append(estimate_tokens(prompt))
+        if step % report_every == 0:
+            print(f"  {'round ' + str(step):<40} {before[-1]:9} tokens -> {after[-1]:7} tokens "
+                  f"({len(messages)} -> {len(prompt)} messages)")
+    print(f"  {'total prompt tokens':<40} {sum(before):9} tokens -> {sum(after):7} tokens")
+    print_timings("trimming per call", trim_ms)
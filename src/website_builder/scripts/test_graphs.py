@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+import asyncio
 import os
 
 from langchain_core.messages import SystemMessage, HumanMessage
@@ -48,7 +49,7 @@ def test_requirements():
 
     try:
         print("Requirements graph execution:")
-        app.invoke(initial_state)
+        asyncio.run(app.ainvoke(initial_state))
 
     except Exception as e:
         print(f"ERROR: {e}")
@@ -108,7 +109,7 @@ User: yes
 
     try:
         print("Executing task manager graph...")
-        result = app.invoke(initial_state)
+        result = asyncio.run(app.ainvoke(initial_state))
 
         task_count = len(result.get('parsed_tasks', []))
         print(f"\nGenerated {task_count} tasks:")
@@ -376,7 +377,16 @@ async def test_developer_async():
         "parsed_tasks": sample_tasks,
         "current_task_index": 0,
         "project_status": "in_progress",
-        "developer_messages": [SystemMessage(content=developer_system_prompt())]
+        "developer_messages": [SystemMessage(content=developer_system_prompt())],
+        "context_tokens": 0,
+        "context_messages": 0,
+        "task_message_sent": False,
+        "task_steps": 0,
+        "task_message_offset": 0,
+        "task_repeats": 0,
+        "task_escalations": 0,
+        "task_stop": {},
+        "stopped_tasks": []
     }
 
     print(f"Testing with {len(sample_tasks)} sample task(s)")
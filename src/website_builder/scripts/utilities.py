@@ -31,6 +31,21 @@ def clean_project_workspace():
         print("No workspace to clean")
 
 
+def sweep_expired_sessions():
+    """Run one retention sweep now and report what it reclaimed"""
+    load_dotenv()
+
+    async def sweep():
+        from website_builder.db.database import init_async_db
+        from website_builder.jobs.retention_sweeper import retention_sweeper
+
+        await init_async_db()
+        return await retention_sweeper.sweep()
+
+    report = asyncio.run(sweep())
+    print(f"Expired {report['sessions']} sessions, reclaimed {report['reclaimed_bytes'] / 1024 / 1024:.1f} MiB")
+
+
 def visualize_all_graphs():
     async def visualize_all_graphs_async():
         """Generate visualization for all graphs"""
@@ -64,4 +79,56 @@ def visualize_all_graphs():
             import traceback
             traceback.print_exc()
 
-    asyncio.run(visualize_all_graphs_async())
\ No newline at end of file
+    asyncio.run(visualize_all_graphs_async())
+
+def trace_waterfall():
+    """Print the traces of a session from TRACE_FILE as waterfalls, usage: trace-waterfall <session_id>"""
+    import json
+    import sys
+    from collections import defaultdict
+    from datetime import datetime
+
+    from website_builder.config import TRACE_FILE
+
+    load_dotenv()
+    if len(sys.argv) < 2:
+        print("Usage: trace-waterfall <session_id>")
+        return
+    session_id = sys.argv[1]
+
+    traces = defaultdict(list)
+    with open(TRACE_FILE, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces[span["context"]["trace_id"]].append(span)
+
+    width = 40
+    for spans in traces.values():
+        if not any(span["attributes"].get("session.id") == session_id for span in spans):
+            continue
+        for span in spans:
+            span["start"] = datetime.fromisoformat(span["start_time"]).timestamp()
+            span["end"] = datetime.fromisoformat(span["end_time"]).timestamp()
+        span_ids = {span["context"]["span_id"] for span in spans}
+        children = defaultdict(list)
+        for span in sorted(spans, key=lambda span: span["start"]):
+            # Spans whose parent was not exported, e.g. still open, are shown as roots
+            children[span["parent_id"] if span["parent_id"] in span_ids else None].append(span)
+        trace_start = min(span["start"] for span in spans)
+        trace_ms = max((max(span["end"] for span in spans) - trace_start) * 1000, 1)
+
+        print(f"\nTrace {spans[0]['context']['trace_id']}, {len(spans)} spans, {trace_ms:.0f} ms")
+
+        def print_span(span, depth):
+            offset_ms = (span["start"] - trace_start) * 1000
+            duration_ms = (span["end"] - span["start"]) * 1000
+            bar_start = int(offset_ms / trace_ms * width)
+            bar = " " * bar_start + "#" * max(1, int(duration_ms / trace_ms * width))
+            error = " !" if span["status"]["status_code"] == "ERROR" else ""
+            print(f"{offset_ms:9.1f} {duration_ms:9.1f} ms |{bar:<{width}}| {'  ' * depth}{span['name']}{error}")
+            for child in children[span["context"]["span_id"]]:
+                print_span(child, depth + 1)
+
+        for root in children[None]:
+            print_span(root, 0)
@@ -0,0 +1,400 @@
+import difflib
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool, ToolException, BaseTool
+from pydantic import BaseModel, Field
+
+from website_builder.config import PROJECT_WORKSPACE, FILE_SYSTEM_BACKEND
+
+logger = logging.getLogger(__name__)
+
+# Lock of each file being written and the number of writes holding or waiting for it
+_file_locks: Dict[Path, Tuple[threading.Lock, int]] = {}
+_file_locks_guard = threading.Lock()
+
+# Seconds between the heartbeats of a task waiting for a file another task owns
+FILE_WAIT_HEARTBEAT_SECONDS = 5.0
+
+# Tools that write files, with the arguments holding the written paths
+WRITE_TOOL_PATH_ARGS = {"write_file": ("path",), "edit_file": ("path",), "move_file": ("source", "destination")}
+
+
+class TaskFileOwners:
+    """Files owned by the developer task loops that are running, so writes of a file are serialized task by task.
+
+    A task is identified by the thread id of its loop and owns the files it
+    declared once it starts and every file it writes, until its loop ends and
+    releases them. The filesystem tools of both backends claim a file before
+    writing it, and a write to a file another task owns waits until that task
+    released it. Tasks that would wait for each other's files share the file
+    instead of deadlocking, each of their writes still holds the file's lock.
+    """
+
+    def __init__(self):
+        self._owners: Dict[Path, Set[str]] = {}
+        self._files: Dict[str, Set[Path]] = {}
+        # File each waiting task waits for
+        self._waiting: Dict[str, Path] = {}
+        # Running tasks, with what to call while they wait so the watchdog does not take the wait for a stall
+        self._heartbeats: Dict[str, Optional[Callable[[], None]]] = {}
+        self._changed = threading.Condition()
+
+    def start(self, owner: str, heartbeat: Optional[Callable[[], None]] = None):
+        with self._changed:
+            self._heartbeats[owner] = heartbeat
+
+    def try_claim(self, owner: str, file_path: Path) -> bool:
+        """Make the task an owner of the file unless another task owns it"""
+        with self._changed:
+            self._heartbeats.setdefault(owner, None)
+            holders = self._owners.get(file_path)
+            if holders and owner not in holders:
+                return False
+            self.__add(owner, file_path)
+            return True
+
+    def claim(self, owner: str, file_path: Path):
+        """Make the task an owner of the file, waiting until the tasks owning it released it"""
+        with self._changed:
+            self._heartbeats.setdefault(owner, None)
+            while True:
+                holders = self._owners.get(file_path)
+                if not holders or owner in holders:
+                    break
+                if self.__waits_for(holders, owner):
+                    logger.warning(f"Tasks {owner} and {', '.join(sorted(holders))} wait for each other's files, "
+                                   f"sharing {file_path}")
+                    break
+                self._waiting[owner] = file_path
+                try:
+                    self._changed.wait(FILE_WAIT_HEARTBEAT_SECONDS)
+                finally:
+                    del self._waiting[owner]
+                if owner not in self._heartbeats:
+                    raise ToolException(f"Task {owner} ended while waiting for {file_path}")
+                if self._heartbeats[owner] is not None:
+                    self._heartbeats[owner]()
+            self.__add(owner, file_path)
+
+    def owned(self, owner: str) -> Set[Path]:
+        with self._changed:
+            return set(self._files.get(owner, ()))
+
+    def release(self, owner: str):
+        with self._changed:
+            self._heartbeats.pop(owner, None)
+            for file_path in self._files.pop(owner, ()):
+                self._owners[file_path].discard(owner)
+                if not self._owners[file_path]:
+                    del self._owners[file_path]
+            self._changed.notify_all()
+
+    def __add(self, owner: str, file_path: Path):
+        self._owners.setdefault(file_path, set()).add(owner)
+        self._files.setdefault(owner, set()).add(file_path)
+
+    def __waits_for(self, holders: Set[str], owner: str) -> bool:
+        """Whether a holder waits, directly or through other waiting tasks, for a file the owner holds"""
+        seen = set()
+        pending = list(holders)
+        while pending:
+            task = pending.pop()
+            if task == owner:
+                return True
+            if task in seen:
+                continue
+            seen.add(task)
+            if task in self._waiting:
+                pending += self._owners.get(self._waiting[task], ())
+        return False
+
+
+task_file_owners = TaskFileOwners()
+
+
+class EditOperation(BaseModel):
+    oldText: str = Field(description="Text to search for - must match exactly")
+    newText: str = Field(description="Text to replace with")
+
+
+def session_root(config: Optional[RunnableConfig]) -> Path:
+    """Sandbox directory of the session the tool runs for"""
+    workspace = Path(PROJECT_WORKSPACE).resolve()
+    session_id = ((config or {}).get("configurable") or {}).get("session_id")
+    if not session_id:
+        return workspace
+    root = (workspace / session_id).resolve()
+    if not root.is_relative_to(workspace):
+        raise ToolException(f"Invalid session id: {session_id}")
+    return root
+
+
+def resolve_path(path: str, config: Optional[RunnableConfig]) -> Path:
+    """Resolve a tool path inside the session sandbox.
+
+    Task paths are written relative to the process working directory
+    (``website_project/{session_id}/index.html``), bare relative paths are
+    taken relative to the sandbox root.
+    """
+    root = session_root(config)
+    candidate = Path(os.path.expanduser(path))
+    if not candidate.is_absolute():
+        from_cwd = candidate.resolve()
+        candidate = from_cwd if from_cwd.is_relative_to(root) else root / candidate
+    resolved = candidate.resolve()
+    if not resolved.is_relative_to(root):
+        raise ToolException(f"Access denied - path outside allowed directory: {path} not in {root}")
+    return resolved
+
+
+def task_owner(config: Optional[RunnableConfig]) -> Optional[str]:
+    """Thread id of the task loop the tool runs for, files written outside a task have no owner"""
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def claim_files(file_paths: Iterable[Path], config: Optional[RunnableConfig]):
+    """Claim the files for the tool's task before it writes them, waiting while other tasks own them"""
+    owner = task_owner(config)
+    if owner is None:
+        return
+    for file_path in file_paths:
+        task_file_owners.claim(owner, file_path)
+
+
+def reserve_task_files(paths: Iterable[str], config: RunnableConfig) -> List[Path]:
+    """Claim the files a task declares when it starts, returns those another running task owns"""
+    owner = task_owner(config)
+    taken = []
+    for path in paths:
+        try:
+            file_path = resolve_path(path, config)
+        except ToolException:
+            continue
+        if owner is not None and not task_file_owners.try_claim(owner, file_path):
+            taken.append(file_path)
+    return taken
+
+
+@contextmanager
+def _file_lock(file_path: Path) -> Iterator[None]:
+    """Hold the file's lock, so concurrent tool calls never write it at once.
+
+    Locks only exist while a write holds or waits for them.
+    """
+    with _file_locks_guard:
+        lock, users = _file_locks.get(file_path, (None, 0))
+        lock = lock or threading.Lock()
+        _file_locks[file_path] = (lock, users + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _file_locks_guard:
+            lock, users = _file_locks[file_path]
+            if users == 1:
+                del _file_locks[file_path]
+            else:
+                _file_locks[file_path] = (lock, users - 1)
+
+
+def _read_text(file_path: Path) -> str:
+    try:
+        return file_path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        raise ToolException(f"ENOENT: no such file or directory, open '{file_path}'")
+    except IsADirectoryError:
+        raise ToolException(f"EISDIR: illegal operation on a directory, read '{file_path}'")
+
+
+@tool
+def read_file(path: str, config: RunnableConfig, head: Optional[int] = None, tail: Optional[int] = None) -> str:
+    """Read the complete contents of a file from the file system. Use the 'head' parameter to read only
+    the first N lines of a file, or the 'tail' parameter to read only the last N lines of a file.
+
+    Args:
+        path: Path of the file to read
+        head: If provided, returns only the first N lines of the file
+        tail: If provided, returns only the last N lines of the file
+    """
+    if head is not None and tail is not None:
+        raise ToolException("Cannot specify both head and tail parameters simultaneously")
+    content = _read_text(resolve_path(path, config))
+    if head is not None:
+        return "\n".join(content.split("\n")[:head])
+    if tail is not None:
+        return "\n".join(content.split("\n")[-tail:])
+    return content
+
+
+@tool
+def write_file(path: str, content: str, config: RunnableConfig) -> str:
+    """Create a new file or completely overwrite an existing file with new content.
+
+    Args:
+        path: Path of the file to write
+        content: Full content of the file
+    """
+    file_path = resolve_path(path, config)
+    claim_files([file_path], config)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with _file_lock(file_path):
+        file_path.write_text(content, encoding="utf-8")
+    return f"Successfully wrote to {path}"
+
+
+@tool
+def edit_file(path: str, edits: List[EditOperation], config: RunnableConfig, dryRun: bool = False) -> str:
+    """Make line-based edits to a text file. Each edit replaces exact text sequences with new content.
+    Returns a git-style diff showing the changes made.
+
+    Args:
+        path: Path of the file to edit
+        edits: List of edits, each replacing oldText with newText
+        dryRun: Preview changes using git-style diff format without writing
+    """
+    file_path = resolve_path(path, config)
+    if not dryRun:
+        claim_files([file_path], config)
+    # Read, edit and write under the lock so a concurrent edit of the same file is not lost
+    with _file_lock(file_path):
+        original = _read_text(file_path)
+        modified = original
+        for edit in edits:
+            edit = edit if isinstance(edit, EditOperation) else EditOperation(**edit)
+            if edit.oldText not in modified:
+                raise ToolException(f"Could not find exact match for edit:\n{edit.oldText}")
+            modified = modified.replace(edit.oldText, edit.newText, 1)
+        if not dryRun:
+            file_path.write_text(modified, encoding="utf-8")
+
+    diff = "".join(difflib.unified_diff(
+        original.splitlines(keepends=True),
+        modified.splitlines(keepends=True),
+        fromfile=path,
+        tofile=path
+    ))
+    return f"```diff\n{diff}```"
+
+
+@tool
+def create_directory(path: str, config: RunnableConfig) -> str:
+    """Create a new directory or ensure a directory exists, including nested directories.
+
+    Args:
+        path: Path of the directory to create
+    """
+    resolve_path(path, config).mkdir(parents=True, exist_ok=True)
+    return f"Successfully created directory {path}"
+
+
+@tool
+def list_directory(path: str, config: RunnableConfig) -> str:
+    """Get a detailed listing of all files and directories in a specified path.
+    Results distinguish files and directories with [FILE] and [DIR] prefixes.
+
+    Args:
+        path: Path of the directory to list
+    """
+    directory = resolve_path(path, config)
+    if not directory.is_dir():
+        raise ToolException(f"ENOENT: no such directory, scandir '{directory}'")
+    entries = sorted(directory.iterdir(), key=lambda entry: entry.name)
+    return "\n".join(f"{'[DIR]' if entry.is_dir() else '[FILE]'} {entry.name}" for entry in entries)
+
+
+@tool
+def list_files(config: RunnableConfig, path: str = ".") -> str:
+    """Recursively list every file in the project, one path per line.
+
+    Args:
+        path: Directory to list, defaults to the project root
+    """
+    directory = resolve_path(path, config)
+    if not directory.is_dir():
+        raise ToolException(f"ENOENT: no such directory, scandir '{directory}'")
+    root = session_root(config)
+    files = sorted(
+        str(file_path.relative_to(root))
+        for file_path in directory.rglob("*") if file_path.is_file()
+    )
+    return "\n".join(files) if files else "No files found"
+
+
+@tool
+def directory_tree(path: str, config: RunnableConfig) -> str:
+    """Get a recursive tree view of files and directories as a JSON structure.
+
+    Args:
+        path: Root directory of the tree
+    """
+    def build_tree(directory: Path):
+        tree = []
+        for entry in sorted(directory.iterdir(), key=lambda item: item.name):
+            if entry.is_dir():
+                tree.append({"name": entry.name, "type": "directory", "children": build_tree(entry)})
+            else:
+                tree.append({"name": entry.name, "type": "file"})
+        return tree
+
+    directory = resolve_path(path, config)
+    if not directory.is_dir():
+        raise ToolException(f"ENOENT: no such directory, scandir '{directory}'")
+    return json.dumps(build_tree(directory), indent=2)
+
+
+@tool
+def move_file(source: str, destination: str, config: RunnableConfig) -> str:
+    """Move or rename files and directories. Fails if the destination already exists.
+
+    Args:
+        source: Current path
+        destination: New path
+    """
+    source_path = resolve_path(source, config)
+    destination_path = resolve_path(destination, config)
+    claim_files([source_path, destination_path], config)
+    if destination_path.exists():
+        raise ToolException(f"Destination already exists: {destination}")
+    destination_path.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(source_path, destination_path)
+    return f"Successfully moved {source} to {destination}"
+
+
+@tool
+def list_allowed_directories(config: RunnableConfig) -> str:
+    """Returns the list of directories that this server is allowed to access."""
+    return f"Allowed directories:\n{session_root(config)}"
+
+
+native_file_system_tools: List[BaseTool] = [
+    read_file,
+    write_file,
+    edit_file,
+    create_directory,
+    list_directory,
+    list_files,
+    directory_tree,
+    move_file,
+    list_allowed_directories,
+]
+for _native_tool in native_file_system_tools:
+    _native_tool.handle_tool_error = True
+
+
+async def file_system_tools() -> List[BaseTool]:
+    """Filesystem tools for the developer agent from the configured backend"""
+    if FILE_SYSTEM_BACKEND == "native":
+        return list(native_file_system_tools)
+    if FILE_SYSTEM_BACKEND != "mcp":
+        logger.warning(f"Unknown FILE_SYSTEM_BACKEND {FILE_SYSTEM_BACKEND}, using mcp")
+
+    from website_builder.mcp.file_system import mcp_file_system_tools
+    return await mcp_file_system_tools()
@@ -0,0 +1,196 @@
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import var_child_runnable_config
+from langchain_core.tracers.context import register_configure_hook
+from opentelemetry import context, trace
+from opentelemetry.trace import Span, Status, StatusCode
+from sqlalchemy import event
+
+from website_builder.config import TRACING_EXPORTER, TRACE_FILE, FILE_SYSTEM_BACKEND
+from website_builder.llm_usage import current_usage_scope
+from website_builder.metrics import GRAPH_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Longest SQL statement recorded on a database span
+MAX_STATEMENT_CHARS = 500
+# Span attributes the usage scope fields are recorded as
+SCOPE_ATTRIBUTES = {"session_id": "session.id", "node": "agent", "task_id": "task.id"}
+
+tracer = trace.get_tracer("website_builder")
+
+
+def tracing_enabled() -> bool:
+    return TRACING_EXPORTER != "none"
+
+
+def scope_attributes() -> Dict[str, str]:
+    """Session, agent and task of the current usage scope, shared by every span"""
+    return {SCOPE_ATTRIBUTES[key]: value for key, value in current_usage_scope().items() if key in SCOPE_ATTRIBUTES}
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Records a span for every graph run, graph node, LLM call and tool call.
+
+    Spans are parented explicitly to the span of the nearest traced run above
+    them rather than through the OpenTelemetry context, LangChain ends some
+    runs in a copy of the context they started in. Runs with no traced run
+    above them nest below the current span, the build or API request.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._graph_runs: Dict[UUID, str] = {}
+        self._parents: Dict[UUID, Optional[UUID]] = {}
+        self._spans: Dict[UUID, Span] = {}
+
+    def span_context(self, run_id: Optional[UUID]) -> Optional[context.Context]:
+        """Context of the nearest traced run at or above the run, None when there is none"""
+        while run_id is not None:
+            if run_id in self._spans:
+                return trace.set_span_in_context(self._spans[run_id])
+            run_id = self._parents.get(run_id)
+        return None
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                       name: Optional[str] = None, **kwargs: Any) -> None:
+        self._parents[run_id] = parent_run_id
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None and name == node and parent_run_id in self._graph_runs:
+            graph = self._graph_runs[parent_run_id]
+            self.__start(run_id, parent_run_id, f"{graph}.{node}", {"graph": graph, "graph.node": node})
+        elif name in GRAPH_NAMES:
+            self._graph_runs[run_id] = name
+            self.__start(run_id, parent_run_id, f"graph {name}", {"graph": name})
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._graph_runs.pop(run_id, None)
+        self.__end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._graph_runs.pop(run_id, None)
+        self.__end(run_id, error)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                            **kwargs: Any) -> None:
+        model = (metadata or {}).get("ls_model_name") or "unknown"
+        self.__start(run_id, parent_run_id, f"llm {model}",
+                     {"llm.model": model, "llm.messages": len(messages[0]) if messages else 0})
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._spans.get(run_id)
+        if span is not None:
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    span.set_attribute("llm.input_tokens", usage.get("input_tokens", 0))
+                    span.set_attribute("llm.output_tokens", usage.get("output_tokens", 0))
+        self.__end(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.__end(run_id, error)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, name: Optional[str] = None, **kwargs: Any) -> None:
+        tool = name or (serialized or {}).get("name", "unknown")
+        self.__start(run_id, parent_run_id, f"tool {tool}", {"tool.name": tool, "tool.backend": FILE_SYSTEM_BACKEND})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.__end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.__end(run_id, error)
+
+    def __start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, attributes: Dict[str, Any]):
+        self._parents[run_id] = parent_run_id
+        self._spans[run_id] = tracer.start_span(name, context=self.span_context(parent_run_id),
+                                                attributes={**scope_attributes(), **attributes})
+
+    def __end(self, run_id: UUID, error: Optional[BaseException] = None):
+        self._parents.pop(run_id, None)
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(Status(StatusCode.ERROR, str(error)))
+        span.end()
+
+
+tracing_callback = TracingCallbackHandler()
+
+
+def current_run_context() -> Optional[context.Context]:
+    """Context of the span of the LangChain run being executed, so work done inside it nests below it"""
+    callbacks = (var_child_runnable_config.get() or {}).get("callbacks")
+    return tracing_callback.span_context(getattr(callbacks, "parent_run_id", None))
+
+
+def trace_engine(engine, name: str):
+    """Record a span for every statement run on the engine"""
+    if not tracing_enabled():
+        return
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        context._trace_span = tracer.start_span(f"db {operation}", context=current_run_context(), attributes={
+            **scope_attributes(), "db.engine": name, "db.operation": operation,
+            "db.statement": statement[:MAX_STATEMENT_CHARS]
+        })
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span: Optional[Span] = getattr(context, "_trace_span", None)
+        if span is not None:
+            span.end()
+            context._trace_span = None
+
+    def handle_error(exception_context):
+        # Errors are also raised while fetching rows, after the statement span ended
+        span: Optional[Span] = getattr(exception_context.execution_context, "_trace_span", None)
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            span.set_status(Status(StatusCode.ERROR, str(exception_context.original_exception)))
+            span.end()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+def __span_exporter():
+    if TRACING_EXPORTER == "file":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        trace_file = open(TRACE_FILE, "a", encoding="utf-8")
+        return ConsoleSpanExporter(out=trace_file, formatter=lambda span: span.to_json(indent=None) + "\n")
+    if TRACING_EXPORTER == "otlp":
+        # Sends to OTEL_EXPORTER_OTLP_ENDPOINT, http://localhost:4318 by default
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+    raise ValueError(f"Unknown tracing exporter {TRACING_EXPORTER!r}, expected none, file or otlp")
+
+
+def __configure_tracing():
+    if not tracing_enabled():
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "website-builder"}))
+    provider.add_span_processor(BatchSpanProcessor(__span_exporter()))
+    trace.set_tracer_provider(provider)
+    # The handler is the default value, so runs in every context and thread pick it up
+    register_configure_hook(ContextVar("tracing_callback", default=tracing_callback), inheritable=True)
+    logger.info(f"Tracing enabled, exporting spans to {TRACE_FILE if TRACING_EXPORTER == 'file' else 'OTLP'}")
+
+
+__configure_tracing()
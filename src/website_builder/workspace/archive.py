@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+from website_builder.config import PROJECT_WORKSPACE, ARCHIVE_DIR
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def workspace_path(session_id: str) -> Path:
+    return Path(PROJECT_WORKSPACE) / session_id
+
+
+def __workspace_files(session_id: str):
+    root = workspace_path(session_id)
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in sorted(file_names):
+            file_path = Path(dir_path) / file_name
+            yield file_path, file_path.relative_to(root).as_posix()
+
+
+def workspace_fingerprint(session_id: str) -> str:
+    """Cheap change detector built from file names, sizes and modification times"""
+    fingerprint = hashlib.sha256()
+    for file_path, archive_name in sorted(__workspace_files(session_id), key=lambda item: item[1]):
+        stat = file_path.stat()
+        fingerprint.update(f"{archive_name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return fingerprint.hexdigest()
+
+
+def workspace_digest(session_id: str) -> str:
+    """Content hash of every file in the workspace, independent of timestamps"""
+    digest = hashlib.sha256()
+    for file_path, archive_name in sorted(__workspace_files(session_id), key=lambda item: item[1]):
+        digest.update(f"{archive_name}\0".encode())
+        with open(file_path, "rb") as f:
+            while chunk := f.read(READ_CHUNK_SIZE):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def __manifest_path(session_id: str) -> Path:
+    return Path(ARCHIVE_DIR) / f"{session_id}.json"
+
+
+def __archive_path(session_id: str, digest: str) -> Path:
+    return Path(ARCHIVE_DIR) / f"{session_id}-{digest[:16]}.zip"
+
+
+def __read_manifest(session_id: str) -> Optional[dict]:
+    try:
+        return json.loads(__manifest_path(session_id).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def __write_manifest(session_id: str, manifest: dict):
+    manifest_path = __manifest_path(session_id)
+    temporary_path = manifest_path.with_suffix(".json.tmp")
+    temporary_path.write_text(json.dumps(manifest))
+    os.replace(temporary_path, manifest_path)
+
+
+def __write_archive(session_id: str, archive_path: Path):
+    file_descriptor, temporary_name = tempfile.mkstemp(dir=ARCHIVE_DIR, suffix=".zip.tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as archive_file:
+            with zipfile.ZipFile(archive_file, "w", zipfile.ZIP_DEFLATED) as zf:
+                for file_path, archive_name in __workspace_files(session_id):
+                    zf.write(file_path, archive_name)
+        os.replace(temporary_name, archive_path)
+    except Exception:
+        os.unlink(temporary_name)
+        raise
+
+
+def __remove_stale_archives(session_id: str, current_archive: Path):
+    for archive in Path(ARCHIVE_DIR).glob(f"{session_id}-*.zip"):
+        if archive != current_archive:
+            archive.unlink(missing_ok=True)
+
+
+def get_or_build_archive(session_id: str) -> Tuple[Path, str]:
+    """Return the archive of the session's workspace and its content digest.
+
+    The archive is only rebuilt when the workspace content changed: an unchanged
+    fingerprint skips hashing entirely, and a changed fingerprint with the same
+    content digest only refreshes the manifest.
+    """
+    if not workspace_path(session_id).is_dir():
+        raise FileNotFoundError(f"Project directory not found for session {session_id}")
+    Path(ARCHIVE_DIR).mkdir(parents=True, exist_ok=True)
+
+    fingerprint = workspace_fingerprint(session_id)
+    manifest = __read_manifest(session_id)
+    if manifest and manifest["fingerprint"] == fingerprint:
+        archive_path = __archive_path(session_id, manifest["digest"])
+        if archive_path.exists():
+            return archive_path, manifest["digest"]
+
+    digest = workspace_digest(session_id)
+    archive_path = __archive_path(session_id, digest)
+    if not archive_path.exists():
+        logger.info(f"Building archive {archive_path} for session {session_id}")
+        __write_archive(session_id, archive_path)
+        __remove_stale_archives(session_id, archive_path)
+    __write_manifest(session_id, {"fingerprint": fingerprint, "digest": digest})
+    return archive_path, digest
+
+
+
+def find_archive(session_id: str) -> Optional[Tuple[Path, str]]:
+    """Archive recorded in the manifest and its digest, without looking at the workspace"""
+    manifest = __read_manifest(session_id)
+    if manifest:
+        archive_path = __archive_path(session_id, manifest["digest"])
+        if archive_path.exists():
+            return archive_path, manifest["digest"]
+    return None
+
+
+def __stored_files(session_id: str):
+    yield from (file_path for file_path, _ in __workspace_files(session_id))
+    yield from Path(ARCHIVE_DIR).glob(f"{session_id}-*.zip")
+    manifest_path = __manifest_path(session_id)
+    if manifest_path.exists():
+        yield manifest_path
+
+
+def stored_bytes(session_id: str) -> int:
+    """Disk space taken by the session's workspace and archives"""
+    return sum(file_path.stat().st_size for file_path in __stored_files(session_id))
+
+
+def archive_workspace(session_id: str) -> int:
+    """Keep only the session's archive and remove its workspace, returns the bytes reclaimed"""
+    before = stored_bytes(session_id)
+    if workspace_path(session_id).is_dir():
+        get_or_build_archive(session_id)
+        shutil.rmtree(workspace_path(session_id))
+    return before - stored_bytes(session_id)
+
+
+def delete_workspace(session_id: str) -> int:
+    """Remove the session's workspace and archives, returns the bytes reclaimed"""
+    before = stored_bytes(session_id)
+    shutil.rmtree(workspace_path(session_id), ignore_errors=True)
+    for archive in Path(ARCHIVE_DIR).glob(f"{session_id}-*.zip"):
+        archive.unlink(missing_ok=True)
+    __manifest_path(session_id).unlink(missing_ok=True)
+    return before
@@ -0,0 +1,49 @@
+"""Settings shared by the test modules.
+
+The database engines are created from DATABASE_URL when the package is first
+imported, so it is set here before any test imports it. The database tests run
+against TEST_DATABASE_URL when it is set, which must be a disposable database
+since every test drops and recreates the tables, and otherwise against a
+throwaway SQLite file.
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL or f"sqlite:///{tempfile.mkdtemp()}/website_builder_test.db"
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ["TRACING_EXPORTER"] = "none"
+
+
+@pytest.fixture
+def run_async():
+    """Run a coroutine on a new event loop, the async engine's connections are closed before the loop is"""
+
+    def run(coroutine):
+        from website_builder.db.database import async_db
+
+        async def run_and_dispose():
+            try:
+                return await coroutine
+            finally:
+                await async_db.dispose()
+
+        return asyncio.run(run_and_dispose())
+
+    return run
+
+
+@pytest.fixture
+def database():
+    """Empty application tables"""
+    from website_builder.db.database import Base, db, init_db
+    import website_builder.db.database_models  # noqa: F401, registers the tables
+
+    Base.metadata.drop_all(db)
+    init_db()
+    yield db
+    db.dispose()
@@ -0,0 +1,37 @@
+import asyncio
+from types import SimpleNamespace
+
+from website_builder.agents.orchestrator_agent import create_developer_node
+from website_builder.jobs.build_events import BuildEventBroker, BuildProgressTracker
+
+TASKS = [{"id": "TASK_001", "title": "Layout", "files": ["index.html"]},
+         {"id": "TASK_002", "title": "Styles", "files": ["style.css"], "dependencies": "TASK_001"}]
+
+
+class FinishedDeveloperGraph:
+    """Developer graph whose task loops all finished before the build was resumed"""
+    checkpointer = True
+
+    async def aget_state(self, config):
+        return SimpleNamespace(next=(), values={"developer_messages": [], "project_status": "completed",
+                                                "task_message_offset": 0, "stopped_tasks": []})
+
+    def astream(self, *args, **kwargs):
+        raise AssertionError("A finished task loop must not run again")
+
+
+def test_resumed_build_counts_tasks_finished_before_it(monkeypatch):
+    broker = BuildEventBroker()
+    tracker = BuildProgressTracker(broker, "session")
+    state = {"tasks_output": TASKS}
+    tracker.resume(state)
+    assert broker.snapshot("session")["tasks_done"] == 0
+
+    developer_node = create_developer_node(FinishedDeveloperGraph())
+    result = asyncio.run(developer_node(state, {"configurable": {"session_id": "session",
+                                                                  "progress_tracker": tracker}}))
+
+    assert result["project_status"] == "completed"
+    snapshot = broker.snapshot("session")
+    assert snapshot["tasks_done"] == snapshot["task_total"] == 2
+    assert snapshot["running_tasks"] == []
@@ -0,0 +1,119 @@
+import operator
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+from sqlalchemy import func, select
+
+from website_builder.db.checkpointer import build_checkpointer, task_thread_id
+from website_builder.db.database import AsyncDb_session
+from website_builder.db.database_models import GraphCheckpoint, GraphCheckpointWrite
+
+
+class StepState(TypedDict):
+    steps: Annotated[List[str], operator.add]
+
+
+class Crash(Exception):
+    pass
+
+
+def recording_node(name: str, calls: List[str], failures: dict):
+    """Node that records its runs and raises while failures has runs left for it"""
+
+    def node(state: StepState):
+        calls.append(name)
+        if failures.get(name, 0) > 0:
+            failures[name] -= 1
+            raise Crash(name)
+        return {"steps": [name]}
+
+    return node
+
+
+def linear_graph(calls: List[str], failures: dict):
+    graph = StateGraph(StepState)
+    for name in ("first", "second", "third"):
+        graph.add_node(name, recording_node(name, calls, failures))
+    graph.add_edge(START, "first")
+    graph.add_edge("first", "second")
+    graph.add_edge("second", "third")
+    graph.add_edge("third", END)
+    return graph.compile(checkpointer=build_checkpointer)
+
+
+def parallel_graph(calls: List[str], failures: dict):
+    graph = StateGraph(StepState)
+    for name in ("left", "right", "join"):
+        graph.add_node(name, recording_node(name, calls, failures))
+    graph.add_edge(START, "left")
+    graph.add_edge(START, "right")
+    graph.add_edge(["left", "right"], "join")
+    graph.add_edge("join", END)
+    return graph.compile(checkpointer=build_checkpointer)
+
+
+async def run(graph, graph_input, thread_id: str):
+    config = {"configurable": {"thread_id": thread_id}}
+    async for _ in graph.astream(graph_input, config):
+        pass
+    return (await graph.aget_state(config)).values
+
+
+async def count_rows(model, thread_id: str) -> int:
+    async with AsyncDb_session() as db:
+        return await db.scalar(select(func.count()).select_from(model).where(model.thread_id == thread_id))
+
+
+def test_resumed_linear_graph_skips_finished_nodes(database, run_async):
+    calls = []
+    graph = linear_graph(calls, {"second": 1})
+
+    async def scenario():
+        with pytest.raises(Crash):
+            await run(graph, {"steps": []}, "linear")
+        assert calls == ["first", "second"]
+        values = await run(graph, None, "linear")
+        assert calls == ["first", "second", "second", "third"]
+        assert values["steps"] == ["first", "second", "third"]
+        # Only the newest checkpoint of the thread is kept
+        assert await count_rows(GraphCheckpoint, "linear") == 1
+
+    run_async(scenario())
+
+
+def test_pending_write_of_finished_branch_is_kept(database, run_async):
+    calls = []
+    graph = parallel_graph(calls, {"right": 1})
+
+    async def scenario():
+        with pytest.raises(Crash):
+            await run(graph, {"steps": []}, "parallel")
+        checkpoint = await build_checkpointer.aget_tuple({"configurable": {"thread_id": "parallel"}})
+        assert ("steps", ["left"]) in [(channel, value) for _, channel, value in checkpoint.pending_writes]
+
+        values = await run(graph, None, "parallel")
+        assert sorted(calls) == ["join", "left", "right", "right"]
+        assert sorted(values["steps"][:2]) == ["left", "right"]
+        assert values["steps"][2] == "join"
+
+    run_async(scenario())
+
+
+def test_delete_thread_removes_its_task_threads(database, run_async):
+    calls = []
+    graph = linear_graph(calls, {})
+    session_threads = ["session", task_thread_id("session", 0), task_thread_id("session", 1)]
+    other_thread = task_thread_id("session2", 0)
+
+    async def scenario():
+        for thread_id in session_threads + [other_thread]:
+            await run(graph, {"steps": []}, thread_id)
+        await build_checkpointer.adelete_thread("session")
+        for thread_id in session_threads:
+            assert await count_rows(GraphCheckpoint, thread_id) == 0
+            assert await count_rows(GraphCheckpointWrite, thread_id) == 0
+            assert await build_checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}}) is None
+        assert await count_rows(GraphCheckpoint, other_thread) == 1
+
+    run_async(scenario())
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+import sqlalchemy as sa
+
+from website_builder.db import codec
+from website_builder.db.codec import CODEC_MARKER, RAW, ZLIB, ZSTD, decode_bytes, decode_text, encode_bytes, \
+    encode_text
+
+LONG_TEXT = "Ünïcode website requirements, repeated until compression pays off. " * 20
+FORMATS = [RAW, ZLIB, pytest.param(ZSTD, marks=pytest.mark.skipif(codec.zstandard is None,
+                                                                   reason="zstandard is not installed"))]
+
+
+@pytest.mark.parametrize("data_format", FORMATS)
+def test_text_round_trips(data_format):
+    encoded = encode_text(LONG_TEXT, data_format)
+    assert encoded[0] == CODEC_MARKER
+    assert encoded[1] == data_format
+    if data_format != RAW:
+        assert len(encoded) < len(LONG_TEXT.encode("utf-8"))
+    assert decode_text(encoded) == LONG_TEXT
+
+
+@pytest.mark.parametrize("data_format", FORMATS)
+def test_bytes_round_trip(data_format):
+    data = LONG_TEXT.encode("utf-8")
+    assert decode_bytes(encode_bytes(data, data_format)) == data
+
+
+@pytest.mark.parametrize("data_format", FORMATS)
+def test_short_values_are_stored_raw(data_format):
+    encoded = encode_text("short", data_format)
+    assert encoded == bytes((CODEC_MARKER, RAW)) + b"short"
+    assert decode_text(encoded) == "short"
+
+
+def test_values_that_do_not_shrink_are_stored_raw():
+    data = os.urandom(codec.STORAGE_COMPRESSION_MIN_BYTES * 2)
+    encoded = encode_bytes(data, ZLIB)
+    assert encoded[1] == RAW
+    assert decode_bytes(encoded) == data
+
+
+def test_empty_values_round_trip():
+    assert decode_text(encode_text("")) == ""
+    assert decode_bytes(encode_bytes(b"")) == b""
+
+
+def test_legacy_values_are_read_as_plain_text():
+    assert decode_text(LONG_TEXT) == LONG_TEXT
+    assert decode_text(LONG_TEXT.encode("utf-8")) == LONG_TEXT
+    assert decode_text(memoryview(b"legacy")) == "legacy"
+
+
+def test_decode_bytes_rejects_values_without_marker():
+    with pytest.raises(ValueError, match="no codec marker"):
+        decode_bytes(b"plain bytes")
+    with pytest.raises(ValueError, match="no codec marker"):
+        decode_bytes(b"")
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError, match="Unknown stored value format"):
+        decode_bytes(bytes((CODEC_MARKER, 99)) + b"data")
+
+
+def test_compressed_columns_read_legacy_rows(database):
+    from website_builder.db import crud
+
+    session = crud.initialize_session()
+    with database.begin() as connection:
+        connection.execute(
+            sa.text("UPDATE session SET state = :state WHERE id = :id")
+            .bindparams(sa.bindparam("state", type_=sa.LargeBinary)),
+            {"state": LONG_TEXT.encode("utf-8"), "id": session.id}
+        )
+    assert crud.find_session_by_id(session.id).state == LONG_TEXT
+
+    if database.dialect.name == "sqlite":
+        with database.begin() as connection:
+            connection.execute(sa.text("UPDATE session SET state = :state WHERE id = :id"),
+                               {"state": "legacy text row", "id": session.id})
+        assert crud.find_session_by_id(session.id).state == "legacy text row"
+
+
+def test_compressed_columns_round_trip(database):
+    from website_builder.db import crud
+    from website_builder.db.database import Db_session
+    from website_builder.db.database_models import Session
+
+    session = crud.initialize_session()
+    with Db_session() as db:
+        db.get(Session, session.id).state = LONG_TEXT
+        db.commit()
+    with database.connect() as connection:
+        stored = bytes(connection.execute(sa.text("SELECT state FROM session WHERE id = :id"),
+                                          {"id": session.id}).scalar_one())
+    assert stored[0] == CODEC_MARKER
+    assert stored[1] == codec.WRITE_FORMAT
+    assert crud.find_session_by_id(session.id).state == LONG_TEXT
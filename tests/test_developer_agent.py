@@ -0,0 +1,65 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from website_builder.agents import developer_agent
+from website_builder.agents.developer_context import estimate_tokens
+
+FILE_CONTENT = "<html>" + "x" * 4000 + "</html>"
+
+
+class RecordingModel:
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages)
+        return AIMessage(content="", tool_calls=[{"name": "list_directory", "id": f"call-{len(self.prompts)}",
+                                                  "args": {"path": f"dir-{len(self.prompts)}"}}])
+
+
+def task_state(history):
+    return {"parsed_tasks": [{"id": "TASK_001", "title": "Page", "files": ["index.html"]}],
+            "current_task_index": 0, "project_status": "in_progress", "developer_messages": history,
+            "project_context": {}, "context_tokens": 0, "context_messages": 0, "task_message_sent": True,
+            "task_steps": 1, "task_message_offset": 1, "task_repeats": 1, "task_escalations": 0,
+            "task_stop": {}, "stopped_tasks": []}
+
+
+def history_with_reads(reads: int):
+    history = [SystemMessage(content="system"), HumanMessage(content="Execute this task: TASK_001")]
+    for index in range(reads):
+        history += [AIMessage(content="", tool_calls=[{"name": "read_file", "id": f"read-{index}",
+                                                       "args": {"path": "index.html"}}]),
+                    ToolMessage(content=FILE_CONTENT, tool_call_id=f"read-{index}")]
+    return history
+
+
+def run_steps(state, steps: int, monkeypatch, budget: int) -> RecordingModel:
+    model = RecordingModel()
+    monkeypatch.setattr(developer_agent, "_developer_llm", model)
+    monkeypatch.setattr(developer_agent, "DEVELOPER_CONTEXT_TOKEN_BUDGET", budget)
+    monkeypatch.setattr(developer_agent, "DEVELOPER_CONTEXT_RECENT_STEPS", 1)
+    for _ in range(steps):
+        update = asyncio.run(developer_agent.execute_current_task(state))
+        assert update["context_tokens"] == estimate_tokens(state["developer_messages"])
+        assert update["context_messages"] == len(state["developer_messages"])
+        call_id = update["developer_messages"][-1].tool_calls[0]["id"]
+        state = {**state, **update,
+                 "developer_messages": state["developer_messages"] + update["developer_messages"]
+                 + [ToolMessage(content="index.html", tool_call_id=call_id)]}
+    return model
+
+
+def test_prompt_is_sent_verbatim_under_budget(monkeypatch):
+    history = history_with_reads(3)
+    model = run_steps(task_state(history), 3, monkeypatch, budget=100_000)
+    for prompt in model.prompts:
+        assert sum(1 for msg in prompt if msg.content == FILE_CONTENT) == 3
+
+
+def test_prompt_is_trimmed_over_budget(monkeypatch):
+    history = history_with_reads(3)
+    model = run_steps(task_state(history), 2, monkeypatch, budget=estimate_tokens(history) // 2)
+    for prompt in model.prompts:
+        assert sum(1 for msg in prompt if msg.content == FILE_CONTENT) == 1
@@ -0,0 +1,51 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from website_builder.agents.developer_context import trim_developer_context
+
+FILE_CONTENT = "<html>" + "x" * 1000 + "</html>"
+
+
+def step(index: int, name: str, args: dict, output: str):
+    call_id = f"call-{index}"
+    return [AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": call_id}]),
+            ToolMessage(content=output, tool_call_id=call_id)]
+
+
+def conversation(*steps):
+    return [SystemMessage(content="system"), HumanMessage(content="task")] + [msg for s in steps for msg in s]
+
+
+def read_output(prompt, call_id: str) -> str:
+    return next(msg.content for msg in prompt if isinstance(msg, ToolMessage) and msg.tool_call_id == call_id)
+
+
+def test_read_is_kept_when_only_edited_later():
+    messages = conversation(
+        step(0, "read_file", {"path": "index.html"}, FILE_CONTENT),
+        step(1, "edit_file", {"path": "index.html", "edits": [{"oldText": "x", "newText": "y"}]}, "diff"),
+        step(2, "edit_file", {"path": "./index.html", "edits": [{"oldText": "y", "newText": "z"}]}, "diff"),
+    )
+    prompt = trim_developer_context(messages, 1, budget=100_000, recent_steps=1)
+    assert read_output(prompt, "call-0") == FILE_CONTENT
+
+
+def test_read_is_kept_when_read_partially_later():
+    messages = conversation(
+        step(0, "read_file", {"path": "index.html"}, FILE_CONTENT),
+        step(1, "read_file", {"path": "index.html", "head": 5}, "<html>"),
+        step(2, "list_directory", {"path": "."}, "index.html"),
+    )
+    prompt = trim_developer_context(messages, 1, budget=100_000, recent_steps=1)
+    assert read_output(prompt, "call-0") == FILE_CONTENT
+
+
+def test_read_is_elided_when_file_is_read_or_written_in_full_later():
+    for name, args in (("read_file", {"path": "index.html"}),
+                       ("write_file", {"path": "./index.html", "content": FILE_CONTENT})):
+        messages = conversation(
+            step(0, "read_file", {"path": "index.html"}, FILE_CONTENT),
+            step(1, name, args, FILE_CONTENT if name == "read_file" else "written"),
+            step(2, "list_directory", {"path": "."}, "index.html"),
+        )
+        prompt = trim_developer_context(messages, 1, budget=100_000, recent_steps=1)
+        assert "elided" in read_output(prompt, "call-0")
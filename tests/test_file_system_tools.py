@@ -0,0 +1,146 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.tools import StructuredTool
+
+from website_builder.tools import file_system_tools
+from website_builder.tools.file_system_tools import edit_file, move_file, reserve_task_files, task_file_owners, \
+    write_file
+
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_system_tools, "PROJECT_WORKSPACE", str(tmp_path))
+    yield tmp_path
+    for owner in ("session/task-0", "session/task-1"):
+        task_file_owners.release(owner)
+
+
+def task_config(index: int) -> dict:
+    return {"configurable": {"session_id": "session", "thread_id": f"session/task-{index}"}}
+
+
+def write_in_thread(path: str, content: str, config: dict):
+    """Start a write of another task, returns its thread and the list its result is appended to"""
+    results = []
+    thread = threading.Thread(target=lambda: results.append(
+        write_file.invoke({"path": path, "content": content}, config)))
+    thread.start()
+    return thread, results
+
+
+def test_write_to_an_owned_file_waits_until_the_owner_releases_it(workspace):
+    assert write_file.invoke({"path": "index.html", "content": "first"}, task_config(0)) == \
+        "Successfully wrote to index.html"
+    thread, results = write_in_thread("./index.html", "second", task_config(1))
+    thread.join(0.2)
+    assert thread.is_alive()
+    assert (workspace / "session" / "index.html").read_text() == "first"
+
+    task_file_owners.release("session/task-0")
+    thread.join(5)
+    assert results == ["Successfully wrote to ./index.html"]
+    assert (workspace / "session" / "index.html").read_text() == "second"
+    assert task_file_owners.owned("session/task-1") == {workspace / "session" / "index.html"}
+
+
+def test_heartbeat_is_called_while_waiting(workspace, monkeypatch):
+    monkeypatch.setattr(file_system_tools, "FILE_WAIT_HEARTBEAT_SECONDS", 0.01)
+    write_file.invoke({"path": "index.html", "content": "first"}, task_config(0))
+    heartbeats = []
+    task_file_owners.start("session/task-1", lambda: heartbeats.append(1))
+    thread, results = write_in_thread("index.html", "second", task_config(1))
+    thread.join(0.2)
+    assert heartbeats
+    task_file_owners.release("session/task-0")
+    thread.join(5)
+    assert results == ["Successfully wrote to index.html"]
+
+
+def test_tasks_waiting_for_each_other_share_the_file(workspace):
+    write_file.invoke({"path": "index.html", "content": "page"}, task_config(0))
+    write_file.invoke({"path": "style.css", "content": "body {}"}, task_config(1))
+    thread, results = write_in_thread("style.css", "from task 0", task_config(0))
+    thread.join(0.2)
+    assert thread.is_alive()
+
+    # Task 1 would now wait for task 0, which waits for task 1
+    assert write_file.invoke({"path": "index.html", "content": "from task 1"}, task_config(1)) == \
+        "Successfully wrote to index.html"
+    assert thread.is_alive()
+    task_file_owners.release("session/task-1")
+    thread.join(5)
+    assert results == ["Successfully wrote to style.css"]
+
+
+def test_waiting_write_fails_once_its_task_ended(workspace):
+    write_file.invoke({"path": "index.html", "content": "first"}, task_config(0))
+    task_file_owners.start("session/task-1")
+    thread, results = write_in_thread("index.html", "second", task_config(1))
+    thread.join(0.2)
+    task_file_owners.release("session/task-1")
+    task_file_owners.release("session/task-0")
+    thread.join(5)
+    assert "ended while waiting" in results[0]
+    assert (workspace / "session" / "index.html").read_text() == "first"
+
+
+def test_dry_runs_and_writes_outside_tasks_claim_nothing(workspace):
+    write_file.invoke({"path": "index.html", "content": "page"}, {"configurable": {"session_id": "session"}})
+    edits = [{"oldText": "page", "newText": "edited"}]
+    edit_file.invoke({"path": "index.html", "edits": edits, "dryRun": True}, task_config(0))
+    assert task_file_owners.owned("session/task-0") == set()
+    assert "+edited" in edit_file.invoke({"path": "index.html", "edits": edits}, task_config(1))
+    assert move_file.invoke({"source": "index.html", "destination": "moved.html"}, task_config(1)) == \
+        "Successfully moved index.html to moved.html"
+
+
+def test_declared_files_are_reserved_when_the_task_starts(workspace):
+    assert reserve_task_files(["index.html", "style.css"], task_config(0)) == []
+    assert reserve_task_files(["style.css", "script.js"], task_config(1)) == [workspace / "session" / "style.css"]
+    assert write_file.invoke({"path": "script.js", "content": ""}, task_config(1)) == \
+        "Successfully wrote to script.js"
+
+
+def test_file_locks_are_dropped_after_writing(workspace):
+    for index in range(20):
+        write_file.invoke({"path": f"page-{index}.html", "content": "page"}, task_config(0))
+    assert file_system_tools._file_locks == {}
+
+
+def test_mcp_write_tools_claim_files(workspace, monkeypatch):
+    from website_builder.mcp import file_system
+
+    calls = []
+
+    async def write(**arguments):
+        calls.append(arguments)
+        return "written"
+
+    async def start():
+        pass
+
+    async def get_tools():
+        return [StructuredTool(name="write_file", description="Write a file", coroutine=write, handle_tool_error=True,
+                               args_schema={"type": "object", "properties": {"path": {"type": "string"},
+                                                                             "content": {"type": "string"}}})]
+
+    monkeypatch.setattr(file_system, "_file_system_tools", None)
+    monkeypatch.setattr(file_system.mcp_server_pool, "start", start)
+    monkeypatch.setattr(file_system.mcp_server_pool, "get_tools", get_tools)
+
+    async def scenario():
+        [mcp_write_file] = await file_system.mcp_file_system_tools()
+        assert await mcp_write_file.ainvoke({"path": "index.html", "content": "a"}, task_config(0)) == "written"
+        waiting = asyncio.create_task(mcp_write_file.ainvoke({"path": "index.html", "content": "b"}, task_config(1)))
+        # The event loop keeps running while the write waits
+        await asyncio.sleep(0.2)
+        assert not waiting.done()
+        assert calls == [{"path": "index.html", "content": "a"}]
+        task_file_owners.release("session/task-0")
+        assert await asyncio.wait_for(waiting, 5) == "written"
+
+    asyncio.run(scenario())
+    assert calls == [{"path": "index.html", "content": "a"}, {"path": "index.html", "content": "b"}]
+    assert task_file_owners.owned("session/task-1") == {workspace / "session" / "index.html"}
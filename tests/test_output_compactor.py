@@ -0,0 +1,100 @@
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from website_builder.db import async_crud, crud
+from website_builder.db.async_crud import find_sessions_to_compact
+from website_builder.jobs import output_compactor as output_compactor_module
+from website_builder.jobs.output_compactor import OutputCompactor
+
+MAX_LENGTH = 50
+
+
+async def drain(compactor: OutputCompactor) -> int:
+    """Compact the queued sessions until the queue is empty, returns the number of steps"""
+    steps = 0
+    while not compactor._queue.empty():
+        session_id = compactor._queue.get_nowait()
+        compactor._pending.discard(session_id)
+        await compactor._compact(session_id)
+        steps += 1
+    return steps
+
+
+def long_session() -> str:
+    session = crud.initialize_session()
+    crud.add_task_manager_output(session.id, [AIMessage(content="x" * 200)])
+    return session.id
+
+
+def test_settled_session_is_skipped_until_its_outputs_change(database, run_async, monkeypatch):
+    calls = []
+
+    async def summarize(content, content_type):
+        calls.append(content)
+        # Summaries longer than max_length keep the rendered output over it once nothing is left to compact
+        return "s" * (MAX_LENGTH + 10)
+
+    monkeypatch.setattr(async_crud, "summarize_content_with_llm", summarize)
+    session_id = long_session()
+
+    async def scenario():
+        compactor = OutputCompactor(interval=60, max_length=MAX_LENGTH)
+        compactor._queue = asyncio.Queue()
+        await compactor.sweep()
+        await drain(compactor)
+        assert calls
+        assert len(crud.find_session_by_id(session_id).task_manager_output) > MAX_LENGTH
+        assert await find_sessions_to_compact(MAX_LENGTH) == []
+
+        calls.clear()
+        await compactor.sweep()
+        assert await drain(compactor) == 0
+        assert calls == []
+
+        crud.add_task_manager_output(session_id, [AIMessage(content="y" * 200)])
+        assert await find_sessions_to_compact(MAX_LENGTH) == [session_id]
+
+    run_async(scenario())
+
+
+def test_failing_session_backs_off(database, run_async, monkeypatch):
+    calls = []
+
+    async def summarize(content, content_type):
+        return "summary"
+
+    async def fail(session_id, max_length):
+        calls.append(session_id)
+        raise RuntimeError("summarization failed")
+
+    monkeypatch.setattr(output_compactor_module, "compact_session_outputs", fail)
+    session_id = long_session()
+
+    async def scenario():
+        compactor = OutputCompactor(interval=60, max_length=MAX_LENGTH)
+        compactor._queue = asyncio.Queue()
+        await compactor.sweep()
+        await drain(compactor)
+        assert calls == [session_id]
+        assert compactor._failures[session_id][0] == 1
+
+        await compactor.sweep()
+        assert await drain(compactor) == 0
+        assert calls == [session_id]
+
+        # A writer asking for compaction is not held back, its append changed the outputs
+        compactor.request(session_id)
+        await drain(compactor)
+        assert calls == [session_id, session_id]
+        failures, retry_at = compactor._failures[session_id]
+        assert failures == 2
+
+        monkeypatch.setattr(output_compactor_module, "compact_session_outputs", async_crud.compact_session_outputs)
+        monkeypatch.setattr(async_crud, "summarize_content_with_llm", summarize)
+        compactor._failures[session_id] = (failures, 0.0)
+        await compactor.sweep()
+        await drain(compactor)
+        assert session_id not in compactor._failures
+
+    run_async(scenario())
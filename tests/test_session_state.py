@@ -0,0 +1,46 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from website_builder.db import async_crud
+from website_builder.db.crud import serialize_state
+from website_builder.db.database import Db_session
+from website_builder.db.database_models import Session, STATE_VERSION
+
+
+def add_session(session_id: str, state, state_version: int = 0):
+    with Db_session() as db:
+        db.add(Session(id=session_id, state=state, state_version=state_version))
+        db.commit()
+
+
+def test_legacy_states_are_migrated_once(database, run_async):
+    add_session("legacy", serialize_state({"requirements_messages": [HumanMessage(content="A portfolio"),
+                                                                     AIMessage(content="Which pages?")],
+                                           "is_complete": False}))
+    # A state without the conversation that merely holds its key as a value is left as it is
+    add_session("lookalike", serialize_state({"requirements_data": "", "user_input": "requirements_messages"}))
+    add_session("empty", None)
+
+    async def scenario():
+        migrated = await asyncio.wait_for(async_crud.migrate_legacy_session_states(batch_size=1), 10)
+        return migrated, await async_crud.migrate_legacy_session_states(batch_size=1), \
+            await async_crud.load_session_state("legacy"), await async_crud.load_session_state("lookalike")
+
+    migrated, migrated_again, legacy, lookalike = run_async(scenario())
+
+    assert (migrated, migrated_again) == (1, 0)
+    assert [msg.content for msg in legacy["requirements_messages"]] == ["A portfolio", "Which pages?"]
+    assert legacy["is_complete"] is False
+    assert lookalike["user_input"] == "requirements_messages"
+    with Db_session() as db:
+        assert {session.state_version for session in db.query(Session)} == {STATE_VERSION}
+
+
+def test_new_sessions_are_not_migrated(database, run_async):
+    from website_builder.db import crud
+
+    session = crud.initialize_session()
+
+    assert session.state_version == STATE_VERSION
+    assert run_async(async_crud.migrate_legacy_session_states()) == 0